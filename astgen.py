@@ -0,0 +1,364 @@
+"""Python `ast` generation from the RID syntax tree, compiled without a text round trip.
+
+AstGenerator mirrors codegen.CodeGenerator, including its type-directed lowering of
+`+` and the loop-invariant temporaries, but builds an ast.Module that compile()
+accepts directly, so CPython does not tokenize and parse generated source again.
+Every node's `lineno` is the RID line of the statement it came from, which makes
+tracebacks of the compiled code point straight at the .rid file. Positions are
+passed to each constructor: a fix-up walk over the finished tree costs about as
+much as building it. The prelude helpers and the _rid_main() scaffolding are on
+line 0. ast.unparse(tree) gives equivalent source text, without the line numbers.
+"""
+
+import ast
+import functools
+import gc
+
+import codegen
+import functions
+import inference
+import nodes
+import runtime
+
+LOAD = ast.Load()
+STORE = ast.Store()
+
+OPERATORS = {"+": ast.Add, "-": ast.Sub, "*": ast.Mult, "/": ast.Div, "%": ast.Mod}
+COMPARISONS = {"==": ast.Eq, "!=": ast.NotEq, "<": ast.Lt, ">": ast.Gt, "<=": ast.LtE, ">=": ast.GtE}
+
+
+def number_value(text):
+    """int or float for a Number node's text"""
+    return int(text) if text.isdigit() else float(text)
+
+
+def position(line):
+    """Keyword arguments placing a node on a line"""
+    return {"lineno": line, "col_offset": 0, "end_lineno": line, "end_col_offset": 0}
+
+
+NOWHERE = position(0)
+
+
+@functools.lru_cache(maxsize=None)
+def helper_statements(name):
+    """Parsed source of one runtime helper, on line 0; compile() does not modify it"""
+    statements = ast.parse(runtime.HELPERS[name]).body
+    for statement in statements:
+        for node in ast.walk(statement):
+            if "lineno" in node._attributes:
+                node.lineno = node.end_lineno = 0
+    return statements
+
+
+class AstGenerator:
+    def __init__(self):
+        # position() of the statement being generated
+        self.at = NOWHERE
+        self.helpers = set()
+        # Whether the code uses out() or line, so the program needs the output buffer flushed
+        self.prints = False
+        # Every FuncDef generated, nested ones included, for functions.shared_names
+        self.function_defs = []
+        # id() of each expression loops.py hoisted -> temporary holding its value
+        self.hoisted = {}
+        # Numbers for the next hoisted temporary and `Run parallel` body function
+        self.temporaries = 0
+        self.parallel_bodies = 0
+        self.statements = {
+            nodes.Let: self.assign_stmt,
+            nodes.Assign: self.assign_stmt,
+            nodes.SetItem: self.set_item,
+            nodes.Out: self.print_stmt,
+            nodes.Newline: self.newline_stmt,
+            nodes.ExprStmt: self.expr_stmt,
+            nodes.Run: self.loop_stmt,
+            nodes.ParallelRun: self.parallel_loop,
+            nodes.While: self.while_stmt,
+            nodes.If: self.conditional_stmt,
+            nodes.FuncDef: self.func_def,
+            nodes.Return: self.return_stmt,
+            nodes.TailCall: self.tail_call,
+        }
+        self.expressions = {
+            nodes.Number: self.number,
+            nodes.String: self.string,
+            nodes.Bool: self.boolean,
+            nodes.Name: self.name,
+            nodes.Neg: self.negation,
+            nodes.BinOp: self.binary,
+            nodes.Compare: self.compare,
+            nodes.Call: self.call,
+            nodes.Convert: self.convert,
+            nodes.Input: self.input_call,
+            nodes.List: self.list_literal,
+            nodes.Index: self.index,
+            nodes.Builtin: self.builtin,
+        }
+
+    def generate(self, program):
+        """Return an ast.Module for a Program"""
+        body = self.statement_list(program.body)
+        return assemble(body, self.helpers, self.prints, functions.shared_names(self.function_defs))
+
+    def statement_list(self, body):
+        statements = []
+        for node in body:
+            self.at = position(node.line)
+            statements.extend(self.statements[type(node)](node))
+        return statements
+
+    def block(self, body):
+        return self.statement_list(body) or [ast.Pass(**self.at)]
+
+    def load(self, name):
+        return ast.Name(name, LOAD, **self.at)
+
+    def store(self, name):
+        return ast.Name(name, STORE, **self.at)
+
+    def invoke(self, name, *args):
+        """Call of the function `name`"""
+        return ast.Call(self.load(name), list(args), [], **self.at)
+
+    def constant(self, value):
+        return ast.Constant(value, **self.at)
+
+    # Statements
+
+    def assign_stmt(self, node):
+        return [ast.Assign([self.store(node.name)], self.expression(node.value), **self.at)]
+
+    def set_item(self, node):
+        target = ast.Subscript(self.load(node.name), self.expression(node.index), STORE, **self.at)
+        return [ast.Assign([target], self.expression(node.value), **self.at)]
+
+    def print_stmt(self, node):
+        self.helpers.add("_rid_out")
+        self.prints = True
+        value = self.expression(node.value)
+        if node.value.type != "str":
+            value = self.invoke("str", value)
+        return [ast.Expr(self.invoke("_rid_out", value), **self.at)]
+
+    def newline_stmt(self, node):
+        self.helpers.add("_rid_out")
+        self.prints = True
+        return [ast.Expr(self.invoke("_rid_out", self.constant("\n")), **self.at)]
+
+    def expr_stmt(self, node):
+        return [ast.Expr(self.expression(node.value), **self.at)]
+
+    def hoist(self, node):
+        """Evaluate the loop's invariant expressions into temporaries before it starts"""
+        statements = []
+        for expr in node.hoisted:
+            name = f"_rid_inv{self.temporaries}"
+            self.temporaries += 1
+            statements.append(ast.Assign([self.store(name)], self.expression(expr), **self.at))
+            self.hoisted[id(expr)] = name
+        return statements
+
+    def loop_stmt(self, node):
+        statements = self.hoist(node)
+        count = self.expression(node.count)
+        if node.count.type != "int":
+            count = self.invoke("int", count)
+        target = self.store(node.counter or "_")
+        statements.append(ast.For(target, self.invoke("range", count), self.block(node.body), [], **self.at))
+        return statements
+
+    def parallel_loop(self, node):
+        """The body becomes a function returning the reduction over a range of counter values"""
+        statements = self.hoist(node)
+        self.helpers.add("_rid_parallel")
+        count = self.expression(node.count)
+        if node.count.type != "int":
+            count = self.invoke("int", count)
+        body = f"_rid_body{self.parallel_bodies}"
+        self.parallel_bodies += 1
+        at = self.at
+        identity = number_value(inference.REDUCTION_IDENTITY[node.op].value)
+        bounds = self.invoke("range", self.load("_rid_start"), self.load("_rid_stop"))
+        loop = ast.For(self.store(node.counter), bounds, self.block(node.body), [], **at)
+        self.at = at
+        params = [ast.arg("_rid_start", **at), ast.arg("_rid_stop", **at)]
+        function = ast.FunctionDef(body, ast.arguments([], params, None, [], [], None, []), [
+            ast.Assign([self.store(node.reduction)], self.constant(identity), **at),
+            loop,
+            ast.Return(self.load(node.reduction), **at),
+        ], [], None, **at)
+        partials = self.invoke("_rid_parallel", self.load(body), count)
+        reduce = self.invoke("_rid_reduce", self.constant(node.op), self.load(node.reduction), partials)
+        statements.extend([function, ast.Assign([self.store(node.reduction)], reduce, **at)])
+        return statements
+
+    def while_stmt(self, node):
+        statements = self.hoist(node)
+        condition = self.expression(node.condition)
+        statements.append(ast.While(condition, self.block(node.body), [], **self.at))
+        return statements
+
+    def conditional_stmt(self, node):
+        # Each ya_fir is an if nested in the previous branch's else
+        first = orelse = None
+        for condition, body in node.branches:
+            self.at = position(condition.line)
+            branch = ast.If(self.expression(condition), [], [], **self.at)
+            branch.body = self.block(body)
+            if first is None:
+                first = branch
+            else:
+                orelse.append(branch)
+            orelse = branch.orelse
+        if node.orelse is not None:
+            self.at = position(node.line)
+            orelse.extend(self.block(node.orelse))
+        return [first]
+
+    def func_def(self, node):
+        self.function_defs.append(node)
+        decorators = []
+        if node.memoize is not None:
+            self.helpers.add("_rid_functools")
+            lru_cache = ast.Attribute(self.load("_rid_functools"), "lru_cache", LOAD, **self.at)
+            options = [ast.keyword("maxsize", self.constant(node.memoize or None), **self.at),
+                       ast.keyword("typed", self.constant(True), **self.at)]
+            decorators.append(ast.Call(lru_cache, [], options, **self.at))
+        params = [ast.arg(param, **self.at) for param in node.params]
+        arguments = ast.arguments([], params, None, [], [], None, [])
+        function = ast.FunctionDef(node.name, arguments, [], decorators, None, **self.at)
+        if not node.loop:
+            function.body = self.block(node.body)
+            return [function]
+
+        # Tail calls rebind the parameters and `continue`; anything else leaves the loop
+        body = node.body
+        if not isinstance(body[-1], (nodes.Return, nodes.TailCall)):
+            body = body + [nodes.Return(None, node.line)]
+        loop = ast.While(self.constant(True), [], [], **self.at)
+        loop.body = self.block(body)
+        function.body = [loop]
+        return [function]
+
+    def return_stmt(self, node):
+        value = None if node.value is None else self.expression(node.value)
+        return [ast.Return(value, **self.at)]
+
+    def tail_call(self, node):
+        statements = []
+        if node.params:
+            args = [self.expression(arg) for arg in node.args]
+            if len(node.params) == 1:
+                target, value = self.store(node.params[0]), args[0]
+            else:
+                target = ast.Tuple([self.store(param) for param in node.params], STORE, **self.at)
+                value = ast.Tuple(args, LOAD, **self.at)
+            statements.append(ast.Assign([target], value, **self.at))
+        statements.append(ast.Continue(**self.at))
+        return statements
+
+    # Expressions
+
+    def expression(self, node):
+        if self.hoisted and id(node) in self.hoisted:
+            return self.load(self.hoisted[id(node)])
+        return self.expressions[type(node)](node)
+
+    def number(self, node):
+        return self.constant(number_value(node.value))
+
+    def string(self, node):
+        return self.constant(nodes.string_value(node.value))
+
+    def boolean(self, node):
+        return self.constant(node.value == "True")
+
+    def name(self, node):
+        return self.load(node.name)
+
+    def negation(self, node):
+        return ast.UnaryOp(ast.USub(), self.expression(node.operand), **self.at)
+
+    def binary(self, node):
+        if node.op == "+":
+            return self.addition(node)
+        left, right = self.expression(node.left), self.expression(node.right)
+        return ast.BinOp(left, OPERATORS[node.op](), right, **self.at)
+
+    def addition(self, node):
+        """RID `+` adds numbers and joins anything else as strings"""
+        left_type, right_type = node.left.type, node.right.type
+        left, right = self.expression(node.left), self.expression(node.right)
+
+        if left_type in inference.NUMERIC and right_type in inference.NUMERIC or (
+                inference.LIST in (left_type, right_type)
+                and left_type in inference.ELEMENTWISE and right_type in inference.ELEMENTWISE):
+            return ast.BinOp(left, ast.Add(), right, **self.at)
+
+        if left_type == "str" or right_type == "str":
+            if left_type != "str":
+                left = self.invoke("str", left)
+            if right_type != "str":
+                right = self.invoke("str", right)
+            return ast.BinOp(left, ast.Add(), right, **self.at)
+
+        self.helpers.add("_rid_add")
+        return self.invoke("_rid_add", left, right)
+
+    def compare(self, node):
+        left, right = self.expression(node.left), self.expression(node.right)
+        return ast.Compare(left, [COMPARISONS[node.op]()], [right], **self.at)
+
+    def call(self, node):
+        return self.invoke(node.name, *[self.expression(arg) for arg in node.args])
+
+    def convert(self, node):
+        return self.invoke(node.func, self.expression(node.arg))
+
+    def input_call(self, node):
+        # Pending output has to be visible before the program waits for input
+        self.helpers.update(("_rid_out", "_rid_input"))
+        if node.prompt is None:
+            return self.invoke("_rid_input")
+        return self.invoke("_rid_input", self.constant(nodes.string_value(node.prompt)))
+
+    def list_literal(self, node):
+        self.helpers.add("_rid_list")
+        return self.invoke("_rid_list", ast.List([self.expression(item) for item in node.items], LOAD, **self.at))
+
+    def index(self, node):
+        return ast.Subscript(self.expression(node.value), self.expression(node.index), LOAD, **self.at)
+
+    def builtin(self, node):
+        self.helpers.update(codegen.BUILTIN_HELPERS[node.name])
+        return self.invoke(f"_rid_{node.name}", *[self.expression(arg) for arg in node.args])
+
+
+def assemble(body, helpers, buffered, shared=()):
+    """The ast.Module counterpart of codegen.assemble; everything but body is on line 0"""
+    generator = AstGenerator()
+    statements = [statement for name in runtime.HELPERS if name in helpers for statement in helper_statements(name)]
+    main_body = [ast.Global(sorted(shared), **NOWHERE)] if shared else []
+    main_body.extend(body or [ast.Pass(**NOWHERE)])
+    no_arguments = ast.arguments([], [], None, [], [], None, [])
+    statements.append(ast.FunctionDef("_rid_main", no_arguments, main_body, [], None, **NOWHERE))
+    run = ast.Expr(generator.invoke("_rid_main"), **NOWHERE)
+    if buffered:
+        statements.append(ast.Try([run], [], [], [ast.Expr(generator.invoke("_rid_flush"), **NOWHERE)], **NOWHERE))
+    else:
+        statements.append(run)
+    return ast.Module(statements, [])
+
+
+def generate(program):
+    """Return an ast.Module for a Program; the line numbers in it are RID lines"""
+    # Every node is tracked by the cyclic collector, which would otherwise keep
+    # rescanning the growing tree; none of them can be garbage yet
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return AstGenerator().generate(program)
+    finally:
+        if enabled:
+            gc.enable()
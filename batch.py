@@ -0,0 +1,153 @@
+"""Transpile (and optionally run) many RID files at once: `python main.py batch <dir|glob>`.
+
+Files are transpiled in parallel worker processes, each to its own .py file. With
+--run the outputs are then executed as separate `python` processes, at most
+--max-running at a time and each limited to --timeout seconds. A script's stdin
+is foo.in next to foo.rid when that file exists, and empty otherwise.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import glob
+import os
+import subprocess
+import sys
+import time
+
+import cache
+import rid
+
+TranspileResult = collections.namedtuple("TranspileResult", "source output error seconds")
+RunResult = collections.namedtuple("RunResult", "source status returncode seconds")
+
+
+def find_sources(pattern):
+    """RID files under a directory, or matching a glob pattern, in sorted order"""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "**", "*.rid")
+    return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+
+def output_path(source, out_dir=None, base=None):
+    """foo.rid -> foo.py, next to the source or mirrored under out_dir relative to base"""
+    stem = os.path.splitext(source)[0]
+    if out_dir is None:
+        return stem + ".py"
+    return os.path.join(out_dir, os.path.relpath(stem, base) + ".py")
+
+
+def transpile_job(job):
+    """Worker: transpile one file; errors are returned, not raised"""
+    source, output, use_cache, optimize = job
+    start = time.perf_counter()
+    try:
+        with open(source, 'r') as file:
+            rid_code = file.read()
+        cache_dir = cache.cache_dir_for(source) if use_cache else None
+        python_code, _, _ = rid.load_program(rid_code, source, cache_dir, optimize)
+
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, 'w') as file:
+            file.write(python_code)
+        error = None
+    except Exception as exc:
+        # RecursionError from deeply nested source included: one file must not abort the batch
+        error = f"{type(exc).__name__}: {exc}"
+    return TranspileResult(source, output, error, time.perf_counter() - start)
+
+
+def transpile_all(sources, out_dir=None, base=None, jobs=None, use_cache=True, optimize=False):
+    """Transpile sources across a process pool; results are in the order of sources"""
+    work = [(source, output_path(source, out_dir, base), use_cache, optimize) for source in sources]
+    if not work:
+        return []
+
+    jobs = jobs or os.cpu_count() or 1
+    chunksize = max(1, len(work) // (jobs * 4))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(transpile_job, work, chunksize=chunksize))
+
+
+def run_job(result, timeout):
+    input_path = os.path.splitext(result.source)[0] + ".in"
+    stdin = open(input_path, 'rb') if os.path.exists(input_path) else subprocess.DEVNULL
+    start = time.perf_counter()
+    try:
+        completed = subprocess.run([sys.executable, result.output], stdin=stdin,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout)
+        status = "pass" if completed.returncode == 0 else "fail"
+        returncode = completed.returncode
+    except subprocess.TimeoutExpired:
+        status, returncode = "timeout", None
+    finally:
+        if stdin is not subprocess.DEVNULL:
+            stdin.close()
+    return RunResult(result.source, status, returncode, time.perf_counter() - start)
+
+
+def run_all(results, max_running=None, timeout=None):
+    """Execute the transpiled outputs; the limit applies to concurrently running scripts"""
+    max_running = max_running or os.cpu_count() or 1
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_running) as executor:
+        return list(executor.map(lambda result: run_job(result, timeout), results))
+
+
+def report(results, runs, elapsed, out=None):
+    """Print failures followed by aggregate counts and timing"""
+    failed = [result for result in results if result.error is not None]
+    for result in failed:
+        print(f"FAIL transpile {result.source}: {result.error}", file=out)
+    for run in runs:
+        if run.status != "pass":
+            detail = "timed out" if run.status == "timeout" else f"exit code {run.returncode}"
+            print(f"FAIL run {run.source}: {detail}", file=out)
+
+    transpile_time = sum(result.seconds for result in results)
+    print(f"\n{len(results)} files: {len(results) - len(failed)} transpiled, {len(failed)} failed "
+          f"({transpile_time:.2f} s of transpiler time)", file=out)
+    if runs:
+        counts = collections.Counter(run.status for run in runs)
+        run_time = sum(run.seconds for run in runs)
+        print(f"{len(runs)} runs: {counts['pass']} passed, {counts['fail']} failed, "
+              f"{counts['timeout']} timed out ({run_time:.2f} s of run time)", file=out)
+    print(f"Wall time: {elapsed:.2f} s", file=out)
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(prog="main.py batch",
+                                         description="Transpile and optionally run many RID files.")
+    arg_parser.add_argument("pattern", help="directory (searched recursively for .rid files) or glob pattern")
+    arg_parser.add_argument("--out-dir", help="write outputs here, mirroring the input layout "
+                                              "(default: foo.py next to each foo.rid)")
+    arg_parser.add_argument("-j", "--jobs", type=int, help="transpiler processes (default: CPU count)")
+    arg_parser.add_argument("--run", action="store_true", help="execute each transpiled file")
+    arg_parser.add_argument("--max-running", type=int, help="scripts executed at once (default: CPU count)")
+    arg_parser.add_argument("--timeout", type=float, help="seconds each script may run")
+    arg_parser.add_argument("-O", dest="optimize", action="store_true", help="enable the optimiser")
+    arg_parser.add_argument("--no-cache", action="store_true",
+                            help=f"always re-transpile instead of reusing {cache.CACHE_DIR_NAME}/")
+    return arg_parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+
+    sources = find_sources(args.pattern)
+    if not sources:
+        print(f"No .rid files match {args.pattern}")
+        return 1
+    if os.path.isdir(args.pattern):
+        base = args.pattern
+    else:
+        base = os.path.commonpath([os.path.dirname(source) or "." for source in sources])
+
+    start = time.perf_counter()
+    results = transpile_all(sources, args.out_dir, base, args.jobs, not args.no_cache, args.optimize)
+    runs = []
+    if args.run:
+        runs = run_all([result for result in results if result.error is None], args.max_running, args.timeout)
+    report(results, runs, time.perf_counter() - start)
+
+    ok = all(result.error is None for result in results) and all(run.status == "pass" for run in runs)
+    return 0 if ok else 1
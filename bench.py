@@ -0,0 +1,234 @@
+"""Benchmark suite for the transpiler and generated code: `python main.py bench`.
+
+Each workload is a generated RID program (see WORKLOADS). It is run --repeat
+times, timing every phase separately: lexing (lexer.iter_lex into a list),
+parsing (Parser.parse), codegen (the tree passes and codegen.generate), compiling
+the Python source and executing it with output discarded. The median, 90th
+percentile and fastest run of each phase are reported.
+
+--save writes the results as JSON; --baseline compares against such a file and
+exits with status 1 when a phase's median is more than --threshold slower.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import time
+
+import codegen
+import lexer
+import rid
+from parser import Parser
+
+PHASES = ("lex", "parse", "codegen", "compile", "exec")
+
+# Phases faster than this are too noisy to flag as regressions
+NOISE_FLOOR = 0.001
+
+
+def concat_workload(scale):
+    """Long `+` chains mixing strings and numbers"""
+    lines = ['Let name = "x"', "Let n = 1"]
+    for index in range(int(400 * scale)):
+        terms = " + ".join("name" if term % 2 == 0 else "n" for term in range(100))
+        lines.append(f"Let s{index} = {terms}")
+    return "\n".join(lines)
+
+
+def nesting_workload(scale):
+    """agar blocks nested 90 deep (CPython allows at most 100 indentation levels)"""
+    lines = ["Let x = 0"]
+    for level in range(90):
+        lines.extend(f"x = x + {level}" for _ in range(int(20 * scale)))
+        lines.append(f"agar(x > {level}) {{")
+    lines.append("out(x)")
+    lines.extend("}" for _ in range(90))
+    return "\n".join(lines)
+
+
+def functions_workload(scale):
+    """Many small functions, each called once"""
+    count = int(2000 * scale)
+    lines = []
+    for index in range(count):
+        lines.extend((
+            f"func f{index}(a, b) {{",
+            f"    Let t = a * {index} + b",
+            "    agar (t > 100) {",
+            "        give t - b",
+            "    }",
+            "    give t",
+            "}",
+        ))
+    lines.append("Let total = 0")
+    lines.extend(f"total = total + f{index}({index}, 2)" for index in range(count))
+    lines.append("out(total)")
+    return "\n".join(lines)
+
+
+def loops_workload(scale):
+    """Counted and while loops with integer arithmetic"""
+    iterations = int(1000000 * scale)
+    return f"""
+Let total = 0
+Run({iterations}, i) {{
+    total = total + i % 7
+}}
+Let k = 0
+Run while(k < {iterations}) {{
+    k = k + 3
+}}
+out(total + k)
+"""
+
+
+def output_workload(scale):
+    """Heavy out() and line output"""
+    return f"""
+Run({int(200000 * scale)}, i) {{
+    out(i)
+    out(" ")
+    agar (i % 10 == 9) {{
+        line
+    }}
+}}
+"""
+
+
+WORKLOADS = {
+    "concat": concat_workload,
+    "nesting": nesting_workload,
+    "functions": functions_workload,
+    "loops": loops_workload,
+    "output": output_workload,
+}
+
+
+def time_phases(source, devnull):
+    """Run every phase once; returns {phase: seconds}"""
+    times = {}
+    start = time.perf_counter()
+    tokens = list(lexer.iter_lex(source))
+    times["lex"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    program = Parser(tokens).parse()
+    times["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    python_code = codegen.generate(rid.run_passes(program))
+    times["codegen"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    code = compile(python_code, "<bench>", "exec")
+    times["compile"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rid.run_code(code, stdin="", stdout=devnull)
+    times["exec"] = time.perf_counter() - start
+    return times
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples):
+    return {"median": statistics.median(samples), "p90": percentile(samples, 0.9), "min": min(samples)}
+
+
+def run_workload(name, scale, repeat):
+    """{phase: summary} for one workload"""
+    source = WORKLOADS[name](scale)
+    samples = {phase: [] for phase in PHASES}
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(repeat):
+            gc.collect()
+            for phase, seconds in time_phases(source, devnull).items():
+                samples[phase].append(seconds)
+    return {phase: summarize(phase_samples) for phase, phase_samples in samples.items()}
+
+
+def compare(results, baseline, threshold):
+    """[(workload, phase, ratio)] for phases whose median regressed past the threshold"""
+    regressions = []
+    for name, phases in results.items():
+        for phase, summary in phases.items():
+            base = baseline.get(name, {}).get(phase)
+            if base is None:
+                continue
+            median, base_median = summary["median"], base["median"]
+            if median > base_median * (1 + threshold) and median - base_median > NOISE_FLOOR:
+                regressions.append((name, phase, median / base_median))
+    return regressions
+
+
+def report(results, baseline=None, out=None):
+    header = f"{'workload':<10} {'phase':<8} {'median ms':>10} {'p90 ms':>9} {'min ms':>9}"
+    if baseline is not None:
+        header += f" {'baseline':>9} {'change':>8}"
+    print(header, file=out)
+    for name, phases in results.items():
+        for phase, summary in phases.items():
+            line = (f"{name:<10} {phase:<8} {summary['median'] * 1e3:>10.2f} "
+                    f"{summary['p90'] * 1e3:>9.2f} {summary['min'] * 1e3:>9.2f}")
+            base = (baseline or {}).get(name, {}).get(phase)
+            if base is not None:
+                change = summary["median"] / base["median"] - 1 if base["median"] else 0.0
+                line += f" {base['median'] * 1e3:>9.2f} {change:>+8.1%}"
+            print(line, file=out)
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(prog="main.py bench",
+                                         description="Time each transpiler phase and the generated code.")
+    arg_parser.add_argument("workloads", nargs="*", metavar="WORKLOAD",
+                            help=f"workloads to run (default: all of {', '.join(WORKLOADS)})")
+    arg_parser.add_argument("-n", "--repeat", type=int, default=5, help="runs per workload (default: 5)")
+    arg_parser.add_argument("--scale", type=float, default=1.0, help="multiply workload sizes (default: 1.0)")
+    arg_parser.add_argument("--save", metavar="PATH", help="write the results to this JSON file")
+    arg_parser.add_argument("--baseline", metavar="PATH", help="compare against results saved with --save")
+    arg_parser.add_argument("--threshold", type=float, default=0.1,
+                            help="slowdown of a median that counts as a regression (default: 0.1 = 10%%)")
+    return arg_parser
+
+
+def main(argv=None):
+    arg_parser = build_arg_parser()
+    args = arg_parser.parse_args(argv)
+    unknown = [name for name in args.workloads if name not in WORKLOADS]
+    if unknown:
+        arg_parser.error(f"unknown workload {unknown[0]!r} (choose from {', '.join(WORKLOADS)})")
+    if args.repeat < 1:
+        arg_parser.error("--repeat must be at least 1")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            saved = json.load(file)
+        baseline = saved["results"]
+        if saved.get("scale") != args.scale:
+            print(f"Warning: baseline was recorded at --scale {saved.get('scale')}, not {args.scale}")
+
+    results = {name: run_workload(name, args.scale, args.repeat) for name in args.workloads or WORKLOADS}
+    report(results, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({"scale": args.scale, "repeat": args.repeat, "python": platform.python_version(),
+                       "results": results}, file, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for name, phase, ratio in regressions:
+            print(f"REGRESSION {name} {phase}: {ratio:.2f}x the baseline median")
+        if regressions:
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+    return 0
@@ -0,0 +1,69 @@
+"""Size and speed of the syntax tree pipeline: parse, type inference and code generation.
+
+Run from the repository root:  python benchmarks/bench_ast.py [functions]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import codegen
+import inference
+import lexer
+import nodes
+from parser import Parser
+
+FUNCTION = """
+func f{i}(a, b) {{
+    Let total = 0
+    Run while(total < a * b) {{
+        agar(total % 2 == 0) {{
+            total = total + a
+        }}
+        warna {{
+            total = total + b - 1
+        }}
+    }}
+    give "f{i}: " + total
+}}
+out(f{i}({i}, 3))
+line
+"""
+
+
+def generate(functions):
+    return "".join(FUNCTION.format(i=i) for i in range(functions))
+
+
+def timed(step):
+    start = time.perf_counter()
+    result = step()
+    return result, time.perf_counter() - start
+
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    source = generate(functions)
+
+    program, parse_time = timed(lambda: Parser(lexer.iter_lex(source)).parse())
+
+    tracemalloc.start()
+    traced_program = Parser(lexer.iter_lex(source)).parse()
+    ast_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced_program
+
+    _, infer_time = timed(lambda: inference.annotate(program))
+    python_code, codegen_time = timed(lambda: codegen.generate(program))
+
+    node_count = sum(1 for _ in nodes.walk(program))
+    print(f"source: {len(source) / 1e6:.2f} MB, {node_count} nodes, AST {ast_bytes / 1e6:.1f} MB "
+          f"({ast_bytes / node_count:.0f} B/node), generated {len(python_code) / 1e6:.2f} MB")
+    print(f"parse {parse_time:.3f} s, inference {infer_time:.3f} s, codegen {codegen_time:.3f} s, "
+          f"total {parse_time + infer_time + codegen_time:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Transpile+compile time of the text backend against compiling an astgen tree directly.
+
+The text backend generates Python source that compile() must tokenize and parse
+again; the ast backend hands compile() the tree. Both start from the same parsed
+program with the tree passes applied, so only code generation and compile differ.
+ast.unparse, needed only to write output.py from a tree, is timed separately.
+
+Run from the repository root:  python benchmarks/bench_backend.py [WORKLOAD ...]
+"""
+import ast
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import astgen
+import bench
+import codegen
+import rid
+
+REPEAT = 5
+
+
+def best(step, program):
+    """Fastest of REPEAT runs of step; code generation does not modify program"""
+    times = []
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        result = step(program)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def text_backend(program):
+    return compile(codegen.generate(program), "<bench>", "exec")
+
+
+def ast_backend(program):
+    return compile(astgen.generate(program), "<bench>", "exec")
+
+
+def main():
+    names = sys.argv[1:] or list(bench.WORKLOADS)
+    print(f"{'workload':<10} {'text ms':>9} {'ast ms':>9} {'speedup':>8} {'unparse ms':>11}")
+    with open(os.devnull, 'w') as devnull:
+        for name in names:
+            program = rid.run_passes(rid.parse_source(bench.WORKLOADS[name](1.0)))
+            text_time, text_code = best(text_backend, program)
+            ast_time, ast_code = best(ast_backend, program)
+            unparse_time, _ = best(lambda tree: ast.unparse(astgen.generate(tree)), program)
+            for code in (text_code, ast_code):
+                rid.run_code(code, stdin="", stdout=devnull)
+            print(f"{name:<10} {text_time * 1e3:>9.1f} {ast_time * 1e3:>9.1f} {text_time / ast_time:>7.2f}x "
+                  f"{unparse_time * 1e3:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Regression benchmark for `+` chains: generated code size and runtime per chain length.
+
+Run from the repository root:  python benchmarks/bench_concat.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import rid
+
+
+def chain_source(length):
+    terms = " + ".join("name" if i % 2 == 0 else "n" for i in range(length))
+    return f'Let name = "x"\nLet n = 1\nLet s = {terms}\n'
+
+
+def main():
+    print(f"{'terms':>5} {'code bytes':>10} {'transpile us':>13} {'run us':>8}")
+    for length in range(1, 31):
+        source = chain_source(length)
+        python_code = rid.transpile_source(source)
+        code = compile(python_code, "<bench>", "exec")
+        loops = 200
+        transpile_time = timeit.timeit(lambda: rid.transpile_source(source), number=loops) / loops
+        run_time = timeit.timeit(lambda: exec(code, {}), number=loops) / loops
+        print(f"{length:>5} {len(python_code):>10} {transpile_time * 1e6:>13.1f} {run_time * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Throughput of reading piped input: in() per line, and the bulk read() and numbers().
+
+A file of LINES random integers, one per line, is piped into each program, which
+sums the numbers (or measures the text) and prints one line. "in() with input()"
+is the same generated program with the _rid_input helper in() had before the
+buffered reader: a builtin input() call per line. "raw read" is Python reading
+the bytes and nothing else, the floor for any reader. Times include interpreter
+startup.
+
+Run from the repository root:  python benchmarks/bench_input.py [LINES]
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import rid
+
+OLD_INPUT = (
+    "def _rid_input(prompt=''):\n"
+    "    _rid_flush()\n"
+    "    return input(prompt)\n"
+)
+
+PROGRAMS = {
+    "in() per line": """
+Let total = 0
+Run({lines}) {{
+    total = total + num(in())
+}}
+out(total)
+""",
+    "in() until eof()": """
+Let total = 0
+Run while (eof() == False) {{
+    total = total + num(in())
+}}
+out(total)
+""",
+    "numbers()": """
+out(sum(numbers()))
+""",
+    "numbers(path)": """
+out(sum(numbers("{path}")))
+""",
+    "read()": """
+out(len(read()))
+""",
+}
+
+
+def run(script, data_path):
+    with open(data_path, "rb") as data:
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, script], stdin=data, capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, result.stdout.strip()
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+    with tempfile.TemporaryDirectory() as directory:
+        data_path = os.path.join(directory, "data.txt")
+        generator = random.Random(0)
+        with open(data_path, "w") as data:
+            data.writelines(f"{generator.randrange(-10 ** 6, 10 ** 6)}\n" for _ in range(lines))
+        size = os.path.getsize(data_path) / 1e6
+
+        scripts = {}
+        for label, template in PROGRAMS.items():
+            scripts[label] = rid.transpile_source(template.format(lines=lines, path=data_path))
+        main_start = scripts["in() per line"].index("def _rid_main")
+        old = scripts["in() per line"]
+        scripts["in() with input()"] = old[:main_start] + OLD_INPUT + old[main_start:]
+        scripts["raw read"] = "import sys\nprint(len(sys.stdin.buffer.read()))\n"
+
+        print(f"{lines} lines, {size:.1f} MB piped on stdin\n")
+        print(f"{'reader':<20}{'s':>8}{'MB/s':>9}{'Mlines/s':>10}   output")
+        for label in ("in() with input()", "in() per line", "in() until eof()", "numbers()", "numbers(path)",
+                      "read()", "raw read"):
+            script = os.path.join(directory, "program.py")
+            with open(script, "w") as file:
+                file.write(scripts[label])
+            seconds, output = run(script, data_path)
+            print(f"{label:<20}{seconds:>8.2f}{size / seconds:>9.1f}{lines / seconds / 1e6:>10.2f}   {output}")
+
+
+if __name__ == "__main__":
+    main()
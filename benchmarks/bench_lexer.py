@@ -0,0 +1,149 @@
+"""Lexing throughput on a generated ~10 MB RID file, against the original lexer.
+
+"baseline" is the character-at-a-time lexer lexer.lex replaced, kept here with
+today's keyword and symbol tables so both lex the same language. It builds a list
+of tuples, while lexer.lex fills a TokenBuffer.
+
+Run from the repository root:  python benchmarks/bench_lexer.py [size_mb]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import lexer
+from lexer import DELIMITERS, IDENTIFIER, KEYWORDS, NUMBER, OPERATORS, STRING
+
+CHUNK = '''~ generated block ~
+Let total_{i} = {i} * 2.5 + 7 % 3
+agar(total_{i} >= 10) {{
+    out("value " + word(total_{i}) + " is large")
+    line
+}}
+warna {{
+    total_{i} = total_{i} - 1
+}}
+'''
+
+
+def baseline_lex(words):
+    position = 0
+    tokens = []
+    line_number = 1
+
+    while position < len(words):
+        char = words[position]
+
+        if char == '\n':
+            line_number += 1
+            position += 1
+
+        elif char.isspace():
+            position += 1
+
+        elif char in DELIMITERS:
+            tokens.append((char, DELIMITERS[char], line_number))
+            position += 1
+
+        elif char in OPERATORS or char == "!":
+            if position + 1 < len(words):
+                two_char = char + words[position + 1]
+                if two_char in OPERATORS:
+                    tokens.append((two_char, OPERATORS[two_char], line_number))
+                    position += 2
+                    continue
+
+            if char in OPERATORS:
+                tokens.append((char, OPERATORS[char], line_number))
+            position += 1
+
+        elif char.isalpha() or char == "_":
+            current = ""
+            start_line = line_number
+            while position < len(words) and (words[position].isalnum() or words[position] == "_"):
+                current += words[position]
+                position += 1
+
+            tokens.append((current, KEYWORDS.get(current, IDENTIFIER), start_line))
+
+        elif char == '"':
+            start_line = line_number
+            position += 1
+            current = ""
+            while position < len(words) and words[position] != '"':
+                if words[position] == '\n':
+                    line_number += 1
+                current += words[position]
+                position += 1
+            position += 1
+            tokens.append((current, STRING, start_line))
+
+        elif char.isdigit():
+            current = ""
+            dot_count = 0
+            start_line = line_number
+
+            while position < len(words) and (words[position].isdigit() or words[position] == "."):
+                if words[position] == ".":
+                    dot_count += 1
+                    if dot_count > 1:
+                        break
+                current += words[position]
+                position += 1
+
+            tokens.append((current, NUMBER, start_line))
+
+        elif char == "~":
+            position += 1
+            while position < len(words) and words[position] != "~":
+                if words[position] == '\n':
+                    line_number += 1
+                position += 1
+            position += 1
+
+        else:
+            position += 1
+
+    return tokens
+
+
+def generate(size_bytes):
+    parts = []
+    size = 0
+    i = 0
+    while size < size_bytes:
+        chunk = CHUNK.format(i=i)
+        parts.append(chunk)
+        size += len(chunk)
+        i += 1
+    return "".join(parts)
+
+
+def best_time(lex, source):
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        tokens = lex(source)
+        best = min(best, time.perf_counter() - start)
+    return best, len(tokens)
+
+
+def measure(label, source):
+    megabytes = len(source) / (1024 * 1024)
+    baseline, count = best_time(baseline_lex, source)
+    seconds, _ = best_time(lexer.lex, source)
+    print(f"{label:>12}: {megabytes:.1f} MB, {count} tokens; baseline {baseline:.3f} s ({megabytes / baseline:.1f} MB/s), "
+          f"lexer.lex {seconds:.3f} s ({megabytes / seconds:.1f} MB/s), {baseline / seconds:.2f}x")
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    size_bytes = int(size_mb * 1024 * 1024)
+
+    measure("mixed code", generate(size_bytes))
+    measure("long string", 'Let s = "' + "x" * size_bytes + '"')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Whole-list operations on 10M-element RID lists, with NumPy and with the array-module fallback.
+
+The first table times each list builtin and operator on its own, through the same
+runtime helpers generated programs use. The second runs one computation written
+three ways: as list operations, as a Run loop that reads and writes list elements
+one at a time, and as the Run loop of scalar arithmetic RID programs needed before
+lists existed. RID_NUMPY=0 selects the fallback, as it would for a program.
+
+Run from the repository root:  python benchmarks/bench_lists.py [SIZE]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import rid
+import runtime
+
+OPERATIONS = {
+    "xs + ys": lambda ns: ns["xs"] + ns["ys"],
+    "xs * 3": lambda ns: ns["xs"] * 3,
+    "xs / ys": lambda ns: ns["xs"] / ns["ys"],
+    "xs % 7": lambda ns: ns["xs"] % 7,
+    "-xs": lambda ns: -ns["xs"],
+    "sum(xs)": lambda ns: ns["_rid_sum"](ns["xs"]),
+    "min(xs)": lambda ns: ns["_rid_min"](ns["xs"]),
+    "max(xs)": lambda ns: ns["_rid_max"](ns["xs"]),
+    "range(n)": lambda ns: ns["_rid_range"](ns["n"]),
+    "fill(n, 3)": lambda ns: ns["_rid_fill"](ns["n"], 3),
+}
+
+PROGRAMS = {
+    "list operations": """
+Let xs = range({n})
+out(sum((xs * 3 + 1) % 7))
+""",
+    "element loop": """
+Let xs = range({n})
+Run({n}, i) {{
+    xs[i] = (xs[i] * 3 + 1) % 7
+}}
+out(sum(xs))
+""",
+    "scalar loop": """
+Let total = 0
+Run({n}, i) {{
+    total = total + (i * 3 + 1) % 7
+}}
+out(total)
+""",
+}
+
+STORAGES = {"numpy": "1", "array": "0"}
+
+
+def timed(step):
+    start = time.perf_counter()
+    result = step()
+    return time.perf_counter() - start, result
+
+
+def helpers(size):
+    """Namespace of the list helpers with two lists of `size` elements"""
+    namespace = {}
+    exec("".join(runtime.prelude({"_rid_values", "_rid_list"})), namespace)
+    namespace["n"] = size
+    namespace["xs"] = namespace["_rid_range"](size)
+    namespace["ys"] = namespace["_rid_fill"](size, 3)
+    return namespace
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    try:
+        import numpy
+    except ImportError:
+        storages = {"array": "0"}
+        print("NumPy is not installed; timing the array fallback only\n")
+    else:
+        storages = STORAGES
+
+    print(f"{'operation':<12}" + "".join(f"{name + ' ms':>12}" for name in storages) + f"   ({size} elements)")
+    spaces = {}
+    for name, flag in storages.items():
+        os.environ["RID_NUMPY"] = flag
+        spaces[name] = helpers(size)
+    for label, operation in OPERATIONS.items():
+        times = [timed(lambda: operation(spaces[name]))[0] for name in storages]
+        print(f"{label:<12}" + "".join(f"{seconds * 1e3:>12.1f}" for seconds in times))
+    spaces.clear()
+
+    print(f"\n{'program':<16}" + "".join(f"{name + ' s':>10}" for name in storages) + "   output")
+    for label, template in PROGRAMS.items():
+        code = rid.compile_source(template.format(n=size))
+        times, output = [], None
+        for flag in storages.values():
+            os.environ["RID_NUMPY"] = flag
+            stdout = io.StringIO()
+            seconds, _ = timed(lambda: rid.run_code(code, stdin="", stdout=stdout))
+            times.append(seconds)
+            output = stdout.getvalue()
+        print(f"{label:<16}" + "".join(f"{seconds:>10.2f}" for seconds in times) + f"   {output}")
+
+
+if __name__ == "__main__":
+    main()
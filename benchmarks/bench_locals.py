@@ -0,0 +1,55 @@
+"""A million-iteration loop with top-level code at module level (every variable a
+global) versus inside the generated _rid_main() (every variable a fast local).
+
+Run from the repository root:  python benchmarks/bench_locals.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import codegen
+import inference
+import rid
+import runtime
+
+ITERATIONS = 1000000
+
+SOURCE = f"""
+Let total = 0
+Let odd = 0
+Run({ITERATIONS}, i) {{
+    total = total + i * 3 % 7
+    agar (i % 2 == 1) {{
+        odd = odd + 1
+    }}
+}}
+"""
+
+
+def module_level(source):
+    """What codegen emitted before top-level code was wrapped in _rid_main()"""
+    program = rid.parse_source(source)
+    inference.annotate(program)
+    generator = codegen.CodeGenerator()
+    generator.statement_list(program.body)
+    return "\n".join(runtime.prelude(generator.helpers) + generator.output)
+
+
+def run(python_code):
+    code = compile(python_code, "<bench>", "exec")
+    start = time.perf_counter()
+    exec(code, {})
+    return time.perf_counter() - start
+
+
+def main():
+    for label, python_code in (("module globals", module_level(SOURCE)),
+                               ("_rid_main locals", rid.transpile_source(SOURCE))):
+        elapsed = min(run(python_code) for _ in range(3))
+        print(f"{label:>16}: {elapsed:.3f} s  ({ITERATIONS / elapsed / 1e6:.2f} M iterations/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Transpile time for deeply nested programs (depth 50-200).
+
+Each level holds a few statements and one nested `agar` block, so the total number
+of lines grows with depth. Time per generated line should stay flat as depth grows.
+Only transpilation is measured: CPython itself refuses more than 100 indentation levels.
+
+Run from the repository root:  python benchmarks/bench_nesting.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import rid
+
+STATEMENTS_PER_LEVEL = 20
+
+
+def generate(depth):
+    lines = ["Let x = 0"]
+    for level in range(depth):
+        lines.extend(f"x = x + {level}" for _ in range(STATEMENTS_PER_LEVEL))
+        lines.append(f"agar(x > {level}) {{")
+    lines.append("out(x)")
+    lines.extend("}" for _ in range(depth))
+    return "\n".join(lines)
+
+
+def main():
+    print(f"{'depth':>5} {'lines':>7} {'transpile ms':>13} {'us/line':>8}")
+    for depth in (50, 100, 150, 200):
+        source = generate(depth)
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            python_code = rid.transpile_source(source)
+            best = min(best, time.perf_counter() - start)
+        lines = python_code.count("\n") + 1
+        print(f"{depth:>5} {lines:>7} {best * 1e3:>13.1f} {best * 1e6 / lines:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
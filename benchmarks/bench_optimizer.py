@@ -0,0 +1,71 @@
+"""Constant folding (-O): checks that every example prints the same output with and
+without the optimiser, then times a loop whose body is mostly constant expressions.
+
+Run from the repository root:  python benchmarks/bench_optimizer.py
+"""
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import rid
+
+ITERATIONS = 1000000
+
+# Input for the examples that read from the keyboard
+EXAMPLE_INPUT = {
+    "guess_the_number.rid": "50\n30\n42\n10\n",
+    "comprehensive_test.rid": "Bob\n7\n",
+}
+
+SOURCE = f"""
+Let total = 0
+Let label = ""
+Run({ITERATIONS}) {{
+    total = total + 60 * 60 * 24 - (7 * 3) % 5
+    agar (1 > 2) {{
+        label = "never" + 1
+    }} warna {{
+        label = "seconds: " + 86400
+    }}
+}}
+"""
+
+
+def check_examples():
+    """Return the names of examples whose output changes under -O"""
+    mismatched = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "examples", "*.rid"))):
+        name = os.path.basename(path)
+        with open(path) as file:
+            source = file.read()
+        stdin = EXAMPLE_INPUT.get(name, "")
+        outputs = [rid.run_source(source, stdin=stdin, optimize=optimize) for optimize in (False, True)]
+        status = "ok" if outputs[0] == outputs[1] else "MISMATCH"
+        if status != "ok":
+            mismatched.append(name)
+        print(f"{name:>24}: {status}")
+    return mismatched
+
+
+def run(python_code):
+    code = compile(python_code, "<bench>", "exec")
+    start = time.perf_counter()
+    exec(code, {})
+    return time.perf_counter() - start
+
+
+def main():
+    mismatched = check_examples()
+    print()
+    for label, optimize in (("default", False), ("-O", True)):
+        elapsed = min(run(rid.transpile_source(SOURCE, optimize=optimize)) for _ in range(3))
+        print(f"{label:>8}: {elapsed:.3f} s  ({ITERATIONS / elapsed / 1e6:.2f} M iterations/s)")
+    sys.exit(1 if mismatched else 0)
+
+
+if __name__ == "__main__":
+    main()
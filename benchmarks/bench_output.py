@@ -0,0 +1,61 @@
+"""Output throughput: 10M out() calls through the buffered runtime writer versus the
+print(value, end='') code the transpiler used to emit, with stdout going to os.devnull.
+
+Run from the repository root:  python benchmarks/bench_output.py [count]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import rid
+
+COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+
+SOURCE = f"""
+Let i = 0
+Run({COUNT // 10}) {{
+    Run(9) {{
+        out(i)
+        out(" ")
+        i = i + 1
+    }}
+    out(i)
+    line
+    i = i + 1
+}}
+"""
+
+# Equivalent of what the transpiler generated before out() was buffered
+PRINT_CODE = f"""
+i = 0
+for _ in range(int({COUNT // 10})):
+    for _ in range(int(9)):
+        print(i, end='')
+        print(" ", end='')
+        i = i + 1
+    print(i, end='')
+    print()
+    i = i + 1
+"""
+
+
+def run(code, stdout):
+    start = time.perf_counter()
+    rid.run_code(code, stdout=stdout)
+    return time.perf_counter() - start
+
+
+def main():
+    buffered = rid.compile_source(SOURCE)
+    unbuffered = compile(PRINT_CODE, "<print>", "exec")
+
+    with open(os.devnull, "w") as devnull:
+        for label, code in (("print()", unbuffered), ("buffered out()", buffered)):
+            elapsed = run(code, devnull)
+            print(f"{label:>16}: {elapsed:.3f} s  ({COUNT / elapsed / 1e6:.2f} M values/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Scaling of `Run parallel` with 1, 2, 4 and 8 worker processes.
+
+Each program is timed as an ordinary Run loop and as a Run parallel loop with
+RID_WORKERS set to each worker count. With one worker the parallel loop runs
+in-process, so that column shows the cost of the chunk function alone; the
+others include forking the pool and gathering the partial results. Speed-ups
+above the machine's CPU count are not to be expected.
+
+Run from the repository root:  python benchmarks/bench_parallel.py [ITERATIONS]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import rid
+
+WORKERS = (1, 2, 4, 8)
+
+# {loop} is "Run" or "Run parallel"; the sequential form ignores the reduction name
+PROGRAMS = {
+    "arithmetic": """
+Let total = 0
+{loop}({n}, i{reduction}) {{
+    total = total + (i * i + 3 * i) % 7
+}}
+out(total)
+""",
+    "collatz steps": """
+Let total = 0
+{loop}({n}, i{reduction}) {{
+    Let x = i % 1000 + 1
+    Run while (x != 1) {{
+        agar (x % 2 == 0) {{
+            x = num(x / 2)
+        }} warna {{
+            x = 3 * x + 1
+        }}
+        total = total + 1
+    }}
+}}
+out(total)
+""",
+}
+
+
+def timed(code):
+    stdout = io.StringIO()
+    start = time.perf_counter()
+    rid.run_code(code, stdin="", stdout=stdout)
+    return time.perf_counter() - start, stdout.getvalue()
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    print(f"{iterations} iterations, {os.cpu_count()} CPUs\n")
+    print(f"{'program':<16}{'Run s':>8}" + "".join(f"{f'{count}w s':>8}" for count in WORKERS)
+          + "".join(f"{f'{count}w x':>7}" for count in WORKERS[1:]) + "   output")
+
+    for label, template in PROGRAMS.items():
+        sequential = rid.compile_source(template.format(loop="Run", n=iterations, reduction=""))
+        parallel = rid.compile_source(template.format(loop="Run parallel", n=iterations, reduction=", total"))
+        baseline, output = timed(sequential)
+        times = []
+        for count in WORKERS:
+            os.environ["RID_WORKERS"] = str(count)
+            seconds, result = timed(parallel)
+            if result != output:
+                raise AssertionError(f"{label}: {count} workers printed {result!r}, Run printed {output!r}")
+            times.append(seconds)
+        speedups = [times[0] / seconds for seconds in times[1:]]
+        print(f"{label:<16}{baseline:>8.2f}" + "".join(f"{seconds:>8.2f}" for seconds in times)
+              + "".join(f"{speedup:>7.2f}" for speedup in speedups) + f"   {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Recursive functions: fib(30) with and without --memoize, and a tail-recursive
+factorial(10000) lowered to a loop versus the plain recursive def emitted before.
+
+Run from the repository root:  python benchmarks/bench_recursion.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import rid
+
+FIB = """
+func fib(n) {
+    agar (n < 2) {
+        give n
+    }
+    give fib(n - 1) + fib(n - 2)
+}
+Let result = fib(30)
+"""
+
+FACTORIAL = """
+func factorial(n, acc) {
+    agar (n <= 1) {
+        give acc
+    }
+    give factorial(n - 1, acc * n)
+}
+Let result = factorial(10000, 1)
+"""
+
+# What the transpiler generated for FACTORIAL before tail calls were lowered
+RECURSIVE_FACTORIAL = """
+def factorial(n, acc):
+    if n <= 1:
+        return acc
+    return factorial(n - 1, acc * n)
+result = factorial(10000, 1)
+"""
+
+
+def run(code):
+    start = time.perf_counter()
+    try:
+        rid.run_code(code)
+    except RecursionError:
+        return None
+    return time.perf_counter() - start
+
+
+def report(label, elapsed):
+    print(f"{label:>34}: " + ("RecursionError" if elapsed is None else f"{elapsed * 1000:9.1f} ms"))
+
+
+def main():
+    report("fib(30)", run(rid.compile_source(FIB)))
+    report("fib(30) --memoize", run(rid.compile_source(FIB, memoize=0)))
+
+    recursive = compile(RECURSIVE_FACTORIAL, "<bench>", "exec")
+    report("factorial(10000) recursive", run(recursive))
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(20000)
+    try:
+        report("factorial(10000) recursive, limit 20000", run(recursive))
+    finally:
+        sys.setrecursionlimit(limit)
+    report("factorial(10000) tail call as loop", run(rid.compile_source(FACTORIAL)))
+
+
+if __name__ == "__main__":
+    main()
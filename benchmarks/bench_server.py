@@ -0,0 +1,82 @@
+"""Load test for `main.py --serve`: requests/second and latency over a Unix socket at
+several client concurrency levels, next to the cost of one `python main.py` per request.
+
+Run from the repository root:  python benchmarks/bench_server.py
+"""
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+REQUESTS_PER_CLIENT = 200
+CONCURRENCY = (1, 4, 16)
+
+with open(os.path.join(ROOT, "examples", "fibonacci.rid")) as file:
+    SOURCE = file.read()
+
+OPS = ({"op": "transpile", "source": SOURCE},
+       {"op": "check", "source": SOURCE},
+       {"op": "run", "source": SOURCE})
+
+
+async def client(path, client_id, latencies):
+    reader, writer = await asyncio.open_unix_connection(path, limit=2 ** 26)
+    for i in range(REQUESTS_PER_CLIENT):
+        request = dict(OPS[i % len(OPS)], id=f"{client_id}-{i}")
+        start = time.perf_counter()
+        writer.write(json.dumps(request).encode() + b"\n")
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        assert response["ok"] and response["id"] == request["id"], response
+    writer.close()
+
+
+async def load(path, clients):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(path, n, latencies) for n in range(clients)))
+    return time.perf_counter() - start, latencies
+
+
+def wait_for(path, process):
+    while not os.path.exists(path):
+        if process.poll() is not None:
+            sys.exit("server exited")
+        time.sleep(0.05)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        rid_file = os.path.join(directory, "program.rid")
+        with open(rid_file, "w") as file:
+            file.write(SOURCE)
+        start = time.perf_counter()
+        for _ in range(5):
+            subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), rid_file,
+                            os.path.join(directory, "out.py"), "--no-cache"], capture_output=True, check=True)
+        print(f"{'process per request':>22}: {5 / (time.perf_counter() - start):8.1f} requests/s")
+
+        path = os.path.join(directory, "rid.sock")
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "main.py"), "--serve", "--socket", path],
+                                  stderr=subprocess.DEVNULL)
+        try:
+            wait_for(path, server)
+            asyncio.run(load(path, 1))  # warm up the workers
+            for clients in CONCURRENCY:
+                elapsed, latencies = asyncio.run(load(path, clients))
+                latencies.sort()
+                p99 = latencies[int(len(latencies) * 0.99) - 1]
+                print(f"{f'server, {clients} clients':>22}: {len(latencies) / elapsed:8.1f} requests/s"
+                      f"  (median {statistics.median(latencies) * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms)")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
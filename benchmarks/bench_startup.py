@@ -0,0 +1,42 @@
+"""Per-script overhead of running through a `python` subprocess versus in-process.
+
+Run from the repository root:  python benchmarks/bench_startup.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import rid
+
+SOURCE = 'Let name = "World"\nout("Hello, " + name)\nline\n'
+RUNS = 50
+
+
+def main():
+    python_code = rid.transpile_source(SOURCE)
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as file:
+        file.write(python_code)
+
+    try:
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            subprocess.run([sys.executable, file.name], capture_output=True, check=True)
+        subprocess_time = (time.perf_counter() - start) / RUNS
+    finally:
+        os.unlink(file.name)
+
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        rid.run_source(SOURCE)
+    in_process_time = (time.perf_counter() - start) / RUNS
+
+    print(f"subprocess: {subprocess_time * 1e3:8.2f} ms per script")
+    print(f"in-process: {in_process_time * 1e3:8.2f} ms per script")
+
+
+if __name__ == "__main__":
+    main()
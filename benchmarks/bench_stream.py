@@ -0,0 +1,41 @@
+"""Peak memory of parsing from a materialised token list versus the streaming lexer.
+
+Run from the repository root:  python benchmarks/bench_stream.py [statements]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import lexer
+from parser import Parser
+
+
+def generate(statements):
+    lines = ["Let total = 0"]
+    for i in range(statements):
+        lines.append(f"total = total + {i} * 2 - 1")
+    return "\n".join(lines)
+
+
+def measure(label, make_tokens, source):
+    tracemalloc.start()
+    start = time.perf_counter()
+    program = Parser(make_tokens(source)).parse()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>10}: {elapsed:.2f} s, peak {peak / 1e6:.1f} MB ({len(program.body)} statements)")
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    source = generate(statements)
+    measure("list", lexer.lex, source)
+    measure("stream", lexer.iter_lex, source)
+
+
+if __name__ == "__main__":
+    main()
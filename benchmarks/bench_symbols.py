@@ -0,0 +1,104 @@
+"""Memory of the parser's symbol table and of interned names, on a program with many variables.
+
+The program declares VARIABLES globals, each read once and assigned once more, plus
+a function that reads them. Reported:
+
+* the SymbolTable after parsing, per declared name, next to a flat {name: node}
+  dict (what the parser used to keep) and a __slots__ record per name;
+* how much more the syntax tree would hold if every Name, Let and Assign node had
+  its own copy of the name instead of the interned one;
+* the time of a lookup from inside a function (two scopes deep).
+
+Run from the repository root:  python benchmarks/bench_symbols.py [VARIABLES]
+"""
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import lexer
+import nodes
+import symbols
+from parser import Parser
+
+
+class Record:
+    __slots__ = ("kind", "type", "line")
+
+    def __init__(self, kind, type_name, line):
+        self.kind = kind
+        self.type = type_name
+        self.line = line
+
+
+def generate(variables):
+    lines = [f"Let v{index} = {index}" for index in range(variables)]
+    lines.extend(f"v{index} = v{index} + 1" for index in range(variables))
+    lines.append("func total() {")
+    lines.append("    give " + " + ".join(f"v{index}" for index in range(0, variables, max(1, variables // 50))))
+    lines.append("}")
+    lines.append("out(total())")
+    return "\n".join(lines)
+
+
+def measure(build):
+    """Bytes still allocated by build()'s result, and the result"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+
+def main():
+    variables = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    source = generate(variables)
+
+    start = time.perf_counter()
+    parser = Parser(lexer.iter_lex(source))
+    program = parser.parse()
+    parse_time = time.perf_counter() - start
+    names = list(parser.symbols.global_names())
+    declarations = [node for node in program.body if isinstance(node, nodes.Let)]
+
+    def symbol_table():
+        table = symbols.SymbolTable()
+        for node in declarations:
+            table.declare(node.name, symbols.VARIABLE, node.line, node.value)
+        return table
+
+    table_bytes, table = measure(symbol_table)
+    flat_bytes, _ = measure(lambda: {node.name: node.value for node in declarations})
+    record_bytes, _ = measure(lambda: {node.name: Record(symbols.VARIABLE, "int", node.line) for node in declarations})
+
+    print(f"{variables} variables, parsed in {parse_time:.2f} s")
+    print(f"{'SymbolTable':<28} {table_bytes / len(names):>6.1f} B/name")
+    print(f"{'flat dict of nodes':<28} {flat_bytes / len(names):>6.1f} B/name")
+    print(f"{'dict of __slots__ records':<28} {record_bytes / len(names):>6.1f} B/name")
+
+    # Give every reference its own string, as the parser did before interning
+    named = [node for node in nodes.walk(program) if isinstance(node, (nodes.Name, nodes.Let, nodes.Assign))]
+    distinct = len({id(node.name) for node in named})
+
+    def copy_names():
+        for node in named:
+            node.name = node.name[:1] + node.name[1:]
+
+    copy_bytes, _ = measure(copy_names)
+    print(f"\n{len(named)} name references share {distinct} strings; "
+          f"separate copies would add {copy_bytes / 1e6:.1f} MB")
+
+    table.enter()
+    table.declare("local")
+    name = names[len(names) // 2]
+    count = 1000000
+    seconds = timeit.timeit(lambda: name in table, number=count)
+    print(f"lookup of a global from a function scope: {seconds / count * 1e9:.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
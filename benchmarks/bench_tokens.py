@@ -0,0 +1,70 @@
+"""Memory and parse time of token representations on a ~1M-token input.
+
+Compares the compact TokenBuffer returned by lexer.lex with a list of Token objects
+and with the (value, type_name, line) tuples the lexer used to produce. Parse time is
+measured from a plain list[Token], the representation the compact store replaced,
+from a TokenBuffer, which builds a Token for each element the parser reads, and
+streaming from lexer.iter_lex.
+
+Run from the repository root:  python benchmarks/bench_tokens.py [tokens]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import lexer
+from parser import Parser
+
+STATEMENT = "total = total + {i} * 2\n"
+TOKENS_PER_STATEMENT = 7
+
+
+def generate(tokens):
+    statements = tokens // TOKENS_PER_STATEMENT
+    return "Let total = 0\n" + "".join(STATEMENT.format(i=i) for i in range(statements))
+
+
+def traced(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def best_time(run, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    source = generate(count)
+
+    buffer, buffer_size, buffer_time = traced(lambda: lexer.lex(source))
+    _, objects_size, objects_time = traced(lambda: list(lexer.iter_lex(source)))
+    _, tuples_size, _ = traced(lambda: [(token.value, token.type, token.line) for token in buffer])
+
+    print(f"{len(buffer)} tokens")
+    print(f"  TokenBuffer:   {buffer_size / 1e6:8.1f} MB  ({buffer_size / len(buffer):5.1f} B/token), lexed in {buffer_time:.2f} s")
+    print(f"  list[Token]:   {objects_size / 1e6:8.1f} MB  ({objects_size / len(buffer):5.1f} B/token), lexed in {objects_time:.2f} s")
+    print(f"  list[tuple]:   {tuples_size / 1e6:8.1f} MB  ({tuples_size / len(buffer):5.1f} B/token)")
+
+    objects = list(lexer.iter_lex(source))
+    print(f"  parse from list[Token]: {best_time(lambda: Parser(objects).parse()):.2f} s")
+    del objects
+    print(f"  parse from TokenBuffer: {best_time(lambda: Parser(buffer).parse()):.2f} s")
+    print(f"  lex + parse streaming:  {best_time(lambda: Parser(lexer.iter_lex(source)).parse()):.2f} s")
+
+
+if __name__ == "__main__":
+    main()
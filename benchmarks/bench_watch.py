@@ -0,0 +1,82 @@
+"""Save-to-output latency of --watch after a one-line edit, versus transpiling the whole
+file from scratch. Edits go to a generated file of a few thousand statements.
+
+Run from the repository root:  python benchmarks/bench_watch.py
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import rid
+import watch
+
+BLOCKS = 1000
+EDITS = 10
+
+BLOCK = """Let v{i} = {i} + 2 * {i}
+out("v{i} = " + v{i})
+line
+agar (v{i} > 3) {{
+    v{i} = v{i} - 1
+}} warna {{
+    out(v{i})
+}}
+func f{i}(a, b) {{
+    give a + b * v{i}
+}}
+out(f{i}(1, 2))
+"""
+
+# Each edit rewrites a line in the middle of the file
+EDITS_BY_NAME = {
+    "change a literal": lambda i: (f"Let v{BLOCKS // 2} = {BLOCKS // 2} + 2 * {BLOCKS // 2}\n",
+                                   f"Let v{BLOCKS // 2} = {i} + 2 * {BLOCKS // 2}\n"),
+    "insert a line": lambda i: ("line\n", "line\n" * (i % 2 + 1)),
+    "change a type": lambda i: (f"Let v{BLOCKS // 2} = {BLOCKS // 2} + 2 * {BLOCKS // 2}\n",
+                                f"Let v{BLOCKS // 2} = \"{i}\"\n"),
+}
+
+
+def save(path, source):
+    with open(path, "w") as file:
+        file.write(source)
+
+
+def measure(watcher, path, source):
+    """Seconds from writing the file until the watcher has written the new output"""
+    save(path, source)
+    start = time.perf_counter()
+    while not watcher.poll():
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    source = "".join(BLOCK.format(i=i) for i in range(BLOCKS))
+    print(f"{len(source.splitlines())} lines")
+
+    full = []
+    for _ in range(3):
+        start = time.perf_counter()
+        rid.transpile_source(source)
+        full.append(time.perf_counter() - start)
+    print(f"{'full transpile':>18}: {min(full) * 1000:8.1f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "program.rid")
+        for label, edit in EDITS_BY_NAME.items():
+            watcher = watch.Watcher(path, os.path.join(directory, "program.py"))
+            measure(watcher, path, source)
+            times = []
+            for i in range(EDITS):
+                old, new = edit(i)
+                times.append(measure(watcher, path, source.replace(old, new, 1)))
+            print(f"{label:>18}: {statistics.median(times) * 1000:8.1f} ms median")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""On-disk cache of transpiled programs, similar to __pycache__.
+
+Each entry is one file holding the marshalled python_code, code object and line map
+(sourcemap.LineMap.to_bytes) for a cache key; the ast backend stores None for both
+python_code and the line map. Entries are evicted least-recently-used first once the directory grows
+beyond its size bound; a cache hit refreshes the entry's modification time.
+"""
+import marshal
+import os
+import tempfile
+
+import sourcemap
+
+CACHE_DIR_NAME = "__ridcache__"
+ENTRY_SUFFIX = ".ridc"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def cache_dir_for(filename):
+    """Return the cache directory used for a RID source file"""
+    return os.path.join(os.path.dirname(os.path.abspath(filename)), CACHE_DIR_NAME)
+
+
+class ProgramCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """Return the cached (python_code, code, line_map), or None on a miss"""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                python_code, code, line_map = marshal.load(file)
+            os.utime(path)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if line_map is not None:
+            line_map = sourcemap.LineMap.from_bytes(line_map)
+        return python_code, code, line_map
+
+    def put(self, key, python_code, code, line_map):
+        """Store an entry; failures (e.g. a read-only directory) are ignored"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as file:
+                line_map = line_map.to_bytes() if line_map is not None else None
+                marshal.dump((python_code, code, line_map), file)
+            os.replace(temp_path, self.path(key))
+        except OSError:
+            return
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if entry.name.endswith(ENTRY_SUFFIX):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+        except OSError:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
@@ -0,0 +1,333 @@
+"""Python source generation from the RID syntax tree."""
+
+import functions
+import inference
+import nodes
+import runtime
+import sourcemap
+
+# Binding strength of generated Python expressions, used to decide where parentheses go
+ATOM = 100
+UNARY = 80
+MULTIPLICATIVE = 60
+ADDITIVE = 50
+
+PRECEDENCE = {"+": ADDITIVE, "-": ADDITIVE, "*": MULTIPLICATIVE, "/": MULTIPLICATIVE, "%": MULTIPLICATIVE}
+
+# Runtime helpers each builtin needs; only those that create lists need "_rid_list"
+BUILTIN_HELPERS = {
+    "len": ("_rid_values",),
+    "sum": ("_rid_values",),
+    "min": ("_rid_values",),
+    "max": ("_rid_values",),
+    "fill": ("_rid_list",),
+    "range": ("_rid_list",),
+    "eof": ("_rid_out", "_rid_input"),
+    "read": ("_rid_out", "_rid_input"),
+    "numbers": ("_rid_out", "_rid_input", "_rid_list"),
+}
+
+
+class CodeGenerator:
+    def __init__(self):
+        self.output = []
+        # RID line of each output line, for sourcemap.LineMap
+        self.rid_lines = []
+        self.line = 0
+        self.indent = ""
+        self.helpers = set()
+        # Whether the code uses out() or line, so the program needs the output buffer flushed
+        self.prints = False
+        # Every FuncDef generated, nested ones included, for functions.shared_names
+        self.function_defs = []
+        # id() of each expression loops.py hoisted -> temporary holding its value
+        self.hoisted = {}
+        # Numbers for the next hoisted temporary and `Run parallel` body function
+        self.temporaries = 0
+        self.parallel_bodies = 0
+        self.statements = {
+            nodes.Let: self.assign_stmt,
+            nodes.Assign: self.assign_stmt,
+            nodes.SetItem: self.set_item,
+            nodes.Out: self.print_stmt,
+            nodes.Newline: self.newline_stmt,
+            nodes.ExprStmt: self.expr_stmt,
+            nodes.Run: self.loop_stmt,
+            nodes.ParallelRun: self.parallel_loop,
+            nodes.While: self.while_stmt,
+            nodes.If: self.conditional_stmt,
+            nodes.FuncDef: self.func_def,
+            nodes.Return: self.return_stmt,
+            nodes.TailCall: self.tail_call,
+        }
+        self.expressions = {
+            nodes.Number: self.number,
+            nodes.String: self.string,
+            nodes.Bool: self.boolean,
+            nodes.Name: self.name,
+            nodes.Neg: self.negation,
+            nodes.BinOp: self.binary,
+            nodes.Compare: self.compare,
+            nodes.Call: self.call,
+            nodes.Convert: self.convert,
+            nodes.Input: self.input_call,
+            nodes.List: self.list_literal,
+            nodes.Index: self.index,
+            nodes.Builtin: self.builtin,
+        }
+
+    def generate(self, program):
+        """Return the lines of Python source for a Program and the RID line of each"""
+        self.indent = "    "
+        self.statement_list(program.body)
+        return assemble(self.output, self.rid_lines, self.helpers, self.prints, functions.shared_names(self.function_defs))
+
+    def emit(self, line):
+        """Append one line of Python at the current indentation"""
+        self.output.append(self.indent + line)
+        self.rid_lines.append(self.line)
+
+    def statement_list(self, body):
+        for node in body:
+            self.line = node.line
+            self.statements[type(node)](node)
+
+    def block(self, body):
+        self.indent += "    "
+        if body:
+            self.statement_list(body)
+        else:
+            self.emit("pass")
+        self.indent = self.indent[:-4]
+
+    # Statements
+
+    def assign_stmt(self, node):
+        self.emit(f"{node.name} = {self.expression(node.value)}")
+
+    def set_item(self, node):
+        self.emit(f"{node.name}[{self.expression(node.index)}] = {self.expression(node.value)}")
+
+    def print_stmt(self, node):
+        self.helpers.add("_rid_out")
+        self.prints = True
+        value = self.expression(node.value)
+        if node.value.type != "str":
+            value = f"str({value})"
+        self.emit(f"_rid_out({value})")
+
+    def newline_stmt(self, node):
+        self.helpers.add("_rid_out")
+        self.prints = True
+        self.emit("_rid_out('\\n')")
+
+    def expr_stmt(self, node):
+        self.emit(self.expression(node.value))
+
+    def hoist(self, node):
+        """Evaluate the loop's invariant expressions into temporaries before it starts"""
+        for expr in node.hoisted:
+            name = f"_rid_inv{self.temporaries}"
+            self.temporaries += 1
+            self.emit(f"{name} = {self.expression(expr)}")
+            self.hoisted[id(expr)] = name
+
+    def loop_stmt(self, node):
+        self.hoist(node)
+        count = self.expression(node.count)
+        if node.count.type != "int":
+            count = f"int({count})"
+        self.emit(f"for {node.counter or '_'} in range({count}):")
+        self.block(node.body)
+
+    def parallel_loop(self, node):
+        """The body becomes a function returning the reduction over a range of counter values"""
+        self.hoist(node)
+        self.helpers.add("_rid_parallel")
+        count = self.expression(node.count)
+        if node.count.type != "int":
+            count = f"int({count})"
+        body = f"_rid_body{self.parallel_bodies}"
+        self.parallel_bodies += 1
+        self.emit(f"def {body}(_rid_start, _rid_stop):")
+        self.indent += "    "
+        self.emit(f"{node.reduction} = {inference.REDUCTION_IDENTITY[node.op].value}")
+        self.emit(f"for {node.counter} in range(_rid_start, _rid_stop):")
+        self.block(node.body)
+        self.line = node.line
+        self.emit(f"return {node.reduction}")
+        self.indent = self.indent[:-4]
+        self.emit(f"{node.reduction} = _rid_reduce('{node.op}', {node.reduction}, _rid_parallel({body}, {count}))")
+
+    def while_stmt(self, node):
+        self.hoist(node)
+        self.emit(f"while {self.expression(node.condition)}:")
+        self.block(node.body)
+
+    def conditional_stmt(self, node):
+        keyword = "if"
+        for condition, body in node.branches:
+            self.line = condition.line
+            self.emit(f"{keyword} {self.expression(condition)}:")
+            self.block(body)
+            keyword = "elif"
+        if node.orelse is not None:
+            self.line = node.line
+            self.emit("else:")
+            self.block(node.orelse)
+
+    def func_def(self, node):
+        self.function_defs.append(node)
+        if node.memoize is not None:
+            self.helpers.add("_rid_functools")
+            self.emit(f"@_rid_functools.lru_cache(maxsize={node.memoize or None}, typed=True)")
+        self.emit(f"def {node.name}({', '.join(node.params)}):")
+        if not node.loop:
+            self.block(node.body)
+            return
+
+        # Tail calls rebind the parameters and `continue`; anything else leaves the loop
+        body = node.body
+        if not isinstance(body[-1], (nodes.Return, nodes.TailCall)):
+            body = body + [nodes.Return(None, node.line)]
+        self.indent += "    "
+        self.emit("while True:")
+        self.block(body)
+        self.indent = self.indent[:-4]
+
+    def return_stmt(self, node):
+        if node.value is None:
+            self.emit("return")
+        else:
+            self.emit(f"return {self.expression(node.value)}")
+
+    def tail_call(self, node):
+        if node.params:
+            args = ", ".join(self.expression(arg) for arg in node.args)
+            self.emit(f"{', '.join(node.params)} = {args}")
+        self.emit("continue")
+
+    # Expressions
+
+    def expression(self, node):
+        if self.hoisted and id(node) in self.hoisted:
+            return self.hoisted[id(node)]
+        return self.expressions[type(node)](node)[0]
+
+    def operand(self, node, min_precedence):
+        """Code for a sub-expression, parenthesised if it binds looser than min_precedence"""
+        if self.hoisted and id(node) in self.hoisted:
+            return self.hoisted[id(node)]
+        code, precedence = self.expressions[type(node)](node)
+        if precedence < min_precedence:
+            return f"({code})"
+        return code
+
+    def number(self, node):
+        return node.value, ATOM
+
+    def string(self, node):
+        return repr(nodes.string_value(node.value)), ATOM
+
+    def boolean(self, node):
+        return node.value, ATOM
+
+    def name(self, node):
+        return node.name, ATOM
+
+    def negation(self, node):
+        if isinstance(node.operand, nodes.Number):
+            return f"-{node.operand.value}", UNARY
+        return f"-({self.expression(node.operand)})", UNARY
+
+    def binary(self, node):
+        if node.op == "+":
+            return self.addition(node)
+        precedence = PRECEDENCE[node.op]
+        left = self.operand(node.left, precedence)
+        right = self.operand(node.right, precedence + 1)
+        return f"{left} {node.op} {right}", precedence
+
+    def addition(self, node):
+        """RID `+` adds numbers and joins anything else as strings"""
+        left_type, right_type = node.left.type, node.right.type
+
+        if left_type in inference.NUMERIC and right_type in inference.NUMERIC or (
+                inference.LIST in (left_type, right_type)
+                and left_type in inference.ELEMENTWISE and right_type in inference.ELEMENTWISE):
+            left = self.operand(node.left, ADDITIVE)
+            right = self.operand(node.right, ADDITIVE + 1)
+            return f"{left} + {right}", ADDITIVE
+
+        if left_type == "str" or right_type == "str":
+            left = self.operand(node.left, ADDITIVE) if left_type == "str" else f"str({self.expression(node.left)})"
+            right = self.operand(node.right, ADDITIVE + 1) if right_type == "str" else f"str({self.expression(node.right)})"
+            return f"{left} + {right}", ADDITIVE
+
+        self.helpers.add("_rid_add")
+        return f"_rid_add({self.expression(node.left)}, {self.expression(node.right)})", ATOM
+
+    def compare(self, node):
+        return f"{self.expression(node.left)} {node.op} {self.expression(node.right)}", 0
+
+    def call(self, node):
+        args = ", ".join(self.expression(arg) for arg in node.args)
+        return f"{node.name}({args})", ATOM
+
+    def convert(self, node):
+        return f"{node.func}({self.expression(node.arg)})", ATOM
+
+    def input_call(self, node):
+        # Pending output has to be visible before the program waits for input
+        self.helpers.update(("_rid_out", "_rid_input"))
+        if node.prompt is None:
+            return "_rid_input()", ATOM
+        return f'_rid_input({nodes.string_value(node.prompt)!r})', ATOM
+
+    def list_literal(self, node):
+        self.helpers.add("_rid_list")
+        return f"_rid_list([{', '.join(self.expression(item) for item in node.items)}])", ATOM
+
+    def index(self, node):
+        return f"{self.operand(node.value, ATOM)}[{self.expression(node.index)}]", ATOM
+
+    def builtin(self, node):
+        self.helpers.update(BUILTIN_HELPERS[node.name])
+        args = ", ".join(self.expression(arg) for arg in node.args)
+        return f"_rid_{node.name}({args})", ATOM
+
+
+def assemble(body, body_lines, helpers, buffered, shared=()):
+    """
+    Return the lines of a complete program and the RID line of each (0 for lines
+    no statement produced): the prelude for `helpers`, then the top-level
+    statement lines (already indented one level, from RID lines body_lines) as
+    the body of _rid_main(), so their variables are fast locals instead of module
+    globals. Names in `shared` are declared global there, since functions read
+    them. With `buffered` the call goes inside try/finally so pending output is
+    flushed even if the program raises.
+    """
+    lines = runtime.prelude(helpers)
+    lines.append("def _rid_main():")
+    if shared:
+        lines.append(f"    global {', '.join(sorted(shared))}")
+    rid_lines = [0] * len(lines)
+    lines.extend(body or ["    pass"])
+    rid_lines.extend(body_lines or [0])
+    if buffered:
+        lines.extend(("try:", "    _rid_main()", "finally:", "    _rid_flush()"))
+    else:
+        lines.append("_rid_main()")
+    rid_lines.extend([0] * (len(lines) - len(rid_lines)))
+    return lines, rid_lines
+
+
+def generate_mapped(program):
+    """Return the Python source for a Program and its sourcemap.LineMap"""
+    lines, rid_lines = CodeGenerator().generate(program)
+    return '\n'.join(lines), sourcemap.LineMap.from_lines(lines, rid_lines)
+
+
+def generate(program):
+    """Return the Python source for a Program"""
+    return '\n'.join(CodeGenerator().generate(program)[0])
@@ -0,0 +1,162 @@
+"""Rewrites of RID functions that change how they run but not what they compute.
+
+lower_tail_calls turns `give f(...)` inside f into rebinding f's parameters and
+jumping back to the top of its body, so tail-recursive functions run as loops and
+are not limited by Python's recursion depth. Tail calls inside `Run` loops are left
+as calls, since restarting the function from there would only restart the loop.
+
+mark_pure_functions finds functions whose result depends only on their arguments
+(no out(), line, in(), eof(), read() or numbers(), no reads of variables they do
+not assign themselves, no list element assignments, and calls only to other such
+functions) and marks them for lru_cache memoisation. In a program that creates lists, functions that may be
+passed a list or that create one are left alone: lists cannot be cache keys, and a
+cached result would be one list shared by every caller.
+
+shared_names lists what top-level code has to leave in module globals when codegen
+wraps it in a function.
+"""
+
+import inference
+import nodes
+
+
+def lower_tail_calls(function_defs):
+    """Replace self tail calls in each of the FuncDefs, e.g. those nodes.statements() finds"""
+    for func in function_defs:
+        func.body = tail_positions(func.body, func)
+
+
+def tail_positions(body, func):
+    result = []
+    for node in body:
+        if (isinstance(node, nodes.Return) and isinstance(node.value, nodes.Call)
+                and node.value.name == func.name and len(node.value.args) == len(func.params)):
+            node = nodes.TailCall(func.params, node.value.args, node.line)
+            func.loop = True
+        elif isinstance(node, nodes.If):
+            node.branches = [(condition, tail_positions(branch, func)) for condition, branch in node.branches]
+            if node.orelse is not None:
+                node.orelse = tail_positions(node.orelse, func)
+        result.append(node)
+    return result
+
+
+def scope(func, parallel=True):
+    """
+    Nodes in func's body, in source order, without entering nested function
+    definitions, nor the bodies of `Run parallel` loops unless parallel is true
+    """
+    stack = list(reversed(func.body))
+    while stack:
+        node = stack.pop()
+        yield node
+        if isinstance(node, nodes.ParallelRun) and not parallel:
+            stack.append(node.count)
+        elif not isinstance(node, nodes.FuncDef):
+            stack.extend(reversed(list(node.children())))
+
+
+def parallel_reads(loop):
+    """Names a `Run parallel` body, which codegen makes a nested function, reads from the enclosing scope"""
+    reads, local = set(), {loop.counter}
+    for node in nodes.walk(nodes.Program(loop.body)):
+        if isinstance(node, (nodes.Name, nodes.SetItem)):
+            reads.add(node.name)
+        elif isinstance(node, (nodes.Let, nodes.Assign)):
+            local.add(node.name)
+        elif isinstance(node, nodes.ParallelRun):
+            local.add(node.counter)
+    return reads - local
+
+
+def scope_names(func):
+    """(names read, names bound, nested FuncDefs) in func's own scope; Python makes the bound names local"""
+    reads, bound, nested = set(), set(func.params), []
+    for node in scope(func, parallel=False):
+        if isinstance(node, nodes.ParallelRun):
+            reads |= parallel_reads(node)
+            reads.add(node.reduction)
+            bound.add(node.reduction)
+        elif isinstance(node, (nodes.Name, nodes.SetItem)):
+            reads.add(node.name)
+        elif isinstance(node, (nodes.Let, nodes.Assign, nodes.FuncDef)):
+            bound.add(node.name)
+            if isinstance(node, nodes.FuncDef):
+                nested.append(node)
+        elif isinstance(node, nodes.Run) and node.counter is not None:
+            bound.add(node.counter)
+    return reads, bound, nested
+
+
+def free_names(func):
+    """Variables func reads without binding them, i.e. from the top level"""
+    reads, bound, _ = scope_names(func)
+    return reads - bound
+
+
+def is_pure(func):
+    """Whether func on its own is free of I/O and outside reads; calls are checked separately"""
+    for node in scope(func):
+        if isinstance(node, (nodes.Out, nodes.Newline, nodes.Input, nodes.FuncDef, nodes.SetItem)):
+            return False
+        if isinstance(node, nodes.Builtin) and node.name in inference.INPUT_BUILTINS:
+            return False
+    return not free_names(func)
+
+
+def creates_list(node):
+    return isinstance(node, nodes.List) or (
+        isinstance(node, nodes.Builtin) and inference.BUILTIN_TYPES[node.name] == inference.LIST)
+
+
+def handles_lists(func, var_types):
+    """Whether func may be passed a list or creates one; var_types None means types are unknown"""
+    if any(creates_list(node) for node in scope(func)):
+        return True
+    if var_types is None:
+        return bool(func.params)
+    return any(var_types.get(param) in (inference.LIST, inference.UNKNOWN) for param in func.params)
+
+
+def shared_names(function_defs):
+    """
+    Names the top-level code has to keep as module globals rather than locals of
+    _rid_main, given every FuncDef in the program, nested ones included: every
+    function, so functions can call each other, and every variable some function
+    reads from the top level.
+    """
+    names = set()
+    for func in function_defs:
+        names.add(func.name)
+        names |= free_names(func)
+    return names
+
+
+def mark_pure_functions(program, maxsize=0, var_types=None):
+    """
+    Set memoize = maxsize (0 for unbounded) on every provably pure function.
+    var_types, the solved TypeInference.var_types, lets functions that are never
+    passed a list be memoised in a program that uses lists.
+    """
+    definitions = {}
+    for node in nodes.walk(program):
+        if isinstance(node, nodes.FuncDef):
+            # A name defined twice could call either definition
+            definitions[node.name] = None if node.name in definitions else node
+
+    pure = {name for name, func in definitions.items() if func is not None and is_pure(func)}
+    if any(creates_list(node) for node in nodes.walk(program)):
+        pure = {name for name in pure if not handles_lists(definitions[name], var_types)}
+    changed = True
+    while changed:
+        changed = False
+        for name in list(pure):
+            calls = (node.name for node in nodes.walk(nodes.Program(definitions[name].body))
+                     if isinstance(node, nodes.Call))
+            if any(call not in pure for call in calls):
+                pure.discard(name)
+                changed = True
+
+    for name in pure:
+        definitions[name].memoize = maxsize
+    return pure
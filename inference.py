@@ -0,0 +1,257 @@
+"""Flow-insensitive type inference used to pick the cheapest lowering for `+`.
+
+`annotate` collects every value assigned to each variable (declarations, assignments
+and call arguments bound to parameters) and every value each function gives back,
+computes the least fixpoint of their types, and stores the result in the `type`
+slot of every expression node. Variables are keyed by name only, so a name used in
+several scopes gets the join of all of them, which is imprecise but always safe.
+
+Types are "int", "float", "bool", "str", "num" (some mix of numbers), LIST or UNKNOWN.
+`+ - * / %` with a list operand and numbers or lists on both sides give a list.
+"""
+
+from collections import deque
+
+import nodes
+
+NUMERIC = {"int", "float", "bool", "num"}
+BOTTOM = "bottom"
+UNKNOWN = None
+LIST = "list"
+ELEMENTWISE = NUMERIC | {LIST}
+
+# Result type of each builtin (see parser.BUILTINS); sum/min/max of a non-list raise
+BUILTIN_TYPES = {
+    "len": "int", "sum": "num", "min": "num", "max": "num", "fill": LIST, "range": LIST,
+    "eof": "bool", "read": "str", "numbers": LIST,
+}
+# Builtins that read standard input or a file, like in()
+INPUT_BUILTINS = {"eof", "read", "numbers"}
+
+# Kinds of solver entries: a variable's type, or the type a function gives back
+VARIABLE, RESULT = "variable", "result"
+
+# Stands for the values a named Run counter takes
+COUNTER_VALUE = nodes.Number("0", 0)
+# What each chunk of a `Run parallel` loop starts its reduction variable at
+REDUCTION_IDENTITY = {"+": nodes.Number("0", 0), "*": nodes.Number("1", 0)}
+
+
+def join(a, b):
+    if a == BOTTOM:
+        return b
+    if b == BOTTOM or a == b:
+        return a
+    if a in NUMERIC and b in NUMERIC:
+        return "num"
+    return UNKNOWN
+
+
+def numeric_result(a, b):
+    if a == "float" or b == "float":
+        return "float"
+    if a == "num" or b == "num":
+        return "num"
+    return "int"
+
+
+def add_type(a, b):
+    if a in NUMERIC and b in NUMERIC:
+        return numeric_result(a, b)
+    if LIST in (a, b) and a in ELEMENTWISE and b in ELEMENTWISE:
+        return LIST
+    if a == "str" or b == "str":
+        return "str"
+    if a == BOTTOM or b == BOTTOM:
+        return BOTTOM
+    return UNKNOWN
+
+
+def arith_type(op, a, b):
+    if a == BOTTOM or b == BOTTOM:
+        return BOTTOM
+    if LIST in (a, b) and a in ELEMENTWISE and b in ELEMENTWISE:
+        return LIST
+    if a not in NUMERIC or b not in NUMERIC:
+        return UNKNOWN
+    if op == "/":
+        return "float"
+    return numeric_result(a, b)
+
+
+def literal_type(node):
+    if isinstance(node, nodes.Number):
+        # Folded constants may be written in exponent form, e.g. 1e+16
+        return "float" if "." in node.value or "e" in node.value else "int"
+    if isinstance(node, nodes.String):
+        return "str"
+    return "bool"
+
+
+class TypeInference:
+    def __init__(self):
+        self.var_values = {}
+        self.return_values = {}
+        # Every definition of each function name; a call may run any of them
+        self.functions = {}
+        self.calls = []
+        self.var_types = {}
+        self.return_types = {}
+
+    def collect(self, body, function=None):
+        """Record assigned and returned values in a statement list"""
+        for node in body:
+            if isinstance(node, (nodes.Let, nodes.Assign)):
+                self.var_values.setdefault(node.name, []).append(node.value)
+            elif isinstance(node, nodes.Return) and function is not None:
+                self.return_values[function].append(node.value)
+            elif isinstance(node, (nodes.Run, nodes.ParallelRun)) and node.counter is not None:
+                self.var_values.setdefault(node.counter, []).append(COUNTER_VALUE)
+                if isinstance(node, nodes.ParallelRun):
+                    self.var_values.setdefault(node.reduction, []).append(REDUCTION_IDENTITY[node.op])
+            elif isinstance(node, nodes.TailCall):
+                for param, arg in zip(node.params, node.args):
+                    self.var_values.setdefault(param, []).append(arg)
+            elif isinstance(node, nodes.FuncDef):
+                self.functions.setdefault(node.name, []).append(node)
+                self.return_values.setdefault(node.name, [])
+                if not node.body or not isinstance(node.body[-1], (nodes.Return, nodes.TailCall)):
+                    # Falling off the end returns None
+                    self.return_values[node.name].append(None)
+                self.collect(node.body, node.name)
+                continue
+
+            for child in node.children():
+                if isinstance(child, nodes.Expr):
+                    self.collect_calls(child)
+            if isinstance(node, nodes.If):
+                for _, branch in node.branches:
+                    self.collect(branch, function)
+                if node.orelse is not None:
+                    self.collect(node.orelse, function)
+            elif isinstance(node, (nodes.Run, nodes.ParallelRun, nodes.While)):
+                self.collect(node.body, function)
+
+    def collect_calls(self, expr):
+        """Record the calls in expr; bind_calls binds their arguments once every definition is known"""
+        self.calls.extend(node for node in nodes.walk(expr) if isinstance(node, nodes.Call))
+
+    def bind_calls(self):
+        """
+        Bind call arguments to the parameters they are passed to, in every definition
+        of the called name: which one runs depends on the order definitions execute in
+        """
+        for call in self.calls:
+            for func in self.functions.get(call.name, ()):
+                for param, arg in zip(func.params, call.args):
+                    self.var_values.setdefault(param, []).append(arg)
+        self.calls = []
+
+    def evaluate(self, node, store=False):
+        """Type of an expression under the current solution; `store` records it on every node"""
+        if isinstance(node, (nodes.Number, nodes.String, nodes.Bool)):
+            result = literal_type(node)
+        elif isinstance(node, nodes.Name):
+            result = self.var_types.get(node.name, UNKNOWN)
+        elif isinstance(node, nodes.Call):
+            for arg in node.args:
+                self.evaluate(arg, store)
+            result = self.return_types.get(node.name, UNKNOWN)
+        elif isinstance(node, nodes.BinOp):
+            left = self.evaluate(node.left, store)
+            right = self.evaluate(node.right, store)
+            result = add_type(left, right) if node.op == "+" else arith_type(node.op, left, right)
+        elif isinstance(node, nodes.Neg):
+            operand = self.evaluate(node.operand, store)
+            if operand == "bool":
+                result = "int"
+            else:
+                result = operand if operand in ELEMENTWISE or operand == BOTTOM else UNKNOWN
+        elif isinstance(node, nodes.Convert):
+            self.evaluate(node.arg, store)
+            result = node.func
+        elif isinstance(node, nodes.Input):
+            result = "str"
+        elif isinstance(node, nodes.List):
+            for item in node.items:
+                self.evaluate(item, store)
+            result = LIST
+        elif isinstance(node, nodes.Index):
+            value = self.evaluate(node.value, store)
+            self.evaluate(node.index, store)
+            # Elements of a list are numbers; indexing anything else is left to Python
+            if value == LIST:
+                result = "num"
+            else:
+                result = BOTTOM if value == BOTTOM else UNKNOWN
+        elif isinstance(node, nodes.Builtin):
+            for arg in node.args:
+                self.evaluate(arg, store)
+            result = BUILTIN_TYPES[node.name]
+        elif isinstance(node, nodes.Compare):
+            self.evaluate(node.left, store)
+            self.evaluate(node.right, store)
+            result = "bool"
+        else:
+            result = UNKNOWN
+
+        if store:
+            node.type = UNKNOWN if result == BOTTOM else result
+        return result
+
+    def solve(self):
+        """
+        Compute the least fixpoint with a worklist: a variable or function result is
+        evaluated again only when a variable or function result its values read has changed
+        """
+        self.bind_calls()
+        self.var_types = {name: BOTTOM for name in self.var_values}
+        self.return_types = {name: BOTTOM for name in self.return_values}
+        tables = {VARIABLE: (self.var_types, self.var_values), RESULT: (self.return_types, self.return_values)}
+
+        # (VARIABLE, name) or (RESULT, name) -> the entries whose values read it
+        readers = {}
+        for kind, (_, values) in tables.items():
+            for name, name_values in values.items():
+                for value in name_values:
+                    if value is None:
+                        continue
+                    for node in nodes.walk(value):
+                        if isinstance(node, nodes.Name):
+                            readers.setdefault((VARIABLE, node.name), set()).add((kind, name))
+                        elif isinstance(node, nodes.Call):
+                            readers.setdefault((RESULT, node.name), set()).add((kind, name))
+
+        pending = deque((kind, name) for kind, (_, values) in tables.items() for name in values)
+        queued = set(pending)
+        while pending:
+            entry = pending.popleft()
+            queued.discard(entry)
+            kind, name = entry
+            table, values = tables[kind]
+            result = BOTTOM
+            for value in values[name]:
+                result = join(result, UNKNOWN if value is None else self.evaluate(value))
+            if result != table[name]:
+                table[name] = result
+                for reader in readers.get(entry, ()):
+                    if reader not in queued:
+                        queued.add(reader)
+                        pending.append(reader)
+
+    def store(self, tree):
+        """Record the solved types on every expression node in tree"""
+        for node in nodes.walk(tree):
+            if not isinstance(node, nodes.Expr):
+                for child in node.children():
+                    if isinstance(child, nodes.Expr):
+                        self.evaluate(child, store=True)
+
+
+def annotate(program):
+    """Infer types for a Program and store them on its expression nodes"""
+    inference = TypeInference()
+    inference.collect(program.body)
+    inference.solve()
+    inference.store(program)
+    return inference
@@ -1,135 +1,218 @@
+import re
+from array import array
+
+# Token kinds are small integers; KIND_NAMES[kind] gives the readable name.
+KIND_NAMES = (
+    "IDENTIFIER", "NUMBER", "STRING",
+    "LET", "OUT", "IN", "RUN", "WHILE", "IF", "ELIF", "ELSE", "FUNC", "RETURN", "BOOL", "NEWLINE",
+    "NUM_CONVERT", "DEC_CONVERT", "WORD_CONVERT", "BOOL_CONVERT",
+    "ASSIGN", "PLUS", "MINUS", "MULT", "DIV", "MOD", "EQ", "NEQ", "LT", "GT", "LTE", "GTE",
+    "LPAREN", "RPAREN", "LBRACE", "RBRACE", "LBRACKET", "RBRACKET", "COMMA",
+    "EOF",
+)
+
+(IDENTIFIER, NUMBER, STRING,
+ LET, OUT, IN, RUN, WHILE, IF, ELIF, ELSE, FUNC, RETURN, BOOL, NEWLINE,
+ NUM_CONVERT, DEC_CONVERT, WORD_CONVERT, BOOL_CONVERT,
+ ASSIGN, PLUS, MINUS, MULT, DIV, MOD, EQ, NEQ, LT, GT, LTE, GTE,
+ LPAREN, RPAREN, LBRACE, RBRACE, LBRACKET, RBRACKET, COMMA,
+ EOF) = range(len(KIND_NAMES))
+
 KEYWORDS = {
-    "Let": "LET",
-    "out": "OUT",
-    "in": "IN",
-    "Run": "RUN",
-    "while": "WHILE",
-    "agar": "IF",
-    "ya_fir": "ELIF",
-    "warna": "ELSE",
-    "func": "FUNC",
-    "give": "RETURN",
-    "True": "BOOL",
-    "False": "BOOL",
-    "line": "NEWLINE",
-    "num": "NUM_CONVERT",
-    "dec": "DEC_CONVERT",
-    "word": "WORD_CONVERT",
-    "bool": "BOOL_CONVERT"
+    "Let": LET,
+    "out": OUT,
+    "in": IN,
+    "Run": RUN,
+    "while": WHILE,
+    "agar": IF,
+    "ya_fir": ELIF,
+    "warna": ELSE,
+    "func": FUNC,
+    "give": RETURN,
+    "True": BOOL,
+    "False": BOOL,
+    "line": NEWLINE,
+    "num": NUM_CONVERT,
+    "dec": DEC_CONVERT,
+    "word": WORD_CONVERT,
+    "bool": BOOL_CONVERT
 }
 
 OPERATORS = {
-    "=": "ASSIGN",
-    "+": "PLUS",
-    "-": "MINUS",
-    "*": "MULT",
-    "/": "DIV",
-    "%": "MOD",
-    "==": "EQ",
-    "!=": "NEQ",
-    "<": "LT",
-    ">": "GT",
-    "<=": "LTE",
-    ">=": "GTE"
+    "=": ASSIGN,
+    "+": PLUS,
+    "-": MINUS,
+    "*": MULT,
+    "/": DIV,
+    "%": MOD,
+    "==": EQ,
+    "!=": NEQ,
+    "<": LT,
+    ">": GT,
+    "<=": LTE,
+    ">=": GTE
 }
 
 DELIMITERS = {
-    "(": "LPAREN",
-    ")": "RPAREN",
-    "{": "LBRACE",
-    "}": "RBRACE",
-    ",": "COMMA"
+    "(": LPAREN,
+    ")": RPAREN,
+    "{": LBRACE,
+    "}": RBRACE,
+    "[": LBRACKET,
+    "]": RBRACKET,
+    ",": COMMA
 }
 
 TOKEN_TYPES = [
-    "IDENTIFIER",
-    "NUMBER",
-    "STRING"
+    IDENTIFIER,
+    NUMBER,
+    STRING
 ]
 
 
 def get_keyword_token(word):
-    return KEYWORDS.get(word, "IDENTIFIER")
-
-
-def lex(words):
+    return KEYWORDS.get(word, IDENTIFIER)
+
+
+class Token:
+    __slots__ = ("value", "kind", "line")
+
+    def __init__(self, value, kind, line):
+        self.value = value
+        self.kind = kind
+        self.line = line
+
+    @property
+    def type(self):
+        """Readable kind name, e.g. 'LPAREN'"""
+        return KIND_NAMES[self.kind]
+
+    def __eq__(self, other):
+        return (isinstance(other, Token) and
+                (self.value, self.kind, self.line) == (other.value, other.kind, other.line))
+
+    def __repr__(self):
+        return f"Token({self.value!r}, {self.type}, {self.line})"
+
+
+class TokenBuffer:
+    """
+    Compact token list built by lex().
+
+    Kinds, lines and source offsets are kept in parallel arrays (about 13 bytes per
+    token); a Token, including its value sliced from the source, is only created
+    when an element is accessed.
+    """
+
+    __slots__ = ("source", "kinds", "lines", "starts", "ends")
+
+    def __init__(self, source):
+        self.source = source
+        self.kinds = array('b')
+        self.lines = array('i')
+        self.starts = array('i')
+        self.ends = array('i')
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        return Token(self.source[self.starts[index]:self.ends[index]], self.kinds[index], self.lines[index])
+
+    def __iter__(self):
+        source = self.source
+        for kind, line, start, end in zip(self.kinds, self.lines, self.starts, self.ends):
+            yield Token(source[start:end], kind, line)
+
+
+SYMBOLS = {**OPERATORS, **DELIMITERS}
+# Kinds of the tokens that are always spelled the same way
+FIXED_KINDS = {**KEYWORDS, **SYMBOLS}
+
+# Each match is the gap before a token (whitespace and characters that start no
+# token) and then the token, absent only at the end of the source; comments are
+# tokens that scan() drops. With the gap inside the match, the scanning loop runs
+# once per token.
+TOKEN_PATTERN = re.compile(r"""
+    (?P<gap>[^\w"~=!<>+\-*/%(){}\[\],]*)
+    (?P<token>
+        [^\W\d]\w*
+      | [=!<>]=?
+      | [+\-*/%(){}\[\],]
+      | \d+(?:\.\d*)?
+      | "[^"]*"?
+      | ~[^~]*~?
+    )?
+""", re.VERBOSE)
+
+BLOCK_SIZE = 1 << 16
+
+
+def scan(words, line_number=1):
+    """
+    Yield the tokens of words a block at a time, each block a flat list of kind,
+    line, start, end for every token in it; words[start:end] is the token's value.
+    """
+    fixed = FIXED_KINDS
+    size = len(words)
     position = 0
-    tokens = []
-    line_number = 1
-
-    while position < len(words):
-        char = words[position]
-
-        if char == '\n':
-            line_number += 1
-            position += 1
+    block_size = BLOCK_SIZE
+    while position < size:
+        stop = position + block_size
+        matches = TOKEN_PATTERN.findall(words, position, stop)
+        if stop < size:
+            # The block's end may cut its last token short: leave that match, and the
+            # empty match after it, to the next block
+            del matches[-2:]
+            if not matches:
+                block_size *= 2
+                continue
+            block_size = BLOCK_SIZE
+
+        tokens = []
+        add = tokens.extend
+        for gap, value in matches:
+            if "\n" in gap:
+                line_number += gap.count("\n")
+            start = position + len(gap)
+            position = start + len(value)
+            kind = fixed.get(value)
+            if kind is None:
+                first = value[:1]
+                if first == '"':
+                    # An unterminated string runs to the end of the source
+                    end = position - 1 if len(value) > 1 and value[-1] == '"' else position
+                    add((STRING, line_number, start + 1, end))
+                    line_number += value.count("\n")
+                    continue
+                if first == "~":
+                    line_number += value.count("\n")
+                    continue
+                if first.isdecimal():
+                    kind = NUMBER
+                elif first and first != "!":
+                    kind = IDENTIFIER
+                else:
+                    # A lone "!", or the end of the source
+                    continue
+            add((kind, line_number, start, position))
+        yield tokens
 
-        elif char.isspace():
-            position += 1
 
-        elif char in DELIMITERS:
-            tokens.append((char, DELIMITERS[char], line_number))
-            position += 1
+def iter_lex(words, line_number=1):
+    """Yield Tokens one at a time; line_number is the line words starts on"""
+    for tokens in scan(words, line_number):
+        fields = iter(tokens)
+        for kind, line, start, end in zip(fields, fields, fields, fields):
+            yield Token(words[start:end], kind, line)
 
-        elif char in OPERATORS:
-            if position + 1 < len(words):
-                two_char = char + words[position + 1]
-                if two_char in OPERATORS:
-                    tokens.append((two_char, OPERATORS[two_char], line_number))
-                    position += 2
-                    continue
 
-            tokens.append((char, OPERATORS[char], line_number))
-            position += 1
-
-        elif char.isalpha() or char == "_":
-            current = ""
-            start_line = line_number
-            while position < len(words) and (words[position].isalnum() or words[position] == "_"):
-                current += words[position]
-                position += 1
-
-            if current in KEYWORDS:
-                tokens.append((current, KEYWORDS[current], start_line))
-            else:
-                tokens.append((current, "IDENTIFIER", start_line))
-
-        elif char == '"':
-            start_line = line_number
-            position += 1
-            current = ""
-            while position < len(words) and words[position] != '"':
-                if words[position] == '\n':
-                    line_number += 1
-                current += words[position]
-                position += 1
-            position += 1
-            tokens.append((current, "STRING", start_line))
-
-        elif char.isdigit():
-            current = ""
-            dot_count = 0
-            start_line = line_number
-
-            while position < len(words) and (words[position].isdigit() or words[position] == "."):
-                if words[position] == ".":
-                    dot_count += 1
-                    if dot_count > 1:
-                        break
-                current += words[position]
-                position += 1
-
-            tokens.append((current, "NUMBER", start_line))
-
-        elif char == "~":
-            position += 1
-            while position < len(words) and words[position] != "~":
-                if words[position] == '\n':
-                    line_number += 1
-                position += 1
-            position += 1
-
-        else:
-            position += 1
-
-    return tokens
\ No newline at end of file
+def lex(words):
+    """Tokenize the whole source into a compact TokenBuffer"""
+    tokens = TokenBuffer(words)
+    for block in scan(words):
+        tokens.kinds.extend(block[0::4])
+        tokens.lines.extend(block[1::4])
+        tokens.starts.extend(block[2::4])
+        tokens.ends.extend(block[3::4])
+    return tokens
@@ -0,0 +1,193 @@
+"""Loop-invariant code motion.
+
+`hoist_invariants` runs after type inference and records, on every Run, Run
+parallel and While node, the expressions in its body (and a while loop's
+condition) whose value is the same on every iteration. Codegen evaluates them
+once, into a temporary, just before the loop. An expression is hoisted when
+
+* every name it reads is definitely assigned before the loop and assigned
+  nowhere inside it (functions cannot assign the caller's variables),
+* it contains no function call or in(), and
+* with its inferred types it cannot raise: the loop may run zero times, or reach
+  the expression only on some paths, so hoisting must not add an error, and
+* if the program assigns list elements, it reads no name that may hold a list:
+  `xs[i] = v` changes xs, and every other name for the same list, in place.
+
+Only maximal expressions are hoisted, and an expression hoisted out of an outer
+loop is not considered again for the loops nested inside it.
+"""
+
+import inference
+import nodes
+
+INTEGRAL = {"int", "bool"}
+ORDERING = {"<", ">", "<=", ">="}
+# str() of a huge int raises ValueError, so only these are safe to convert
+STR_SAFE = {"str", "float", "bool"}
+# Argument types each conversion accepts without raising; None means any
+CONVERSIONS = {"bool": None, "str": STR_SAFE, "float": {"float", "bool"}, "int": INTEGRAL}
+
+
+def float_operand(node):
+    """A float, or an int literal small enough to convert to float without OverflowError"""
+    if node.type == "float":
+        return True
+    return node.type in INTEGRAL and isinstance(node, (nodes.Number, nodes.Bool)) and len(node.value) < 300
+
+
+def nonzero_literal(node):
+    return isinstance(node, nodes.Number) and float(node.value) != 0
+
+
+def cannot_raise(node):
+    """Whether evaluating node, given operands of their inferred types, never raises"""
+    if isinstance(node, (nodes.Number, nodes.String, nodes.Bool)):
+        return True
+    if isinstance(node, nodes.Neg):
+        return node.operand.type in INTEGRAL or node.operand.type == "float"
+    if isinstance(node, nodes.BinOp):
+        left, right = node.left, node.right
+        integral = left.type in INTEGRAL and right.type in INTEGRAL
+        floating = float_operand(left) and float_operand(right)
+        if node.op == "+" and "str" in (left.type, right.type):
+            return left.type in STR_SAFE and right.type in STR_SAFE
+        if node.op in ("+", "-", "*"):
+            return integral or floating
+        if node.op == "%":
+            return (integral or floating) and nonzero_literal(right)
+        return floating and nonzero_literal(right)
+    if isinstance(node, nodes.Compare):
+        if node.op not in ORDERING:
+            return True
+        types = {node.left.type, node.right.type}
+        return types <= INTEGRAL | {"float"} or types == {"str"}
+    if isinstance(node, nodes.Convert):
+        allowed = CONVERSIONS[node.func]
+        return allowed is None or node.arg.type in allowed
+    return False
+
+
+def worth_hoisting(node):
+    """Names and literals (including negative numbers) cost nothing to re-evaluate"""
+    if isinstance(node, nodes.Neg):
+        return not isinstance(node.operand, nodes.Number)
+    return not isinstance(node, (nodes.Name, nodes.Number, nodes.String, nodes.Bool))
+
+
+def assigned_names(body):
+    """Names bound anywhere in body; nested function bodies are separate scopes"""
+    names = set()
+    stack = list(body)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (nodes.Let, nodes.Assign, nodes.FuncDef)):
+            names.add(node.name)
+        elif isinstance(node, (nodes.Run, nodes.ParallelRun)) and node.counter is not None:
+            names.add(node.counter)
+        elif isinstance(node, nodes.TailCall):
+            names.update(node.params)
+        if not isinstance(node, nodes.FuncDef):
+            stack.extend(node.children())
+    return names
+
+
+def definitely_assigned(body):
+    """
+    Names body assigns on every path through it, at its own level: Let, assignments,
+    func statements and the names every branch of an agar with a warna assigns.
+    Loops may run zero times, so they add nothing. Hoister.block adds the same names.
+    """
+    names = set()
+    for node in body:
+        if isinstance(node, (nodes.Let, nodes.Assign, nodes.FuncDef)):
+            names.add(node.name)
+        elif isinstance(node, nodes.If) and node.orelse is not None:
+            branches = [branch for _, branch in node.branches] + [node.orelse]
+            names |= set.intersection(*map(definitely_assigned, branches))
+    return names
+
+
+class Hoister:
+    def __init__(self, mutates_lists=False):
+        # Expressions already hoisted out of an enclosing loop
+        self.taken = set()
+        self.mutates_lists = mutates_lists
+
+    def block(self, body, defined):
+        """
+        Visit a statement list. `defined`, the names definitely assigned before it, is
+        updated to the names definitely assigned after it; returns the names added.
+        """
+        added = set()
+        for node in body:
+            if isinstance(node, (nodes.Let, nodes.Assign, nodes.FuncDef)):
+                if isinstance(node, nodes.FuncDef):
+                    self.block(node.body, set(node.params))
+                if node.name not in defined:
+                    defined.add(node.name)
+                    added.add(node.name)
+            elif isinstance(node, nodes.If):
+                # Each branch starts from the names defined before the agar
+                branches = [branch for _, branch in node.branches]
+                if node.orelse is not None:
+                    branches.append(node.orelse)
+                outcomes = []
+                for branch in branches:
+                    outcome = self.block(branch, defined)
+                    defined -= outcome
+                    outcomes.append(outcome)
+                if node.orelse is not None:
+                    common = set.intersection(*outcomes)
+                    defined |= common
+                    added |= common
+            elif isinstance(node, (nodes.Run, nodes.ParallelRun, nodes.While)):
+                self.loop(node, defined)
+        return added
+
+    def loop(self, node, defined):
+        counter = node.counter if isinstance(node, (nodes.Run, nodes.ParallelRun)) else None
+        assigned = assigned_names(node.body)
+        if counter is not None:
+            assigned.add(counter)
+        found = []
+        if isinstance(node, nodes.While):
+            self.collect(node.condition, defined, assigned, found)
+        for statement in node.body:
+            self.collect(statement, defined, assigned, found)
+        node.hoisted = found
+        self.taken.update(map(id, found))
+
+        # Nothing assigned in the body is definitely assigned after the loop, which may not run
+        inner = set()
+        if counter is not None and counter not in defined:
+            defined.add(counter)
+            inner.add(counter)
+        inner |= self.block(node.body, defined)
+        defined -= inner
+
+    def collect(self, node, defined, assigned, found):
+        """
+        Append the maximal hoistable expressions under node to found; the names that
+        are invariant are those in defined and not in assigned. Returns whether node
+        itself is an invariant expression, which its parent may hoist instead.
+        """
+        if isinstance(node, nodes.Name):
+            if self.mutates_lists and node.type in (inference.LIST, inference.UNKNOWN):
+                return False
+            return node.name in defined and node.name not in assigned
+        if isinstance(node, nodes.FuncDef) or id(node) in self.taken:
+            return False
+        children = list(node.children())
+        invariant = [self.collect(child, defined, assigned, found) for child in children]
+        if isinstance(node, nodes.Expr) and all(invariant) and cannot_raise(node):
+            return True
+        found.extend(child for child, flag in zip(children, invariant) if flag and worth_hoisting(child))
+        return False
+
+
+def hoist_invariants(program, mutates_lists):
+    """
+    Set `hoisted` on every loop in program; uses the types from inference.annotate.
+    mutates_lists says whether the program has a SetItem statement anywhere.
+    """
+    Hoister(mutates_lists).block(program.body, set())
@@ -1,46 +1,197 @@
-import sys
+import argparse
+import ast
+import os
 import subprocess
-import lexer
-from parser import Parser
-
-
-def transpile_file(input_filename, output_filename):
-    with open(input_filename, 'r') as file:
-        rid_code = file.read()
-
-    tokens = lexer.lex(rid_code)
+import sys
+import tempfile
+import traceback
+
+import batch
+import bench
+import cache
+import profiling
+import rid
+import server
+import sourcemap
+import watch
+
+
+def read_file(input_filename, profiler=None):
+    with profiling.phase(profiler, "read"):
+        with open(input_filename, 'r') as file:
+            return file.read()
+
+
+def load_file(input_filename, use_cache=True, optimize=False, memoize=None, profiler=None, backend="text"):
+    rid_code = read_file(input_filename, profiler)
+    cache_dir = cache.cache_dir_for(input_filename) if use_cache else None
+    return rid.load_program(rid_code, input_filename, cache_dir, optimize, memoize, profiler, backend)
+
+
+def transpile_file(input_filename, output_filename, use_cache=True, optimize=False, memoize=None, profiler=None,
+                   backend="text"):
+    """
+    Write the Python for a RID file; returns the sourcemap.LineMap for output_filename,
+    or None when the ast backend wrote it with ast.unparse.
+    """
+    if backend == "ast":
+        tree = rid.transpile_tree(read_file(input_filename, profiler), optimize=optimize, memoize=memoize,
+                                  profiler=profiler)
+        with profiling.phase(profiler, "unparse"):
+            python_code, line_map = ast.unparse(tree), None
+    else:
+        python_code, _, line_map = load_file(input_filename, use_cache, optimize, memoize, profiler)
+
+    with profiling.phase(profiler, "write"):
+        with open(output_filename, 'w') as file:
+            file.write(python_code)
 
-    parser = Parser(tokens)
-    parser.parse()
+    print(f"Transpiled {input_filename} to {output_filename}")
 
-    python_code = '\n'.join(parser.output)
+    return line_map
 
-    with open(output_filename, 'w') as file:
-        file.write(python_code)
 
-    print(f"Transpiled {input_filename} to {output_filename}")
+def read_rid_source(filename):
+    try:
+        with open(filename, 'r') as file:
+            return file.read()
+    except OSError:
+        return None
 
-    return output_filename
 
+def run_python_file(filename, profiler=None, use_cprofile=False, line_map=None, rid_filename=None):
+    """
+    Run a generated program with python. Given its line_map, stderr is captured and
+    tracebacks are rewritten to point at lines of rid_filename.
+    """
+    command = ['python', filename]
+    if profiler is not None:
+        # What spawning the interpreter costs, apart from the program
+        with profiler.phase("startup", memory=False):
+            subprocess.run(['python', '-c', 'pass'])
+        if use_cprofile:
+            stats_fd, stats_path = tempfile.mkstemp(suffix=".prof")
+            os.close(stats_fd)
+            command = ['python', '-m', 'cProfile', '-o', stats_path, filename]
 
-def run_python_file(filename):
     print(f"\nRunning {filename}...\n")
     print("=" * 40)
-    result = subprocess.run(['python', filename], capture_output=False)
+    stderr = subprocess.PIPE if line_map is not None else None
+    with profiling.phase(profiler, "run", memory=False):
+        result = subprocess.run(command, stderr=stderr, text=True)
+    if result.stderr:
+        sys.stderr.write(sourcemap.rewrite_traceback(result.stderr, filename, line_map, rid_filename,
+                                                     read_rid_source(rid_filename)))
     print("=" * 40)
-    return result.returncode
 
+    if profiler is not None and use_cprofile:
+        try:
+            profiler.load_stats(stats_path)
+        except (OSError, EOFError, TypeError):
+            pass  # the program died before cProfile wrote its stats
+        finally:
+            os.unlink(stats_path)
+    return result.returncode
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python main.py <input.rid> [output.py]")
-        sys.exit(1)
 
-    input_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else "output.py"
+def run_in_process(input_filename, use_cache=True, optimize=False, memoize=None, profiler=None, use_cprofile=False,
+                   backend="text"):
+    """
+    Transpile and execute a RID file inside this interpreter, without writing output.py.
+    Returns (exit_code, line_map).
+    """
+    _, code, line_map = load_file(input_filename, use_cache, optimize, memoize, profiler, backend)
 
-    output_filename = transpile_file(input_file, output_file)
+    print(f"\nRunning {input_filename}...\n")
+    print("=" * 40)
+    try:
+        with profiling.phase(profiler, "run"):
+            if use_cprofile:
+                profiler.run_profiled(rid.run_code, code, stdout=sys.stdout)
+            else:
+                rid.run_code(code, stdout=sys.stdout)
+        exit_code = 0
+    except SystemExit as exc:
+        exit_code = exc.code if isinstance(exc.code, int) else 1
+    except Exception:
+        sys.stderr.write(sourcemap.rewrite_traceback(traceback.format_exc(), input_filename, line_map,
+                                                     input_filename, read_rid_source(input_filename)))
+        exit_code = 1
+    print("=" * 40)
+    return exit_code, line_map
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(prog="main.py", description="Transpile and run a RID program.")
+    arg_parser.add_argument("input", nargs="?", help="RID source file")
+    arg_parser.add_argument("output", nargs="?", default="output.py", help="generated Python file (default: output.py)")
+    arg_parser.add_argument("--in-process", action="store_true",
+                            help="compile and run in this interpreter instead of writing output.py and spawning python")
+    arg_parser.add_argument("--no-cache", action="store_true",
+                            help=f"always re-transpile instead of reusing {cache.CACHE_DIR_NAME}/")
+    arg_parser.add_argument("--watch", action="store_true",
+                            help="keep running and re-transpile the input (a file or directory) whenever it changes")
+    arg_parser.add_argument("--serve", action="store_true",
+                            help="run as a JSON request server on stdin/stdout (see server.py)")
+    arg_parser.add_argument("--socket", help="with --serve, listen on this Unix socket instead of stdin/stdout")
+    arg_parser.add_argument("--workers", type=int, help="with --serve, worker processes (default: CPU count)")
+    arg_parser.add_argument("-O", dest="optimize", action="store_true",
+                            help="fold constant expressions and remove branches that can never run")
+    arg_parser.add_argument("--memoize", type=int, nargs="?", const=0, metavar="SIZE",
+                            help="cache results of functions without side effects (at most SIZE entries each; "
+                                 "default unbounded)")
+    arg_parser.add_argument("--ast", action="store_true",
+                            help="build a Python syntax tree and compile it directly instead of generating source "
+                                 "(output.py is written with ast.unparse)")
+    arg_parser.add_argument("--profile", action="store_true",
+                            help="report the time and peak memory of each phase (see profiling.py)")
+    arg_parser.add_argument("--profile-json", metavar="PATH", help="with --profile, also write the report as JSON")
+    arg_parser.add_argument("--cprofile", action="store_true",
+                            help="with --profile, run the program under cProfile and list its hottest functions")
+    return arg_parser
+
+
+def finish_profile(profiler, args, program_filename, line_map):
+    profiler.stop()
+    if profiler.stats is not None:
+        profiler.hot_functions(program_filename, line_map)
+    profiler.report()
+    if args.profile_json:
+        profiler.write_json(args.profile_json, args.input)
 
-    exit_code = run_python_file(output_filename)
 
-    sys.exit(exit_code)
\ No newline at end of file
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["batch"]:
+        sys.exit(batch.main(sys.argv[2:]))
+    if sys.argv[1:2] == ["bench"]:
+        sys.exit(bench.main(sys.argv[2:]))
+
+    arg_parser = build_arg_parser()
+    args = arg_parser.parse_args()
+    if args.input is None and not args.serve:
+        arg_parser.error("the following arguments are required: input")
+    if args.watch and args.ast:
+        # Watch mode reuses generated source for unchanged statements; there is no tree to reuse
+        arg_parser.error("--ast cannot be used with --watch")
+
+    use_cache = not args.no_cache
+    backend = "ast" if args.ast else "text"
+    profiler = profiling.Profiler() if args.profile or args.profile_json or args.cprofile else None
+    if args.serve:
+        server.Server(args.workers).run(args.socket)
+        exit_code = 0
+    elif args.watch:
+        watch.Watcher(args.input, args.output, args.optimize, args.memoize).run()
+        exit_code = 0
+    elif args.in_process:
+        exit_code, line_map = run_in_process(args.input, use_cache, args.optimize, args.memoize, profiler,
+                                             args.cprofile, backend)
+        if profiler is not None:
+            finish_profile(profiler, args, args.input, line_map)
+    else:
+        line_map = transpile_file(args.input, args.output, use_cache, args.optimize, args.memoize, profiler, backend)
+        exit_code = run_python_file(args.output, profiler, args.cprofile, line_map, args.input)
+        if profiler is not None:
+            finish_profile(profiler, args, args.output, line_map)
+
+    sys.exit(exit_code)
@@ -0,0 +1,374 @@
+"""Syntax tree built by the Parser and consumed by the optimisation passes and code generators.
+
+Every node records the RID source line it came from. Expression nodes also carry a
+`type` slot that inference.annotate fills in (None when the type is not known).
+`fields` names the attributes holding child nodes or lists of child nodes.
+"""
+
+import ast
+import warnings
+
+
+def string_value(text):
+    """
+    The str a String node (or an in() prompt) stands for. Its source text keeps
+    backslash escapes, which mean what they do in a Python string literal; text
+    that is no valid literal body, such as one ending in a backslash, is taken as is.
+    """
+    if "\\" not in text:
+        return text
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            return ast.literal_eval('"' + text.replace("\n", "\\n") + '"')
+        except (ValueError, SyntaxError):
+            return text
+
+
+class Node:
+    __slots__ = ("line",)
+    fields = ()
+
+    def children(self):
+        """Yield direct child nodes in source order"""
+        for name in self.fields:
+            value = getattr(self, name)
+            if isinstance(value, list):
+                yield from value
+            elif value is not None:
+                yield value
+
+    def __repr__(self):
+        args = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({args})"
+
+
+def walk(node):
+    """Yield node and all of its descendants, parents before children"""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(list(node.children())))
+
+
+def statements(body):
+    """
+    Yield every statement in the list body and in the blocks nested in it, parents
+    before children. Expressions are not visited, which makes this much cheaper than
+    walk() for passes that only look for statements such as FuncDef.
+    """
+    stack = list(reversed(body))
+    while stack:
+        node = stack.pop()
+        yield node
+        if isinstance(node, If):
+            if node.orelse is not None:
+                stack.extend(reversed(node.orelse))
+            for _, branch in reversed(node.branches):
+                stack.extend(reversed(branch))
+        elif isinstance(node, (Run, ParallelRun, While, FuncDef)):
+            stack.extend(reversed(node.body))
+
+
+# Expressions
+
+class Expr(Node):
+    __slots__ = ("type",)
+
+
+class Number(Expr):
+    __slots__ = ("value",)
+
+    def __init__(self, value, line):
+        self.value = value
+        self.line = line
+        self.type = None
+
+
+class String(Expr):
+    __slots__ = ("value",)
+
+    def __init__(self, value, line):
+        self.value = value
+        self.line = line
+        self.type = None
+
+
+class Bool(Expr):
+    __slots__ = ("value",)
+
+    def __init__(self, value, line):
+        self.value = value
+        self.line = line
+        self.type = None
+
+
+class Name(Expr):
+    __slots__ = ("name",)
+
+    def __init__(self, name, line):
+        self.name = name
+        self.line = line
+        self.type = None
+
+
+class Neg(Expr):
+    __slots__ = ("operand",)
+    fields = ("operand",)
+
+    def __init__(self, operand, line):
+        self.operand = operand
+        self.line = line
+        self.type = None
+
+
+class BinOp(Expr):
+    __slots__ = ("op", "left", "right")
+    fields = ("left", "right")
+
+    def __init__(self, op, left, right, line):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.line = line
+        self.type = None
+
+
+class Compare(Expr):
+    __slots__ = ("op", "left", "right")
+    fields = ("left", "right")
+
+    def __init__(self, op, left, right, line):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.line = line
+        self.type = None
+
+
+class Call(Expr):
+    __slots__ = ("name", "args")
+    fields = ("args",)
+
+    def __init__(self, name, args, line):
+        self.name = name
+        self.args = args
+        self.line = line
+        self.type = None
+
+
+class Convert(Expr):
+    """num()/dec()/word()/bool(); `func` is the Python builtin name"""
+    __slots__ = ("func", "arg")
+    fields = ("arg",)
+
+    def __init__(self, func, arg, line):
+        self.func = func
+        self.arg = arg
+        self.line = line
+        self.type = None
+
+
+class Input(Expr):
+    __slots__ = ("prompt",)
+
+    def __init__(self, prompt, line):
+        self.prompt = prompt
+        self.line = line
+        self.type = None
+
+
+class List(Expr):
+    """`[a, b, ...]` list literal"""
+    __slots__ = ("items",)
+    fields = ("items",)
+
+    def __init__(self, items, line):
+        self.items = items
+        self.line = line
+        self.type = None
+
+
+class Index(Expr):
+    """`value[index]`"""
+    __slots__ = ("value", "index")
+    fields = ("value", "index")
+
+    def __init__(self, value, index, line):
+        self.value = value
+        self.index = index
+        self.line = line
+        self.type = None
+
+
+class Builtin(Expr):
+    """Call of a builtin such as len() or eof(); see parser.BUILTINS"""
+    __slots__ = ("name", "args")
+    fields = ("args",)
+
+    def __init__(self, name, args, line):
+        self.name = name
+        self.args = args
+        self.line = line
+        self.type = None
+
+
+# Statements
+
+class Let(Node):
+    __slots__ = ("name", "value")
+    fields = ("value",)
+
+    def __init__(self, name, value, line):
+        self.name = name
+        self.value = value
+        self.line = line
+
+
+class Assign(Node):
+    __slots__ = ("name", "value")
+    fields = ("value",)
+
+    def __init__(self, name, value, line):
+        self.name = name
+        self.value = value
+        self.line = line
+
+
+class SetItem(Node):
+    """`name[index] = value`"""
+    __slots__ = ("name", "index", "value")
+    fields = ("index", "value")
+
+    def __init__(self, name, index, value, line):
+        self.name = name
+        self.index = index
+        self.value = value
+        self.line = line
+
+
+class Out(Node):
+    __slots__ = ("value",)
+    fields = ("value",)
+
+    def __init__(self, value, line):
+        self.value = value
+        self.line = line
+
+
+class Newline(Node):
+    __slots__ = ()
+
+    def __init__(self, line):
+        self.line = line
+
+
+class ExprStmt(Node):
+    __slots__ = ("value",)
+    fields = ("value",)
+
+    def __init__(self, value, line):
+        self.value = value
+        self.line = line
+
+
+class Run(Node):
+    """`Run(count, counter)`, counter None if unnamed; `hoisted` is filled in by loops.py"""
+    __slots__ = ("count", "body", "counter", "hoisted")
+    fields = ("count", "body")
+
+    def __init__(self, count, body, line, counter=None):
+        self.count = count
+        self.body = body
+        self.line = line
+        self.counter = counter
+        self.hoisted = []
+
+
+class ParallelRun(Node):
+    """`Run parallel(count, counter, reduction)`, op is "+" or "*"; `hoisted` is filled in by loops.py"""
+    __slots__ = ("count", "counter", "reduction", "op", "body", "hoisted")
+    fields = ("count", "body")
+
+    def __init__(self, count, counter, reduction, op, body, line):
+        self.count = count
+        self.counter = counter
+        self.reduction = reduction
+        self.op = op
+        self.body = body
+        self.line = line
+        self.hoisted = []
+
+
+class While(Node):
+    """`hoisted` is filled in by loops.py"""
+    __slots__ = ("condition", "body", "hoisted")
+    fields = ("condition", "body")
+
+    def __init__(self, condition, body, line):
+        self.condition = condition
+        self.body = body
+        self.line = line
+        self.hoisted = []
+
+
+class If(Node):
+    """agar with its ya_fir branches: `branches` is a list of (condition, body) pairs"""
+    __slots__ = ("branches", "orelse")
+    fields = ("branches", "orelse")
+
+    def __init__(self, branches, orelse, line):
+        self.branches = branches
+        self.orelse = orelse
+        self.line = line
+
+    def children(self):
+        for condition, body in self.branches:
+            yield condition
+            yield from body
+        if self.orelse is not None:
+            yield from self.orelse
+
+
+class FuncDef(Node):
+    """`loop` and `memoize` are set by the passes in functions.py"""
+    __slots__ = ("name", "params", "body", "loop", "memoize")
+    fields = ("body",)
+
+    def __init__(self, name, params, body, line):
+        self.name = name
+        self.params = params
+        self.body = body
+        self.line = line
+        self.loop = False
+        self.memoize = None
+
+
+class Return(Node):
+    __slots__ = ("value",)
+    fields = ("value",)
+
+    def __init__(self, value, line):
+        self.value = value
+        self.line = line
+
+
+class TailCall(Node):
+    """`give f(...)` inside f, lowered to rebinding f's parameters and restarting its body"""
+    __slots__ = ("params", "args")
+    fields = ("args",)
+
+    def __init__(self, params, args, line):
+        self.params = params
+        self.args = args
+        self.line = line
+
+
+class Program(Node):
+    __slots__ = ("body",)
+    fields = ("body",)
+
+    def __init__(self, body, line=1):
+        self.body = body
+        self.line = line
@@ -0,0 +1,226 @@
+"""Constant folding and dead-branch elimination over the RID syntax tree (enabled with -O).
+
+Literal sub-expressions are evaluated with the same semantics the generated program
+would have at runtime, including RID's `+` (numbers add, anything else concatenates
+as strings). Anything that would raise at runtime, such as a division by zero or
+`num("abc")`, is left in place so the error still happens when the program runs.
+`agar`/`ya_fir` branches and `Run while` loops whose condition is a constant false,
+and `Run(n)` loops with a constant n <= 0, are removed.
+"""
+
+import ast
+import json
+import math
+import operator
+
+import nodes
+
+NO_VALUE = object()
+
+# Longest string literal folding may create, so `"ab" * 1000000` stays a runtime operation
+MAX_FOLDED_STRING = 4096
+# Largest int, in bits, folding may write as a literal; str() refuses ints of more than
+# 4300 digits (about 14000 bits), and products of bounded operands stay cheap to compute
+MAX_FOLDED_INT_BITS = 8192
+
+ARITHMETIC = {"-": operator.sub, "*": operator.mul, "/": operator.truediv, "%": operator.mod}
+COMPARISONS = {"==": operator.eq, "!=": operator.ne, "<": operator.lt, ">": operator.gt,
+               "<=": operator.le, ">=": operator.ge}
+CONVERSIONS = {"int": int, "float": float, "str": str, "bool": bool}
+
+
+def is_number(value):
+    return isinstance(value, (int, float))
+
+
+def literal_value(node):
+    """Python value of a literal node, or NO_VALUE if the node is not a literal"""
+    try:
+        if isinstance(node, nodes.Number):
+            return ast.literal_eval(node.value)
+        if isinstance(node, nodes.String):
+            return ast.literal_eval(f'"{node.value}"')
+    except (ValueError, SyntaxError):
+        return NO_VALUE
+
+    if isinstance(node, nodes.Bool):
+        return node.value == "True"
+    if isinstance(node, nodes.Neg):
+        value = literal_value(node.operand)
+        if is_number(value):
+            return -value
+    return NO_VALUE
+
+
+def literal_node(value, line):
+    """Literal node that evaluates to value, or None if it cannot be written as one"""
+    if isinstance(value, bool):
+        return nodes.Bool(str(value), line)
+    if isinstance(value, str):
+        if len(value) > MAX_FOLDED_STRING:
+            return None
+        return nodes.String(json.dumps(value, ensure_ascii=False)[1:-1], line)
+    if isinstance(value, int):
+        if abs(value).bit_length() > MAX_FOLDED_INT_BITS:
+            return None
+        if value < 0:
+            return nodes.Neg(nodes.Number(str(-value), line), line)
+        return nodes.Number(str(value), line)
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            return None
+        if math.copysign(1.0, value) < 0:
+            return nodes.Neg(nodes.Number(repr(-value), line), line)
+        return nodes.Number(repr(value), line)
+    return None
+
+
+def fold_binary(op, left, right):
+    if op == "+":
+        if is_number(left) and is_number(right):
+            return left + right
+        return str(left) + str(right)
+
+    if isinstance(left, str) or isinstance(right, str):
+        # Leave string repetition and formatting to the runtime
+        return NO_VALUE
+    try:
+        return ARITHMETIC[op](left, right)
+    except (ArithmeticError, TypeError):
+        return NO_VALUE
+
+
+class Optimizer:
+    def __init__(self):
+        self.statements = {
+            nodes.Run: self.loop_stmt,
+            nodes.ParallelRun: self.loop_stmt,
+            nodes.While: self.while_stmt,
+            nodes.If: self.conditional_stmt,
+            nodes.FuncDef: self.func_def,
+        }
+
+    def optimize(self, program):
+        program.body = self.block(program.body)
+        return program
+
+    def block(self, body):
+        result = []
+        for node in body:
+            handler = self.statements.get(type(node), self.simple_stmt)
+            result.extend(handler(node))
+        return result
+
+    # Statements return the list of nodes that replace them
+
+    def simple_stmt(self, node):
+        if getattr(node, "value", None) is not None and isinstance(node.value, nodes.Expr):
+            node.value = self.expression(node.value)
+        if isinstance(node, nodes.SetItem):
+            node.index = self.expression(node.index)
+        return [node]
+
+    def loop_stmt(self, node):
+        node.count = self.expression(node.count)
+        count = literal_value(node.count)
+        if count is not NO_VALUE:
+            try:
+                if int(count) <= 0:
+                    return []
+            except (ValueError, TypeError):
+                pass
+        node.body = self.block(node.body)
+        return [node]
+
+    def while_stmt(self, node):
+        node.condition = self.expression(node.condition)
+        condition = literal_value(node.condition)
+        if condition is not NO_VALUE and not condition:
+            return []
+        node.body = self.block(node.body)
+        return [node]
+
+    def conditional_stmt(self, node):
+        branches = []
+        orelse = node.orelse
+        for condition, body in node.branches:
+            condition = self.expression(condition)
+            value = literal_value(condition)
+            if value is NO_VALUE:
+                branches.append((condition, self.block(body)))
+            elif value:
+                # Always taken: it becomes the final else and later branches are dead
+                orelse = body
+                break
+
+        orelse = self.block(orelse) if orelse is not None else None
+        if not branches:
+            return orelse or []
+
+        node.branches = branches
+        node.orelse = orelse
+        return [node]
+
+    def func_def(self, node):
+        node.body = self.block(node.body)
+        return [node]
+
+    # Expressions
+
+    def expression(self, node):
+        if isinstance(node, nodes.BinOp):
+            node.left = self.expression(node.left)
+            node.right = self.expression(node.right)
+            left, right = literal_value(node.left), literal_value(node.right)
+            if left is not NO_VALUE and right is not NO_VALUE:
+                return self.folded(fold_binary(node.op, left, right), node)
+
+        elif isinstance(node, nodes.Compare):
+            node.left = self.expression(node.left)
+            node.right = self.expression(node.right)
+            left, right = literal_value(node.left), literal_value(node.right)
+            if left is not NO_VALUE and right is not NO_VALUE:
+                try:
+                    return self.folded(COMPARISONS[node.op](left, right), node)
+                except TypeError:
+                    pass
+
+        elif isinstance(node, nodes.Neg):
+            node.operand = self.expression(node.operand)
+            if isinstance(node.operand, nodes.Number):
+                return node
+            value = literal_value(node.operand)
+            if is_number(value):
+                return self.folded(-value, node)
+
+        elif isinstance(node, nodes.Convert):
+            node.arg = self.expression(node.arg)
+            value = literal_value(node.arg)
+            if value is not NO_VALUE:
+                try:
+                    return self.folded(CONVERSIONS[node.func](value), node)
+                except (ValueError, TypeError, OverflowError):
+                    pass
+
+        elif isinstance(node, (nodes.Call, nodes.Builtin)):
+            node.args = [self.expression(arg) for arg in node.args]
+
+        elif isinstance(node, nodes.List):
+            node.items = [self.expression(item) for item in node.items]
+
+        elif isinstance(node, nodes.Index):
+            node.value = self.expression(node.value)
+            node.index = self.expression(node.index)
+
+        return node
+
+    def folded(self, value, node):
+        if value is NO_VALUE:
+            return node
+        replacement = literal_node(value, node.line)
+        return node if replacement is None else replacement
+
+
+def optimize(program):
+    """Fold constants and drop dead branches in place; returns the Program"""
+    return Optimizer().optimize(program)
@@ -1,475 +1,734 @@
+import collections
+import sys
+
+import functions
+import inference
+import nodes
+import symbols
+from lexer import (
+    Token, IDENTIFIER, NUMBER, STRING,
+    LET, OUT, IN, RUN, WHILE, IF, ELIF, ELSE, FUNC, RETURN, BOOL, NEWLINE,
+    NUM_CONVERT, DEC_CONVERT, WORD_CONVERT, BOOL_CONVERT,
+    ASSIGN, PLUS, MINUS, MULT, DIV, MOD, EQ, NEQ, LT, GT, LTE, GTE,
+    LPAREN, RPAREN, LBRACE, RBRACE, LBRACKET, RBRACKET, COMMA, EOF,
+)
+
+COMPARISONS = {EQ: "==", NEQ: "!=", LT: "<", GT: ">", LTE: "<=", GTE: ">="}
+
+# Builtins and the numbers of arguments they accept. They are not keywords: a
+# function the program defines with the same name is called instead.
+BUILTINS = {
+    "len": (1,), "sum": (1,), "min": (1,), "max": (1,), "fill": (2,), "range": (1,),
+    "eof": (0,), "read": (0, 1), "numbers": (0, 1),
+}
+
+# What a `Run parallel` body may not contain, since its iterations run in other
+# processes; only the first four, and builtins that read input, are also checked
+# in the functions it calls
+PARALLEL_FORBIDDEN = {
+    nodes.Out: "out()", nodes.Newline: "line", nodes.Input: "in()", nodes.SetItem: "list element assignment",
+    nodes.Return: "give", nodes.FuncDef: "func",
+}
+
+
+def reads_input(node):
+    return isinstance(node, nodes.Builtin) and node.name in inference.INPUT_BUILTINS
+
+
+def forbidden_name(node):
+    """How a `Run parallel` error message names a forbidden node"""
+    return f"{node.name}()" if reads_input(node) else PARALLEL_FORBIDDEN[type(node)]
+
+
+class TokenStream:
+    """
+    Lookahead buffer over a token iterable.
+
+    Only tokens that have been peeked but not consumed are held in memory, so a
+    generator from lexer.iter_lex can be parsed without materialising the token list.
+    Past the end, an EOF token carrying the last line number is returned.
+    `current` is the token peek() returns; the parser's hot paths read it directly.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+        # Tokens after the current one that peek(offset) has read ahead
+        self.buffer = collections.deque()
+        self.eof = None
+        self.current = next(self.tokens, None) or self.end(None)
+
+    def end(self, last):
+        """The EOF token, numbered with the line of the last token before it"""
+        if self.eof is None:
+            self.eof = Token("EOF", EOF, "?" if last is None else last.line)
+        return self.eof
+
+    def peek(self, offset=0):
+        if not offset:
+            return self.current
+        buffer = self.buffer
+        while len(buffer) < offset:
+            buffer.append(next(self.tokens, None) or self.end(buffer[-1] if buffer else self.current))
+        return buffer[offset - 1]
+
+    def advance(self):
+        if self.buffer:
+            self.current = self.buffer.popleft()
+        else:
+            self.current = next(self.tokens, None) or self.end(self.current)
+
+
 class Parser:
+    """Recursive-descent parser that turns a token stream into a nodes.Program"""
+
     def __init__(self, token):
-        self.token = token
-        self.output = []
-        self.symbols = {}
+        self.tokens = TokenStream(token)
+        self.peek = self.tokens.peek
+        self.advance = self.tokens.advance
+        self.program = None
+        self.symbols = symbols.SymbolTable()
         self.functions = {}
-        self.position = 0
-        self.current_params = []
+        # Functions whose body is still being parsed
+        self.defining = set()
         self.handlers = {
-            "LET": self.var_declare,
-            "IDENTIFIER": self.assignment,
-            "OUT": self.print_stmt,
-            "RUN": self.loop_stmt,
-            "IF": self.conditional_stmt,
-            "ELIF": self.conditional_stmt,
-            "ELSE": self.conditional_stmt,
-            "FUNC": self.func_def,
-            "RETURN": self.return_stmt,
-            "NEWLINE": self.newline_stmt
+            LET: self.var_declare,
+            IDENTIFIER: self.assignment,
+            OUT: self.print_stmt,
+            RUN: self.loop_stmt,
+            IF: self.conditional_stmt,
+            ELIF: self.conditional_stmt,
+            ELSE: self.conditional_stmt,
+            FUNC: self.func_def,
+            RETURN: self.return_stmt,
+            NEWLINE: self.newline_stmt
         }
 
     def get_line_num(self):
         """Get the current line number from token"""
-        if self.position < len(self.token) and len(self.token[self.position]) > 2:
-            return self.token[self.position][2]
-        return "?"
+        return self.peek().line
 
-    def error(self, message, error_type="Syntax Error"):
-        """Format error message with line number and error type"""
-        line = self.get_line_num()
+    def error(self, message, error_type="Syntax Error", line=None):
+        """Format error message with line number (the current token's by default) and error type"""
+        if line is None:
+            line = self.get_line_num()
         return f"Line {line} -> {error_type}: {message}"
 
     def parse(self):
-        while self.position < len(self.token):
-            current_token = self.token[self.position]
-            token_type = current_token[1]
-
-            if token_type == "IDENTIFIER":
-                if self.position + 1 < len(self.token) and self.token[self.position + 1][1] == "LPAREN":
-                    handler = self.func_call
-                else:
-                    handler = self.assignment
+        """Parse the whole token stream and return the Program node"""
+        body = []
+        tokens = self.tokens
+        while tokens.current.kind != EOF:
+            body.append(self.statement())
+
+        self.program = nodes.Program(body)
+        return self.program
+
+    def statement(self):
+        current_token = self.tokens.current
+        token_type = current_token.kind
+
+        if token_type == IDENTIFIER:
+            if self.peek(1).kind == LPAREN:
+                handler = self.func_call
+            elif self.peek(1).kind == LBRACKET:
+                handler = self.index_assignment
             else:
-                handler = self.handlers.get(token_type, self.unknown_token)
+                handler = self.assignment
+        else:
+            handler = self.handlers.get(token_type, self.unknown_token)
 
-            handler(current_token)
+        return handler(current_token)
 
     def var_declare(self, current_token):
-        self.position += 1
-        var_token = self.token[self.position]
+        self.advance()
+        var_token = self.peek()
 
-        if var_token[1] != "IDENTIFIER":
-            raise SyntaxError(self.error(f"Expected variable name after 'Let', got '{var_token[0]}'"))
+        if var_token.kind != IDENTIFIER:
+            raise SyntaxError(self.error(f"Expected variable name after 'Let', got '{var_token.value}'"))
 
-        var_name = var_token[0]
-        self.position += 1
+        var_name = var_token.value
+        self.advance()
 
-        if self.token[self.position][1] != "ASSIGN":
+        if self.peek().kind != ASSIGN:
             raise SyntaxError(
-                self.error(f"Expected '=' after variable '{var_name}', got '{self.token[self.position][0]}'"))
+                self.error(f"Expected '=' after variable '{var_name}', got '{self.peek().value}'"))
 
-        self.position += 1
+        self.advance()
         expr = self.expression()
 
-        self.output.append(f"{var_name} = {expr.strip()}")
-        self.symbols[var_name] = expr
+        var_name = self.symbols.declare(var_name, symbols.VARIABLE, current_token.line, expr)
+        return nodes.Let(var_name, expr, current_token.line)
 
     def assignment(self, current_token):
-        var_name = current_token[0]
+        var_name = sys.intern(current_token.value)
 
-        if var_name not in self.symbols and var_name not in self.current_params:
+        if var_name not in self.symbols:
             raise NameError(
                 self.error(f"Variable '{var_name}' is not defined. Use 'Let {var_name} = ...' to declare it first", "Name Error"))
 
-        self.position += 1
-        if self.token[self.position][1] != "ASSIGN":
+        self.advance()
+        if self.tokens.current.kind != ASSIGN:
             raise SyntaxError(
-                self.error(f"Expected '=' after variable '{var_name}', got '{self.token[self.position][0]}'"))
+                self.error(f"Expected '=' after variable '{var_name}', got '{self.peek().value}'"))
 
-        self.position += 1
+        self.advance()
         expr = self.expression()
 
-        self.symbols[var_name] = expr
-        self.output.append(f"{var_name} = {expr.strip()}")
+        return nodes.Assign(var_name, expr, current_token.line)
+
+    def index_assignment(self, current_token):
+        var_name = sys.intern(current_token.value)
+
+        if var_name not in self.symbols:
+            raise NameError(
+                self.error(f"Variable '{var_name}' is not defined. Use 'Let {var_name} = ...' to declare it first", "Name Error"))
+
+        self.advance()
+        self.advance()
+        index = self.expression()
+
+        if self.peek().kind != RBRACKET:
+            raise SyntaxError(self.error(f"Expected ']' after index, got '{self.peek().value}'"))
+        self.advance()
+
+        if self.peek().kind != ASSIGN:
+            raise SyntaxError(
+                self.error(f"Expected '=' after '{var_name}[...]', got '{self.peek().value}'"))
+        self.advance()
+        expr = self.expression()
+
+        return nodes.SetItem(var_name, index, expr, current_token.line)
 
     def print_stmt(self, current_token):
-        self.position += 1
-        if self.position >= len(self.token):
+        self.advance()
+        if self.peek().kind == EOF:
             raise SyntaxError(self.error(f"Expected '(' after 'out', but reached end of file"))
-        if self.token[self.position][1] != "LPAREN":
-            raise SyntaxError(self.error(f"Expected '(' after 'out', got '{self.token[self.position][0]}'"))
-        self.position += 1
+        if self.peek().kind != LPAREN:
+            raise SyntaxError(self.error(f"Expected '(' after 'out', got '{self.peek().value}'"))
+        self.advance()
 
         value = self.expression()
 
-        if self.position >= len(self.token):
+        if self.peek().kind == EOF:
             raise SyntaxError(self.error(f"Expected ')' to close 'out' statement, but reached end of file"))
-        if self.token[self.position][1] != "RPAREN":
+        if self.peek().kind != RPAREN:
             raise SyntaxError(
-                self.error(f"Expected ')' to close 'out' statement, got '{self.token[self.position][0]}'"))
-        self.position += 1
-        self.output.append(f"print({value}, end='')")
+                self.error(f"Expected ')' to close 'out' statement, got '{self.peek().value}'"))
+        self.advance()
+        return nodes.Out(value, current_token.line)
 
     def newline_stmt(self, current_token):
-        self.position += 1
-        self.output.append("print()")
+        self.advance()
+        return nodes.Newline(current_token.line)
 
     def loop_stmt(self, current_token):
-        if current_token[1] != "RUN":
-            raise SyntaxError(self.error(f"Expected 'Run' keyword, got '{current_token[0]}'"))
-        self.position += 1
-        next_token = self.token[self.position]
-
-        if next_token[1] == "LPAREN":
-            self.position += 1
-            num_token = self.token[self.position]
-
-            if num_token[1] != "NUMBER":
-                raise TypeError(self.error(f"Expected numeric value inside 'Run()', got '{num_token[0]}'", "Type Error"))
-            loop_template = f"for _ in range(int({num_token[0]})):"
-            self.position += 1
-
-            if self.token[self.position][1] != "RPAREN":
-                raise SyntaxError(self.error(f"Expected ')' after loop count, got '{self.token[self.position][0]}'"))
-            self.position += 1
-
-            if self.token[self.position][1] != "LBRACE":
+        if current_token.kind != RUN:
+            raise SyntaxError(self.error(f"Expected 'Run' keyword, got '{current_token.value}'"))
+        self.advance()
+        next_token = self.peek()
+
+        if next_token.kind == IDENTIFIER and next_token.value == "parallel" and self.peek(1).kind == LPAREN:
+            return self.parallel_loop(current_token)
+
+        if next_token.kind == LPAREN:
+            self.advance()
+            count_token = self.peek()
+
+            if count_token.kind in (STRING, BOOL):
+                raise TypeError(self.error(f"Expected numeric value inside 'Run()', got '{count_token.value}'", "Type Error"))
+            count = self.expression()
+
+            counter = None
+            if self.peek().kind == COMMA:
+                self.advance()
+                if self.peek().kind != IDENTIFIER:
+                    raise SyntaxError(self.error(f"Expected counter name after ',' in 'Run()', got '{self.peek().value}'"))
+                counter = self.symbols.declare(self.peek().value, symbols.COUNTER, self.peek().line,
+                                               inference.COUNTER_VALUE)
+                self.advance()
+
+            if self.peek().kind != RPAREN:
+                raise SyntaxError(self.error(f"Expected ')' after loop count, got '{self.peek().value}'"))
+            self.advance()
+
+            if self.peek().kind != LBRACE:
                 raise SyntaxError(
-                    self.error(f"Expected '{{' to begin loop block, got '{self.token[self.position][0]}'"))
-            self.position += 1
+                    self.error(f"Expected '{{' to begin loop block, got '{self.peek().value}'"))
+            self.advance()
 
-            block_lines = self.block()
-            self.output.append(loop_template)
-            self.output.extend(["    " + line for line in block_lines])
+            return nodes.Run(count, self.block(), current_token.line, counter)
 
-        elif next_token[1] == "WHILE":
-            self.position += 1
+        elif next_token.kind == WHILE:
+            self.advance()
 
-            if self.token[self.position][1] != "LPAREN":
-                raise SyntaxError(self.error(f"Expected '(' after 'while', got '{self.token[self.position][0]}'"))
-            self.position += 1
-            cond_str = self.condition()
+            if self.peek().kind != LPAREN:
+                raise SyntaxError(self.error(f"Expected '(' after 'while', got '{self.peek().value}'"))
+            self.advance()
+            condition = self.condition()
 
-            if self.token[self.position][1] != "RPAREN":
+            if self.peek().kind != RPAREN:
                 raise SyntaxError(
-                    self.error(f"Expected ')' after while condition, got '{self.token[self.position][0]}'"))
-            self.position += 1
+                    self.error(f"Expected ')' after while condition, got '{self.peek().value}'"))
+            self.advance()
 
-            if self.token[self.position][1] != "LBRACE":
+            if self.peek().kind != LBRACE:
                 raise SyntaxError(
-                    self.error(f"Expected '{{' to begin while loop block, got '{self.token[self.position][0]}'"))
-            self.position += 1
-            block_lines = self.block()
+                    self.error(f"Expected '{{' to begin while loop block, got '{self.peek().value}'"))
+            self.advance()
 
-            self.output.append(f"while {cond_str}:")
-            self.output.extend(["    " + line for line in block_lines])
+            return nodes.While(condition, self.block(), current_token.line)
 
         else:
-            raise SyntaxError(self.error(f"Expected '(' or 'while' after 'Run', got '{next_token[0]}'"))
+            raise SyntaxError(self.error(f"Expected '(' or 'while' after 'Run', got '{next_token.value}'"))
+
+    def parallel_loop(self, current_token):
+        """`Run parallel(count, counter, reduction) { ... }`, from the word 'parallel'"""
+        self.advance()
+        self.advance()
+        if self.peek().kind in (STRING, BOOL):
+            raise TypeError(
+                self.error(f"Expected numeric value inside 'Run parallel()', got '{self.peek().value}'", "Type Error"))
+        count = self.expression()
+
+        names = []
+        for what in ("counter", "reduction variable"):
+            if self.peek().kind != COMMA:
+                raise SyntaxError(self.error(f"Expected ',' before the {what} in 'Run parallel()', got '{self.peek().value}'"))
+            self.advance()
+            if self.peek().kind != IDENTIFIER:
+                raise SyntaxError(self.error(f"Expected {what} name in 'Run parallel()', got '{self.peek().value}'"))
+            names.append(self.peek())
+            self.advance()
+        counter_token, reduction_token = names
+
+        reduction = sys.intern(reduction_token.value)
+        if reduction not in self.symbols:
+            raise NameError(self.error(f"Variable '{reduction}' is not defined", "Name Error", reduction_token.line))
+        if reduction == counter_token.value:
+            raise SyntaxError(self.error("The counter and the reduction variable of 'Run parallel' must differ",
+                                         line=reduction_token.line))
+
+        if self.peek().kind != RPAREN:
+            raise SyntaxError(self.error(f"Expected ')' after the reduction variable, got '{self.peek().value}'"))
+        self.advance()
+
+        if self.peek().kind != LBRACE:
+            raise SyntaxError(
+                self.error(f"Expected '{{' to begin parallel loop block, got '{self.peek().value}'"))
+        self.advance()
+
+        self.symbols.enter(symbols.PARALLEL)
+        counter = self.symbols.declare(counter_token.value, symbols.COUNTER, counter_token.line,
+                                       inference.COUNTER_VALUE)
+        body = self.block()
+        self.symbols.leave()
+
+        loop = nodes.ParallelRun(count, counter, reduction, None, body, current_token.line)
+        loop.op = self.check_parallel(loop)
+        return loop
+
+    def check_parallel(self, loop):
+        """
+        Check that the body of a `Run parallel` loop changes nothing outside itself
+        except the reduction variable, updated only as `r = r + ...` or `r = r * ...`
+        and read nowhere else, and return that operator
+        """
+        reduction = loop.reduction
+        # Parents come before their children
+        body = list(nodes.walk(nodes.Program(loop.body)))[1:]
+        local = {loop.counter}
+        for node in body:
+            if isinstance(node, nodes.Let):
+                if node.name in self.symbols:
+                    raise SyntaxError(self.error(
+                        f"Cannot declare '{node.name}' inside 'Run parallel', it is already declared outside it",
+                        line=node.line))
+                local.add(node.name)
+            elif isinstance(node, nodes.ParallelRun):
+                local.add(node.counter)
+
+        ops, updates = set(), set()
+        for node in body:
+            line = node.line
+            if type(node) in PARALLEL_FORBIDDEN or reads_input(node):
+                raise SyntaxError(self.error(f"Cannot use {forbidden_name(node)} inside 'Run parallel'", line=line))
+            if isinstance(node, nodes.Assign) and node.name not in local:
+                value = node.value
+                if node.name != reduction:
+                    raise SyntaxError(self.error(
+                        f"Cannot assign '{node.name}' inside 'Run parallel', only its reduction variable '{reduction}'",
+                        line=line))
+                # `r + a + b` is `(r + a) + b`
+                op = value.op if isinstance(value, nodes.BinOp) else None
+                left = value
+                while isinstance(left, nodes.BinOp) and left.op == op:
+                    left = left.left
+                if op not in ("+", "*") or not (isinstance(left, nodes.Name) and left.name == reduction):
+                    raise SyntaxError(self.error(
+                        f"'{reduction}' can only be updated as '{reduction} = {reduction} + ...' "
+                        f"or '{reduction} = {reduction} * ...' inside 'Run parallel'", line=line))
+                ops.add(op)
+                updates.add(id(left))
+            elif isinstance(node, nodes.Name) and node.name == reduction and id(node) not in updates:
+                raise SyntaxError(self.error(
+                    f"'{reduction}' cannot be read inside 'Run parallel' except to update it", line=line))
+            elif isinstance(node, nodes.Call):
+                problem = self.parallel_effect(node.name, reduction, set())
+                if problem is not None:
+                    raise SyntaxError(self.error(
+                        f"Cannot call '{node.name}' inside 'Run parallel': it {problem}", line=line))
+
+        if len(ops) > 1:
+            raise SyntaxError(self.error(f"'{reduction}' is updated with both + and * inside 'Run parallel'",
+                                         line=loop.line))
+        return ops.pop() if ops else "+"
+
+    def parallel_effect(self, name, reduction, seen):
+        """Why calling function name inside a `Run parallel` body that reduces into reduction is unsafe, or None"""
+        if name in self.defining:
+            return "is still being defined"
+        seen.add(name)
+        func = self.functions[name]
+        symbol = self.symbols.lookup(reduction)
+        if symbol.scope == symbols.GLOBAL and reduction in functions.free_names(func):
+            return f"reads '{reduction}'"
+        for node in nodes.walk(nodes.Program(func.body)):
+            if isinstance(node, (nodes.Out, nodes.Newline, nodes.Input, nodes.SetItem)) or reads_input(node):
+                return f"uses {forbidden_name(node)}"
+            if isinstance(node, nodes.Call) and node.name not in seen:
+                problem = self.parallel_effect(node.name, reduction, seen)
+                if problem is not None:
+                    return f"calls '{node.name}', which {problem}"
+        return None
 
     def conditional_stmt(self, current_token):
-        keyword = current_token[1]
-        if keyword not in ("IF", "ELIF", "ELSE"):
+        keyword = current_token.kind
+        if keyword not in (IF, ELIF, ELSE):
             raise SyntaxError(
-                self.error(f"Expected conditional keyword (agar/ya_fir/warna), got '{current_token[0]}'"))
-        self.position += 1
+                self.error(f"Expected conditional keyword (agar/ya_fir/warna), got '{current_token.value}'"))
+        if keyword != IF:
+            raise SyntaxError(self.error(f"'{current_token.value}' must follow an 'agar' block"))
+
+        branches = [self.conditional_branch(self.peek())]
+        while self.peek().kind == ELIF:
+            branches.append(self.conditional_branch(self.peek()))
+
+        orelse = None
+        if self.peek().kind == ELSE:
+            _, orelse = self.conditional_branch(self.peek())
+
+        return nodes.If(branches, orelse, current_token.line)
 
-        cond_str = ""
-        if keyword in ("IF", "ELIF"):
-            if self.token[self.position][1] != "LPAREN":
+    def conditional_branch(self, current_token):
+        """Parse one agar/ya_fir/warna keyword and block, returning (condition, body)"""
+        keyword = current_token.kind
+        self.advance()
+
+        condition = None
+        if keyword in (IF, ELIF):
+            if self.peek().kind != LPAREN:
                 raise SyntaxError(
-                    self.error(f"Expected '(' after '{current_token[0]}', got '{self.token[self.position][0]}'"))
-            self.position += 1
-            cond_str = self.condition()
+                    self.error(f"Expected '(' after '{current_token.value}', got '{self.peek().value}'"))
+            self.advance()
+            condition = self.condition()
 
-            if self.token[self.position][1] != "RPAREN":
-                raise SyntaxError(self.error(f"Expected ')' after condition, got '{self.token[self.position][0]}'"))
-            self.position += 1
+            if self.peek().kind != RPAREN:
+                raise SyntaxError(self.error(f"Expected ')' after condition, got '{self.peek().value}'"))
+            self.advance()
 
-        if self.token[self.position][1] != "LBRACE":
+        if self.peek().kind != LBRACE:
             raise SyntaxError(
-                self.error(f"Expected '{{' to begin conditional block, got '{self.token[self.position][0]}'"))
-        self.position += 1
-        block_lines = self.block()
-
-        if keyword == "IF":
-            self.output.append(f"if {cond_str}:")
-        elif keyword == "ELIF":
-            self.output.append(f"elif {cond_str}:")
-        else:
-            self.output.append("else:")
+                self.error(f"Expected '{{' to begin conditional block, got '{self.peek().value}'"))
+        self.advance()
 
-        for line in block_lines:
-            self.output.append("    " + line)
+        return condition, self.block()
 
     def func_def(self, current_token):
-        if current_token[1] != "FUNC":
-            raise SyntaxError(self.error(f"Expected 'func' keyword, got '{current_token[0]}'"))
-        self.position += 1
+        if current_token.kind != FUNC:
+            raise SyntaxError(self.error(f"Expected 'func' keyword, got '{current_token.value}'"))
+        self.advance()
 
-        func_name = self.token[self.position][0]
-        self.position += 1
+        func_name = sys.intern(self.peek().value)
+        self.advance()
 
-        if self.token[self.position][1] != "LPAREN":
+        if self.peek().kind != LPAREN:
             raise SyntaxError(
-                self.error(f"Expected '(' after function name '{func_name}', got '{self.token[self.position][0]}'"))
-        self.position += 1
+                self.error(f"Expected '(' after function name '{func_name}', got '{self.peek().value}'"))
+        self.advance()
         parameters = []
-
-        while self.position < len(self.token) and self.token[self.position][1] != "RPAREN":
-            if self.token[self.position][1] == "IDENTIFIER":
-                parameters.append(self.token[self.position][0])
-                self.position += 1
-            elif self.token[self.position][1] == "COMMA":
-                self.position += 1
+        self.symbols.enter()
+
+        while self.peek().kind not in (RPAREN, EOF):
+            if self.peek().kind == IDENTIFIER:
+                parameters.append(self.symbols.declare(self.peek().value, symbols.PARAMETER, self.peek().line))
+                self.advance()
+            elif self.peek().kind == COMMA:
+                self.advance()
             else:
                 raise SyntaxError(
-                    self.error(f"Invalid token in function parameters, expected parameter name or ',', got '{self.token[self.position][0]}'"))
+                    self.error(f"Invalid token in function parameters, expected parameter name or ',', got '{self.peek().value}'"))
 
-        if self.position >= len(self.token) or self.token[self.position][1] != "RPAREN":
+        if self.peek().kind != RPAREN:
             raise SyntaxError(self.error(f"Expected ')' after function parameters"))
-        self.position += 1
+        self.advance()
 
-        if self.token[self.position][1] != "LBRACE":
+        if self.peek().kind != LBRACE:
             raise SyntaxError(
-                self.error(f"Expected '{{' to begin function body, got '{self.token[self.position][0]}'"))
-        self.position += 1
+                self.error(f"Expected '{{' to begin function body, got '{self.peek().value}'"))
+        self.advance()
 
-        self.functions[func_name] = {"params": parameters, "body": []}
-        self.current_params = parameters
+        func = nodes.FuncDef(func_name, parameters, [], current_token.line)
+        self.functions[func_name] = func
 
-        block_lines = self.block()
+        self.defining.add(func_name)
+        func.body = self.block()
+        self.defining.discard(func_name)
 
-        params_str = ", ".join(parameters)
-        self.output.append(f"def {func_name}({params_str}):")
-        if block_lines:
-            self.output.extend(["    " + line for line in block_lines])
-        else:
-            self.output.append("    pass")
-
-        self.functions[func_name]["body"] = block_lines
-        self.current_params = []
+        self.symbols.leave()
+        return func
 
     def block(self):
-        block_lines = []
-        temp_output = []
-
-        while self.position < len(self.token) and self.token[self.position][1] != "RBRACE":
-            current_token = self.token[self.position]
-            token_type = current_token[1]
+        """Parse statements up to the closing '}' and return them as a list"""
+        body = []
+        while self.peek().kind not in (RBRACE, EOF):
+            body.append(self.statement())
 
-            original_output = self.output
-            self.output = temp_output
+        if self.peek().kind == RBRACE:
+            self.advance()
 
-            if token_type == "IDENTIFIER":
-                if self.position + 1 < len(self.token) and self.token[self.position + 1][1] == "LPAREN":
-                    self.func_call(current_token)
-                else:
-                    self.assignment(current_token)
-            else:
-                handler = self.handlers.get(token_type, self.unknown_token)
-                handler(current_token)
-
-            self.output = original_output
-            block_lines.extend(temp_output)
-            temp_output = []
-
-        if self.position < len(self.token) and self.token[self.position][1] == "RBRACE":
-            self.position += 1
-
-        return block_lines
+        return body
 
     def condition(self):
         lhs = self.expression()
 
-        if self.position >= len(self.token):
+        if self.peek().kind == EOF:
             raise SyntaxError(self.error("Incomplete condition"))
 
-        op_token = self.token[self.position]
-        op_map = {"EQ": "==", "NEQ": "!=", "LT": "<", "GT": ">", "LTE": "<=", "GTE": ">="}
+        op_token = self.peek()
 
-        if op_token[1] not in op_map:
+        if op_token.kind not in COMPARISONS:
             raise SyntaxError(
-                self.error(f"Invalid comparison operator, expected one of (==, !=, <, >, <=, >=), got '{op_token[0]}'"))
-        op = op_map[op_token[1]]
-        self.position += 1
+                self.error(f"Invalid comparison operator, expected one of (==, !=, <, >, <=, >=), got '{op_token.value}'"))
+        self.advance()
 
         rhs = self.expression()
 
-        return f"{lhs} {op} {rhs}"
+        return nodes.Compare(COMPARISONS[op_token.kind], lhs, rhs, op_token.line)
 
     def func_call(self, current_token):
         """Statement-level function call"""
-        call_str = self.parse_function_call()
-        self.output.append(call_str)
+        return nodes.ExprStmt(self.parse_function_call(), current_token.line)
 
     def return_stmt(self, current_token):
-        if current_token[1] != "RETURN":
-            raise SyntaxError(self.error(f"Expected 'give' keyword for return statement, got '{current_token[0]}'"))
-        self.position += 1
-
-        if (self.position >= len(self.token) or
-                self.token[self.position][1] in ["RBRACE", "RPAREN"]):
-            expr = ""
+        if current_token.kind != RETURN:
+            raise SyntaxError(self.error(f"Expected 'give' keyword for return statement, got '{current_token.value}'"))
+        if not self.symbols.in_function():
+            raise SyntaxError(self.error("'give' can only be used inside a 'func' body"))
+        self.advance()
+
+        if self.peek().kind in (RBRACE, RPAREN, EOF):
+            expr = None
         else:
             expr = self.expression()
 
-        self.output.append(f"return {expr}".strip())
+        return nodes.Return(expr, current_token.line)
 
     def expression(self):
         return self.parse_additive()
 
     def parse_additive(self):
         left = self.parse_multiplicative()
+        tokens = self.tokens
 
-        while self.position < len(self.token) and self.token[self.position][1] in ("PLUS", "MINUS"):
-            op = self.token[self.position][0]
-            self.position += 1
+        while tokens.current.kind in (PLUS, MINUS):
+            op_token = tokens.current
+            self.advance()
             right = self.parse_multiplicative()
-            if op == "+":
-                # Smart concatenation: convert to string if either operand is a string
-                left = f"({left} + {right} if isinstance({left}, (int, float)) and isinstance({right}, (int, float)) else str({left}) + str({right}))"
-            else:
-                left = f"{left} {op} {right}"
+            left = nodes.BinOp(op_token.value, left, right, op_token.line)
 
         return left
 
     def parse_multiplicative(self):
-        left = self.parse_primary()
+        left = self.parse_postfix()
+        tokens = self.tokens
 
-        while self.position < len(self.token) and self.token[self.position][1] in ("MULT", "DIV", "MOD"):
-            op = self.token[self.position][0]
-            self.position += 1
-            right = self.parse_primary()
-            left = f"{left} {op} {right}"
+        while tokens.current.kind in (MULT, DIV, MOD):
+            op_token = tokens.current
+            self.advance()
+            right = self.parse_postfix()
+            left = nodes.BinOp(op_token.value, left, right, op_token.line)
 
         return left
 
+    def parse_postfix(self):
+        """A primary expression followed by any number of `[index]`"""
+        value = self.parse_primary()
+
+        while self.tokens.current.kind == LBRACKET:
+            bracket_token = self.tokens.current
+            self.advance()
+            index = self.expression()
+
+            if self.peek().kind != RBRACKET:
+                raise SyntaxError(self.error(f"Expected ']' after index, got '{self.peek().value}'"))
+            self.advance()
+            value = nodes.Index(value, index, bracket_token.line)
+
+        return value
+
     def parse_primary(self):
-        if self.position >= len(self.token):
+        current = self.tokens.current
+        value_token, key_token = current.value, current.kind
+        if key_token == EOF:
             raise SyntaxError(self.error("Unexpected end of expression"))
 
-        current = self.token[self.position]
-        value_token, key_token = current[0], current[1]
-
-        if key_token == "MINUS":
-            self.position += 1
-            if self.position >= len(self.token):
+        if key_token == MINUS:
+            self.advance()
+            if self.peek().kind == EOF:
                 raise SyntaxError(self.error("Expected expression after '-'"))
 
-            next_token = self.token[self.position]
-            if next_token[1] == "NUMBER":
-                self.position += 1
-                return f"-{next_token[0]}"
-            else:
-                expr = self.parse_primary()
-                return f"-({expr})"
+            return nodes.Neg(self.parse_postfix(), current.line)
 
-        if key_token == "NUMBER":
-            self.position += 1
-            return value_token
+        if key_token == NUMBER:
+            self.advance()
+            return nodes.Number(value_token, current.line)
 
-        elif key_token == "STRING":
-            self.position += 1
-            return f'"{value_token}"'
+        elif key_token == STRING:
+            self.advance()
+            return nodes.String(value_token, current.line)
 
-        elif key_token == "BOOL":
-            self.position += 1
-            return value_token
+        elif key_token == BOOL:
+            self.advance()
+            return nodes.Bool(value_token, current.line)
 
-        elif key_token == "NUM_CONVERT":
+        elif key_token == NUM_CONVERT:
             return self.parse_type_conversion("int")
 
-        elif key_token == "DEC_CONVERT":
+        elif key_token == DEC_CONVERT:
             return self.parse_type_conversion("float")
 
-        elif key_token == "WORD_CONVERT":
+        elif key_token == WORD_CONVERT:
             return self.parse_type_conversion("str")
 
-        elif key_token == "BOOL_CONVERT":
+        elif key_token == BOOL_CONVERT:
             return self.parse_type_conversion("bool")
 
-        elif key_token == "IN":
-            self.position += 1
-            if self.position >= len(self.token) or self.token[self.position][1] != "LPAREN":
+        elif key_token == IN:
+            self.advance()
+            if self.peek().kind != LPAREN:
                 raise SyntaxError(self.error(f"Expected '(' after 'in'"))
-            self.position += 1
-
-            next_token = self.token[self.position]
-            if next_token[1] == "RPAREN":
-                self.position += 1
-                return "input()"
-            elif next_token[1] == "STRING":
-                prompt = f'"{next_token[0]}"'
-                self.position += 1
-                if self.position >= len(self.token) or self.token[self.position][1] != "RPAREN":
+            self.advance()
+
+            next_token = self.peek()
+            if next_token.kind == RPAREN:
+                self.advance()
+                return nodes.Input(None, current.line)
+            elif next_token.kind == STRING:
+                prompt = next_token.value
+                self.advance()
+                if self.peek().kind != RPAREN:
                     raise SyntaxError(self.error(f"Expected ')' after prompt string in 'in()'"))
-                self.position += 1
-                return f"input({prompt})"
+                self.advance()
+                return nodes.Input(prompt, current.line)
             else:
-                raise SyntaxError(self.error(f"Expected ')' or prompt string in 'in()', got '{next_token[0]}'"))
+                raise SyntaxError(self.error(f"Expected ')' or prompt string in 'in()', got '{next_token.value}'"))
 
-        elif key_token == "IDENTIFIER":
-            if self.position + 1 < len(self.token) and self.token[self.position + 1][1] == "LPAREN":
+        elif key_token == IDENTIFIER:
+            if self.peek(1).kind == LPAREN:
                 return self.parse_function_call()
             else:
-                if (value_token not in self.symbols and
-                        value_token not in self.current_params and
-                        value_token not in self.functions):
+                if value_token not in self.symbols and value_token not in self.functions:
                     raise NameError(self.error(f"Variable '{value_token}' is not defined", "Name Error"))
-                self.position += 1
-                return value_token
+                self.advance()
+                return nodes.Name(sys.intern(value_token), current.line)
 
-        elif key_token == "LPAREN":
-            self.position += 1
+        elif key_token == LPAREN:
+            self.advance()
             expr = self.parse_additive()
 
-            if self.position >= len(self.token) or self.token[self.position][1] != "RPAREN":
+            if self.peek().kind != RPAREN:
                 raise SyntaxError(self.error("Expected ')' to close expression"))
-            self.position += 1
-            return f"({expr})"
+            self.advance()
+            return expr
+
+        elif key_token == LBRACKET:
+            self.advance()
+            items = []
+
+            while self.peek().kind not in (RBRACKET, EOF):
+                items.append(self.expression())
+
+                if self.peek().kind == COMMA:
+                    self.advance()
+                elif self.peek().kind not in (RBRACKET, EOF):
+                    raise SyntaxError(self.error(f"Expected ',' or ']' in list, got '{self.peek().value}'"))
+
+            if self.peek().kind != RBRACKET:
+                raise SyntaxError(self.error("Expected ']' to close list"))
+            self.advance()
+            return nodes.List(items, current.line)
 
         else:
             raise SyntaxError(self.error(f"Unexpected token '{value_token}' in expression"))
 
     def parse_type_conversion(self, conversion_type):
-        self.position += 1
+        line = self.peek().line
+        self.advance()
 
-        if self.position >= len(self.token) or self.token[self.position][1] != "LPAREN":
+        if self.peek().kind != LPAREN:
             raise SyntaxError(
-                self.error(f"Expected '(' after type conversion '{conversion_type}', got '{self.token[self.position][0] if self.position < len(self.token) else 'EOL'}'"))
-        self.position += 1
+                self.error(f"Expected '(' after type conversion '{conversion_type}', got '{self.peek().value}'"))
+        self.advance()
 
         arg = self.expression()
 
-        if self.position >= len(self.token) or self.token[self.position][1] != "RPAREN":
+        if self.peek().kind != RPAREN:
             raise SyntaxError(
-                self.error(f"Expected ')' to close type conversion '{conversion_type}', got '{self.token[self.position][0] if self.position < len(self.token) else 'EOL'}'"))
-        self.position += 1
+                self.error(f"Expected ')' to close type conversion '{conversion_type}', got '{self.peek().value}'"))
+        self.advance()
 
-        return f"{conversion_type}({arg})"
+        return nodes.Convert(conversion_type, arg, line)
 
     def parse_function_call(self):
-        func_name = self.token[self.position][0]
+        func_token = self.peek()
+        func_name = sys.intern(func_token.value)
+        builtin = func_name not in self.functions and func_name in BUILTINS
 
-        if func_name not in self.functions:
+        if func_name not in self.functions and not builtin:
             raise NameError(self.error(f"Function '{func_name}' is not defined", "Name Error"))
 
-        self.position += 1
+        self.advance()
 
-        if self.position >= len(self.token) or self.token[self.position][1] != "LPAREN":
+        if self.peek().kind != LPAREN:
             raise SyntaxError(
-                self.error(f"Expected '(' after function name '{func_name}', got '{self.token[self.position][0]}'"))
-        self.position += 1
+                self.error(f"Expected '(' after function name '{func_name}', got '{self.peek().value}'"))
+        self.advance()
 
         args = []
 
-        while self.position < len(self.token) and self.token[self.position][1] != "RPAREN":
-            arg_expr = self.expression()
-            args.append(arg_expr)
+        while self.peek().kind not in (RPAREN, EOF):
+            args.append(self.expression())
 
-            if self.position < len(self.token) and self.token[self.position][1] == "COMMA":
-                self.position += 1
-            elif self.position < len(self.token) and self.token[self.position][1] != "RPAREN":
+            if self.peek().kind == COMMA:
+                self.advance()
+            elif self.peek().kind not in (RPAREN, EOF):
                 raise SyntaxError(
-                    self.error(f"Expected ',' or ')' in function call '{func_name}', got '{self.token[self.position][0]}'"))
+                    self.error(f"Expected ',' or ')' in function call '{func_name}', got '{self.peek().value}'"))
 
-        if self.position >= len(self.token) or self.token[self.position][1] != "RPAREN":
+        if self.peek().kind != RPAREN:
             raise SyntaxError(self.error(f"Expected ')' to close function call '{func_name}'"))
-        self.position += 1
+        self.advance()
+
+        if builtin:
+            counts = BUILTINS[func_name]
+            if len(args) not in counts:
+                expected = " or ".join(map(str, counts))
+                raise TypeError(self.error(
+                    f"'{func_name}()' takes {expected} argument{'' if counts == (1,) else 's'}, got {len(args)}",
+                    "Type Error"))
+            return nodes.Builtin(func_name, args, func_token.line)
 
-        return f"{func_name}({', '.join(args)})"
+        return nodes.Call(func_name, args, func_token.line)
 
     def unknown_token(self, current_token):
-        raise SyntaxError(self.error(f"Unexpected token '{current_token[0]}' of type '{current_token[1]}'"))
\ No newline at end of file
+        raise SyntaxError(self.error(f"Unexpected token '{current_token.value}' of type '{current_token.type}'"))
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""Per-phase instrumentation for `python main.py --profile`.
+
+A Profiler times each phase of a job (reading the file, lex, parse, the tree
+passes, codegen, compile, writing output.py, running the program) and, with
+tracemalloc, the peak memory allocated during it. Phases do not nest. Memory is
+not recorded for a program run as a subprocess; use --in-process to include it.
+tracemalloc slows allocation-heavy phases such as lexing down, so compare
+profiled timings with each other rather than with unprofiled runs.
+
+Other tools can subscribe with add_hook: `start(name)` is called as a phase
+begins and `end(name, record)` as it ends, where record is the dict that also
+goes into the JSON report.
+
+The program itself can also be run under cProfile. Its hottest functions are
+reported with the RID line of the `func` they were generated from (through the
+program's sourcemap.LineMap), and the top-level code is reported as `_rid_main`.
+"""
+
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+
+
+def phase(profiler, name, memory=True):
+    """profiler.phase(name), or a no-op context when profiler is None"""
+    return profiler.phase(name, memory) if profiler is not None else contextlib.nullcontext()
+
+
+class Profiler:
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.phases = []
+        self.functions = []
+        self.stats = None
+        self.start_hooks = []
+        self.end_hooks = []
+        self.started_tracing = False
+
+    def add_hook(self, start=None, end=None):
+        """Call start(name) when each phase begins and end(name, record) when it ends"""
+        if start is not None:
+            self.start_hooks.append(start)
+        if end is not None:
+            self.end_hooks.append(end)
+
+    @contextlib.contextmanager
+    def phase(self, name, memory=True):
+        """Time the body of the with statement; memory=False for work done in another process"""
+        memory = memory and self.memory
+        for hook in self.start_hooks:
+            hook(name)
+        if memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {"phase": name, "seconds": time.perf_counter() - start}
+            if memory:
+                record["peak_bytes"] = tracemalloc.get_traced_memory()[1] - baseline
+            self.phases.append(record)
+            for hook in self.end_hooks:
+                hook(name, record)
+
+    def stop(self):
+        """Stop tracemalloc if this profiler started it"""
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def run_profiled(self, func, *args, **kwargs):
+        """Call func under cProfile; the stats are kept for hot_functions"""
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            self.stats = pstats.Stats(profile)
+
+    def load_stats(self, path):
+        """Read stats written by `python -m cProfile -o path`"""
+        self.stats = pstats.Stats(path)
+
+    def hot_functions(self, filename, line_map, limit=10):
+        """
+        Record the functions from filename that spent the most time in their own code.
+        line_map is None when the program's line numbers are RID lines already.
+        """
+        target = os.path.abspath(filename)
+        functions = []
+        for (path, python_line, name), (_, calls, own, total, _) in self.stats.stats.items():
+            if os.path.abspath(path) != target:
+                continue
+            if line_map is not None:
+                rid_line = line_map.lookup(python_line)
+            else:
+                # Code objects start on line 1 at the earliest, so the helpers and
+                # _rid_main (line 0) are told apart by the prefix generated names use
+                rid_line = None if name.startswith(("_rid_", "<")) else python_line
+            functions.append({"function": name, "rid_line": rid_line, "python_line": python_line,
+                              "calls": calls, "own_seconds": own, "total_seconds": total})
+        functions.sort(key=lambda function: function["own_seconds"], reverse=True)
+        self.functions = functions[:limit]
+
+    def report_data(self, source=None):
+        return {"source": source, "total_seconds": sum(record["seconds"] for record in self.phases),
+                "phases": self.phases, "functions": self.functions}
+
+    def write_json(self, path, source=None):
+        with open(path, 'w') as file:
+            json.dump(self.report_data(source), file, indent=2)
+
+    def report(self, out=None):
+        out = out if out is not None else sys.stderr
+        print(f"\n{'phase':<12} {'ms':>10} {'peak KiB':>10}", file=out)
+        for record in self.phases:
+            peak = record.get("peak_bytes")
+            peak = f"{peak / 1024:>10.1f}" if peak is not None else f"{'-':>10}"
+            print(f"{record['phase']:<12} {record['seconds'] * 1e3:>10.2f} {peak}", file=out)
+        if self.functions:
+            print(f"\n{'calls':>9} {'own ms':>9} {'total ms':>9}  function (RID line)", file=out)
+            for function in self.functions:
+                if function["rid_line"] is not None:
+                    where = f"line {function['rid_line']}"
+                elif function["function"] in ("_rid_main", "<module>"):
+                    where = "top level"
+                else:
+                    where = "runtime helper"
+                print(f"{function['calls']:>9} {function['own_seconds'] * 1e3:>9.2f} "
+                      f"{function['total_seconds'] * 1e3:>9.2f}  {function['function']} ({where})", file=out)
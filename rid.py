@@ -0,0 +1,188 @@
+"""Library interface for transpiling and running RID programs without a subprocess."""
+import functools
+import hashlib
+import io
+import sys
+
+import astgen
+import cache
+import codegen
+import functions
+import inference
+import lexer
+import loops
+import nodes
+import optimizer
+import parser
+import profiling
+import runtime
+import sourcemap
+import symbols
+from parser import Parser
+
+__version__ = "1.1.0"
+
+TRANSPILER_MODULES = (lexer, parser, symbols, nodes, optimizer, functions, inference, loops, codegen, astgen,
+                      runtime, sourcemap, sys.modules[__name__])
+
+# "text" generates Python source and compiles it; "ast" compiles an astgen tree directly
+BACKENDS = ("text", "ast")
+
+
+def parse_source(source):
+    """Parse RID source text into a nodes.Program"""
+    return Parser(lexer.iter_lex(source)).parse()
+
+
+def transpile_source(source, infer_types=True, optimize=False, memoize=None, profiler=None):
+    """
+    Transpile RID source text to Python source text.
+
+    `optimize` runs the -O passes. `memoize` wraps provably pure functions in
+    lru_cache with that maxsize (0 for unbounded); None leaves them alone. Loop
+    invariants are only hoisted when types are inferred, since safety depends on them.
+    A profiling.Profiler records each phase.
+    """
+    return transpile_mapped(source, infer_types, optimize, memoize, profiler)[0]
+
+
+def transpile_mapped(source, infer_types=True, optimize=False, memoize=None, profiler=None):
+    """Like transpile_source, but return (python_code, sourcemap.LineMap)"""
+    program = parse_with_passes(source, infer_types, optimize, memoize, profiler)
+    with profiling.phase(profiler, "codegen"):
+        return codegen.generate_mapped(program)
+
+
+def transpile_tree(source, infer_types=True, optimize=False, memoize=None, profiler=None):
+    """
+    Like transpile_source, but return a Python ast.Module (see astgen.py) whose
+    statement line numbers are RID lines.
+    """
+    program = parse_with_passes(source, infer_types, optimize, memoize, profiler)
+    with profiling.phase(profiler, "codegen"):
+        return astgen.generate(program)
+
+
+def parse_with_passes(source, infer_types=True, optimize=False, memoize=None, profiler=None):
+    if profiler is None:
+        program = parse_source(source)
+    else:
+        # Lex up front, rather than streaming tokens, so the two phases are timed apart.
+        # A plain Token list, since parsing a TokenBuffer builds a Token per element.
+        with profiler.phase("lex"):
+            tokens = list(lexer.iter_lex(source))
+        with profiler.phase("parse"):
+            program = Parser(tokens).parse()
+    with profiling.phase(profiler, "passes"):
+        return run_passes(program, infer_types, optimize, memoize)
+
+
+def run_passes(program, infer_types=True, optimize=False, memoize=None):
+    """Apply the tree passes transpile_source runs between parsing and codegen"""
+    if optimize:
+        optimizer.optimize(program)
+    # One pass over the statements finds what the passes below look for
+    function_defs, mutates_lists = [], False
+    for node in nodes.statements(program.body):
+        if isinstance(node, nodes.FuncDef):
+            function_defs.append(node)
+        elif isinstance(node, nodes.SetItem):
+            mutates_lists = True
+    functions.lower_tail_calls(function_defs)
+    types = inference.annotate(program) if infer_types else None
+    if memoize is not None:
+        functions.mark_pure_functions(program, memoize, types.var_types if types else None)
+    if infer_types:
+        loops.hoist_invariants(program, mutates_lists)
+    return program
+
+
+def compile_source(source, filename="<rid>", optimize=False, memoize=None, backend="text"):
+    """Transpile RID source text and compile it to a code object with the given backend"""
+    if backend == "ast":
+        return compile(transpile_tree(source, optimize=optimize, memoize=memoize), filename, "exec")
+    return compile(transpile_source(source, optimize=optimize, memoize=memoize), filename, "exec")
+
+
+@functools.lru_cache(maxsize=None)
+def transpiler_fingerprint():
+    """Identify this transpiler build: version, bytecode format and module sources"""
+    digest = hashlib.sha256(f"{__version__}\0{sys.implementation.cache_tag}".encode())
+    for module in TRANSPILER_MODULES:
+        with open(module.__file__, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def source_key(source, filename, optimize=False, memoize=None, backend="text"):
+    digest = hashlib.sha256(transpiler_fingerprint().encode())
+    digest.update(f"{filename}\0{int(optimize)}\0{memoize}\0{backend}\0".encode() + source.encode())
+    return digest.hexdigest()
+
+
+def load_program(source, filename="<rid>", cache_dir=None, optimize=False, memoize=None, profiler=None,
+                 backend="text"):
+    """
+    Return (python_code, code, line_map) for RID source text; line_map is the
+    sourcemap.LineMap from lines of python_code to RID lines.
+
+    The "ast" backend compiles the tree without generating source: python_code and
+    line_map are None, and the lines in code are already RID lines.
+
+    When `cache_dir` is given, a previously stored result for the same source,
+    filename, options and transpiler build is reused, and new results are stored there.
+    """
+    program_cache = cache.ProgramCache(cache_dir) if cache_dir else None
+    if program_cache is not None:
+        with profiling.phase(profiler, "cache"):
+            key = source_key(source, filename, optimize, memoize, backend)
+            cached = program_cache.get(key)
+        if cached is not None:
+            return cached
+
+    if backend == "ast":
+        python_code = line_map = None
+        tree = transpile_tree(source, optimize=optimize, memoize=memoize, profiler=profiler)
+        with profiling.phase(profiler, "compile"):
+            code = compile(tree, filename, "exec")
+    else:
+        python_code, line_map = transpile_mapped(source, optimize=optimize, memoize=memoize, profiler=profiler)
+        with profiling.phase(profiler, "compile"):
+            code = compile(python_code, filename, "exec")
+
+    if program_cache is not None:
+        with profiling.phase(profiler, "cache store"):
+            program_cache.put(key, python_code, code, line_map)
+    return python_code, code, line_map
+
+
+def run_code(code, stdin=None, stdout=None):
+    """
+    Execute a compiled program in a fresh namespace.
+
+    `stdin` may be a string or a file-like object; `stdout` a writable file-like object.
+    When `stdout` is None the program output is captured and returned as a string.
+    The process-wide sys.stdin/sys.stdout are swapped while the program runs, so
+    concurrent calls must not share a process.
+    """
+    if isinstance(stdin, str):
+        stdin = io.StringIO(stdin)
+    capture = io.StringIO() if stdout is None else None
+
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    original_stdin, original_stdout = sys.stdin, sys.stdout
+    if stdin is not None:
+        sys.stdin = stdin
+    sys.stdout = capture if capture is not None else stdout
+    try:
+        exec(code, namespace)
+    finally:
+        sys.stdout.flush()
+        sys.stdin, sys.stdout = original_stdin, original_stdout
+
+    return capture.getvalue() if capture is not None else None
+
+
+def run_source(source, stdin=None, stdout=None, optimize=False, memoize=None):
+    """Transpile, compile and run RID source text in the current process"""
+    return run_code(compile_source(source, optimize=optimize, memoize=memoize), stdin=stdin, stdout=stdout)
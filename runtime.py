@@ -0,0 +1,343 @@
+"""Runtime helpers that the transpiler emits into the prelude of generated programs.
+
+out() and line write through _rid_out, which collects text in a list and writes it to
+sys.stdout in one call once RID_OUTPUT_BUFFER writes (default 4096) are pending, before
+the program waits for input and when the program ends. Set RID_OUTPUT_BUFFER=1 to write
+immediately.
+
+in() reads lines with sys.stdin.readline rather than input(), which checks whether
+the streams are a terminal on every call. eof() reads one line ahead and keeps it
+for the next read. read() and numbers() take the rest of stdin (or a whole file) at
+once; numbers() parses it in blocks of about 4 MB, with NumPy's C parser when NumPy
+is installed, falling back to int() and float() for any block NumPy rejects.
+
+RID lists are _RidList objects holding 64-bit integers or floats in a NumPy array, or
+in an array.array when NumPy is not installed or RID_NUMPY=0 is set. Whole-list
+arithmetic and sum/min/max run inside NumPy or as a C-level map() over the arrays;
+both storages print, compare and raise the same way, except that integer results
+too large for 64 bits wrap around under NumPy instead of raising OverflowError.
+_rid_add and the sum/min/max of the _rid_values helper treat as lists the operands
+in _RID_LISTS, which the list helper fills in when it is emitted. Only list
+literals, fill(), range() and numbers() emit it, so a program without lists does
+not import NumPy.
+
+A `Run parallel` body becomes a function of (start, stop) that returns its chunk's
+partial reduction. _rid_parallel splits the iterations into chunks for a
+ProcessPoolExecutor of RID_WORKERS (default: every CPU) forked processes, which
+inherit the function: it is parked in the _rid_parallel module, so only the
+chunk bounds and the numbers they return are pickled. A loop runs in-process
+when there is one worker or one iteration, inside a worker, or where fork is
+unavailable (Windows).
+"""
+
+HELPERS = {
+    "_rid_add": (
+        "_RID_LISTS = ()\n"
+        "def _rid_add(left, right):\n"
+        "    if isinstance(left, (int, float)) and isinstance(right, (int, float)):\n"
+        "        return left + right\n"
+        "    if isinstance(left, _RID_LISTS) or isinstance(right, _RID_LISTS):\n"
+        "        return left + right\n"
+        "    return str(left) + str(right)\n"
+    ),
+    "_rid_functools": "import functools as _rid_functools\n",
+    "_rid_out": (
+        "import os as _rid_os\n"
+        "import sys as _rid_sys\n"
+        "_rid_chunks = []\n"
+        "_RID_BUFFER_LIMIT = int(_rid_os.environ.get('RID_OUTPUT_BUFFER', 4096))\n"
+        "def _rid_flush():\n"
+        "    if _rid_chunks:\n"
+        "        _rid_sys.stdout.write(''.join(_rid_chunks))\n"
+        "        _rid_chunks.clear()\n"
+        "        _rid_sys.stdout.flush()\n"
+        "def _rid_out(text):\n"
+        "    _rid_chunks.append(text)\n"
+        "    if len(_rid_chunks) >= _RID_BUFFER_LIMIT:\n"
+        "        _rid_flush()\n"
+    ),
+    "_rid_input": (
+        "import array as _rid_array\n"
+        "import sys as _rid_sys\n"
+        "import warnings as _rid_warnings\n"
+        "_rid_pending = []\n"
+        "def _rid_input(prompt=''):\n"
+        "    if prompt:\n"
+        "        _rid_out(prompt)\n"
+        "    if _rid_pending:\n"
+        "        line = _rid_pending.pop()\n"
+        "    else:\n"
+        "        _rid_flush()\n"
+        "        line = _rid_sys.stdin.readline()\n"
+        "    if not line:\n"
+        "        raise EOFError('EOF when reading a line')\n"
+        "    return line[:-1] if line[-1] == '\\n' else line\n"
+        "def _rid_eof():\n"
+        "    if not _rid_pending:\n"
+        "        _rid_flush()\n"
+        "        _rid_pending.append(_rid_sys.stdin.readline())\n"
+        "    return not _rid_pending[0]\n"
+        "def _rid_open(path, name):\n"
+        "    if not isinstance(path, str):\n"
+        "        raise TypeError(f'{name}() needs a file path, got {type(path).__name__}')\n"
+        "    return open(path)\n"
+        "def _rid_rest():\n"
+        "    _rid_flush()\n"
+        "    head = ''.join(_rid_pending)\n"
+        "    _rid_pending.clear()\n"
+        "    return head\n"
+        "def _rid_read(path=None):\n"
+        "    if path is None:\n"
+        "        return _rid_rest() + _rid_sys.stdin.read()\n"
+        "    with _rid_open(path, 'read') as file:\n"
+        "        return file.read()\n"
+        "def _rid_batches(text, file):\n"
+        "    # Blocks of the input that end between two numbers\n"
+        "    while True:\n"
+        "        block = file.read(1 << 22)\n"
+        "        text += block\n"
+        "        cut = len(text)\n"
+        "        if block:\n"
+        "            while cut and not text[cut - 1].isspace():\n"
+        "                cut -= 1\n"
+        "        if cut:\n"
+        "            yield text[:cut]\n"
+        "            text = text[cut:]\n"
+        "        elif not block:\n"
+        "            return\n"
+        "def _rid_numpy_numbers(text, floats):\n"
+        "    # fromstring parses in C; None leaves a block it rejects, or that may have saturated, to int() and float()\n"
+        "    if text.isspace():\n"
+        "        return None\n"
+        "    with _rid_warnings.catch_warnings():\n"
+        "        _rid_warnings.simplefilter('error')\n"
+        "        for dtype in (_rid_np.float64,) if floats else (_rid_np.int64, _rid_np.float64):\n"
+        "            try:\n"
+        "                values = _rid_np.fromstring(text, dtype=dtype, sep=' ')\n"
+        "            except (ValueError, DeprecationWarning):\n"
+        "                continue\n"
+        "            if dtype is _rid_np.int64 and len(values):\n"
+        "                limits = _rid_np.iinfo(_rid_np.int64)\n"
+        "                if values.max() == limits.max or values.min() == limits.min:\n"
+        "                    return None\n"
+        "            return values\n"
+        "    return None\n"
+        "def _rid_parse_numbers(text, file):\n"
+        "    parts, floats = [], False\n"
+        "    for block in _rid_batches(text, file):\n"
+        "        values = None if _rid_np is None else _rid_numpy_numbers(block, floats)\n"
+        "        if values is None:\n"
+        "            tokens = block.split()\n"
+        "            if not floats:\n"
+        "                try:\n"
+        "                    values = _rid_array.array('q', map(int, tokens))\n"
+        "                except ValueError:\n"
+        "                    floats = True\n"
+        "            if floats:\n"
+        "                values = _rid_array.array('d', map(float, tokens))\n"
+        "        else:\n"
+        "            floats = floats or values.dtype == _rid_np.float64\n"
+        "        parts.append(values)\n"
+        "    if _rid_np is not None:\n"
+        "        dtype = _rid_np.float64 if floats else _rid_np.int64\n"
+        "        return _RidList(_rid_np.concatenate([_rid_np.asarray(part, dtype=dtype) for part in parts] or [_rid_np.empty(0, dtype)]))\n"
+        "    values = _rid_array.array('d' if floats else 'q')\n"
+        "    for part in parts:\n"
+        "        values.extend(part if part.typecode == values.typecode else _rid_array.array('d', part))\n"
+        "    return _RidList(values)\n"
+        "def _rid_numbers(path=None):\n"
+        "    if path is None:\n"
+        "        return _rid_parse_numbers(_rid_rest(), _rid_sys.stdin)\n"
+        "    with _rid_open(path, 'numbers') as file:\n"
+        "        return _rid_parse_numbers('', file)\n"
+    ),
+    "_rid_values": (
+        "_RID_LISTS = ()\n"
+        "_rid_len = len\n"
+        "def _rid_values(values, name):\n"
+        "    if not isinstance(values, _RID_LISTS):\n"
+        "        raise TypeError(f'{name}() needs a list, got {type(values).__name__}')\n"
+        "    if name != 'sum' and not len(values):\n"
+        "        raise ValueError(f'{name}() of an empty list')\n"
+        "    return values.data\n"
+        "def _rid_sum(values):\n"
+        "    data = _rid_values(values, 'sum')\n"
+        "    return sum(data) if _rid_np is None else data.sum().item()\n"
+        "def _rid_min(values):\n"
+        "    data = _rid_values(values, 'min')\n"
+        "    return min(data) if _rid_np is None else data.min().item()\n"
+        "def _rid_max(values):\n"
+        "    data = _rid_values(values, 'max')\n"
+        "    return max(data) if _rid_np is None else data.max().item()\n"
+    ),
+    "_rid_list": (
+        "import array as _rid_array\n"
+        "import itertools as _rid_itertools\n"
+        "import operator as _rid_operator\n"
+        "import os as _rid_os\n"
+        "_rid_np = None\n"
+        "if _rid_os.environ.get('RID_NUMPY') != '0':\n"
+        "    try:\n"
+        "        import numpy as _rid_np\n"
+        "    except ImportError:\n"
+        "        pass\n"
+        "_RID_NUMPY_OPERATORS = {'add': 'add', 'sub': 'subtract', 'mul': 'multiply', 'truediv': 'true_divide', 'mod': 'remainder'}\n"
+        "def _rid_floats(value):\n"
+        "    if isinstance(value, (int, float)):\n"
+        "        return isinstance(value, float)\n"
+        "    return value.typecode == 'd' if _rid_np is None else value.dtype.kind == 'f'\n"
+        "def _rid_store(floats, values):\n"
+        "    if _rid_np is None:\n"
+        "        return _RidList(_rid_array.array('d' if floats else 'q', values))\n"
+        "    return _RidList(_rid_np.array(values, dtype=_rid_np.float64 if floats else _rid_np.int64))\n"
+        "def _rid_elementwise(name, left, right):\n"
+        "    if not isinstance(left, (int, float, _RidList)) or not isinstance(right, (int, float, _RidList)):\n"
+        "        return NotImplemented\n"
+        "    if isinstance(left, _RidList) and isinstance(right, _RidList) and len(left) != len(right):\n"
+        "        raise ValueError(f'lists of different lengths: {len(left)} and {len(right)}')\n"
+        "    left = left.data if isinstance(left, _RidList) else left\n"
+        "    right = right.data if isinstance(right, _RidList) else right\n"
+        "    if _rid_np is None:\n"
+        "        floats = name == 'truediv' or _rid_floats(left) or _rid_floats(right)\n"
+        "        left = _rid_itertools.repeat(left) if isinstance(left, (int, float)) else left\n"
+        "        right = _rid_itertools.repeat(right) if isinstance(right, (int, float)) else right\n"
+        "        return _rid_store(floats, map(getattr(_rid_operator, name), left, right))\n"
+        "    if name in ('truediv', 'mod'):\n"
+        "        _rid_check_divisor(name, left, right)\n"
+        "    return _RidList(getattr(_rid_np, _RID_NUMPY_OPERATORS[name])(left, right))\n"
+        "def _rid_check_divisor(name, left, right):\n"
+        "    # NumPy gives inf or 0 for a zero divisor; raise what Python raises for the first one\n"
+        "    if isinstance(right, (int, float)):\n"
+        "        if right == 0 and len(left):\n"
+        "            getattr(_rid_operator, name)(left.item(0), right)\n"
+        "    elif not right.all():\n"
+        "        index = int(_rid_np.argmin(right != 0))\n"
+        "        getattr(_rid_operator, name)(left if isinstance(left, (int, float)) else left.item(index), right.item(index))\n"
+        "class _RidList:\n"
+        "    __slots__ = ('data',)\n"
+        "    __hash__ = None\n"
+        "    def __init__(self, data):\n"
+        "        self.data = data\n"
+        "    def __len__(self):\n"
+        "        return len(self.data)\n"
+        "    def __getitem__(self, index):\n"
+        "        try:\n"
+        "            return self.data[index] if _rid_np is None else self.data.item(index)\n"
+        "        except IndexError:\n"
+        "            raise IndexError('list index out of range') from None\n"
+        "        except TypeError:\n"
+        "            if isinstance(index, bool):\n"
+        "                return self[int(index)]\n"
+        "            raise TypeError(f'list indices must be integers, not {type(index).__name__}') from None\n"
+        "    def __setitem__(self, index, value):\n"
+        "        if not isinstance(value, (int, float)) or isinstance(value, float) and not _rid_floats(self.data):\n"
+        "            kind = 'decimal' if _rid_floats(self.data) else 'integer'\n"
+        "            raise TypeError(f'cannot store {type(value).__name__} in a list of {kind}s')\n"
+        "        if not isinstance(index, int):\n"
+        "            raise TypeError(f'list indices must be integers, not {type(index).__name__}')\n"
+        "        try:\n"
+        "            self.data[int(index)] = value\n"
+        "        except IndexError:\n"
+        "            raise IndexError('list assignment index out of range') from None\n"
+        "    def __str__(self):\n"
+        "        return str(self.data.tolist())\n"
+        "    __repr__ = __str__\n"
+        "    def __eq__(self, other):\n"
+        "        if not isinstance(other, _RidList) or len(self) != len(other):\n"
+        "            return False\n"
+        "        return self.data == other.data if _rid_np is None else bool(_rid_np.array_equal(self.data, other.data))\n"
+        "    def __add__(self, other):\n"
+        "        if isinstance(other, (int, float, _RidList)):\n"
+        "            return _rid_elementwise('add', self, other)\n"
+        "        return str(self) + str(other)\n"
+        "    def __radd__(self, other):\n"
+        "        if isinstance(other, (int, float)):\n"
+        "            return _rid_elementwise('add', other, self)\n"
+        "        return str(other) + str(self)\n"
+        "    def __sub__(self, other):\n"
+        "        return _rid_elementwise('sub', self, other)\n"
+        "    def __rsub__(self, other):\n"
+        "        return _rid_elementwise('sub', other, self)\n"
+        "    def __mul__(self, other):\n"
+        "        return _rid_elementwise('mul', self, other)\n"
+        "    def __rmul__(self, other):\n"
+        "        return _rid_elementwise('mul', other, self)\n"
+        "    def __truediv__(self, other):\n"
+        "        return _rid_elementwise('truediv', self, other)\n"
+        "    def __rtruediv__(self, other):\n"
+        "        return _rid_elementwise('truediv', other, self)\n"
+        "    def __mod__(self, other):\n"
+        "        return _rid_elementwise('mod', self, other)\n"
+        "    def __rmod__(self, other):\n"
+        "        return _rid_elementwise('mod', other, self)\n"
+        "    def __neg__(self):\n"
+        "        if _rid_np is None:\n"
+        "            return _rid_store(_rid_floats(self.data), map(_rid_operator.neg, self.data))\n"
+        "        return _RidList(-self.data)\n"
+        "_RID_LISTS = (_RidList,)\n"
+        "def _rid_list(values):\n"
+        "    for value in values:\n"
+        "        if not isinstance(value, (int, float)):\n"
+        "            raise TypeError(f'list elements must be numbers, got {type(value).__name__}')\n"
+        "    return _rid_store(any(isinstance(value, float) for value in values), values)\n"
+        "def _rid_fill(count, value):\n"
+        "    count = max(_rid_operator.index(count), 0)\n"
+        "    if not isinstance(value, (int, float)):\n"
+        "        raise TypeError(f'list elements must be numbers, got {type(value).__name__}')\n"
+        "    if _rid_np is None:\n"
+        "        return _RidList(_rid_array.array('d' if isinstance(value, float) else 'q', [value]) * count)\n"
+        "    return _RidList(_rid_np.full(count, value, dtype=_rid_np.float64 if isinstance(value, float) else _rid_np.int64))\n"
+        "def _rid_range(count):\n"
+        "    count = _rid_operator.index(count)\n"
+        "    if _rid_np is None:\n"
+        "        return _RidList(_rid_array.array('q', range(count)))\n"
+        "    return _RidList(_rid_np.arange(max(count, 0), dtype=_rid_np.int64))\n"
+    ),
+    "_rid_parallel": (
+        "import concurrent.futures as _rid_futures\n"
+        "import multiprocessing as _rid_multiprocessing\n"
+        "import os as _rid_os\n"
+        "import sys as _rid_sys\n"
+        "import types as _rid_types\n"
+        "_RID_WORKERS = int(_rid_os.environ.get('RID_WORKERS', 0)) or _rid_os.cpu_count() or 1\n"
+        "_rid_parallel_state = _rid_types.ModuleType('_rid_parallel')\n"
+        "_rid_parallel_state.body = None\n"
+        "_rid_parallel_state.worker = False\n"
+        "_rid_sys.modules['_rid_parallel'] = _rid_parallel_state\n"
+        "def _rid_partial(value):\n"
+        "    if not isinstance(value, (int, float)):\n"
+        "        raise TypeError(f'Run parallel can only reduce numbers, got {type(value).__name__}')\n"
+        "    return value\n"
+        "def _rid_parallel_task(start, stop):\n"
+        "    return _rid_partial(_rid_parallel_state.body(start, stop))\n"
+        "def _rid_parallel_worker():\n"
+        "    _rid_parallel_state.worker = True\n"
+        "_rid_parallel_task.__module__ = _rid_parallel_worker.__module__ = '_rid_parallel'\n"
+        "_rid_parallel_state._rid_parallel_task = _rid_parallel_task\n"
+        "_rid_parallel_state._rid_parallel_worker = _rid_parallel_worker\n"
+        "def _rid_parallel(body, count):\n"
+        "    workers = min(_RID_WORKERS, count)\n"
+        "    if workers < 2 or _rid_parallel_state.worker or 'fork' not in _rid_multiprocessing.get_all_start_methods():\n"
+        "        return [_rid_partial(body(0, max(count, 0)))]\n"
+        "    chunks = min(count, workers * 4)\n"
+        "    bounds = [count * index // chunks for index in range(chunks + 1)]\n"
+        "    _rid_parallel_state.body = body\n"
+        "    _rid_sys.stdout.flush()\n"
+        "    try:\n"
+        "        with _rid_futures.ProcessPoolExecutor(workers, _rid_multiprocessing.get_context('fork'),\n"
+        "                                              _rid_parallel_worker) as executor:\n"
+        "            return list(executor.map(_rid_parallel_task, bounds[:-1], bounds[1:]))\n"
+        "    finally:\n"
+        "        _rid_parallel_state.body = None\n"
+        "def _rid_reduce(op, total, partials):\n"
+        "    _rid_partial(total)\n"
+        "    for partial in partials:\n"
+        "        total = total + partial if op == '+' else total * partial\n"
+        "    return total\n"
+    ),
+}
+
+
+def prelude(names):
+    """Return the source of the requested helpers, in a stable order"""
+    return [HELPERS[name] for name in HELPERS if name in names]
@@ -0,0 +1,200 @@
+"""Long-running transpiler service: `python main.py --serve [--socket PATH]`.
+
+Requests and responses are JSON objects, one per line, over stdin/stdout or a Unix
+socket. Requests are handled concurrently: an asyncio front end reads them and
+hands each one to a pool of warm worker processes, so a slow `run` does not hold
+up other requests. Responses carry the request's "id" and may arrive out of order.
+
+    {"id": 1, "op": "transpile", "source": "...", "optimize": false}
+        -> {"id": 1, "ok": true, "code": "<python>", "diagnostics": []}
+    {"id": 2, "op": "check", "source": "..."}
+        -> {"id": 2, "ok": false, "diagnostics": [{"line": 3, "type": "Name Error", "message": "..."}]}
+    {"id": 3, "op": "run", "source": "...", "stdin": "...", "timeout": 5}
+        -> {"id": 3, "ok": true, "output": "...", "diagnostics": []}
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import io
+import json
+import os
+import re
+import signal
+import sys
+import traceback
+
+import rid
+
+OPS = ("transpile", "check", "run")
+DEFAULT_TIMEOUT = 10.0
+
+# Parser.error formats messages as "Line <n> -> <type>: <message>"
+ERROR_FORMAT = re.compile(r"Line (\S+) -> ([^:]+): (.*)", re.DOTALL)
+
+
+def diagnostic(exc):
+    """Diagnostic dict for a transpiler error, with the line number split out when known"""
+    match = ERROR_FORMAT.match(str(exc))
+    if match is None:
+        return {"line": None, "type": type(exc).__name__, "message": str(exc)}
+    line, error_type, message = match.groups()
+    return {"line": int(line) if line.isdigit() else None, "type": error_type, "message": message}
+
+
+def runtime_diagnostic(exc, line_map):
+    """
+    Diagnostic for an exception raised by a running program: the innermost frame
+    with a RID line gives "line"; python_line is that frame's line in the generated code.
+    """
+    line = python_line = None
+    for frame in traceback.extract_tb(exc.__traceback__):
+        if frame.filename == "<rid>" and line_map.lookup(frame.lineno) is not None:
+            line, python_line = line_map.lookup(frame.lineno), frame.lineno
+    return {"line": line, "type": "Runtime Error", "message": f"{type(exc).__name__}: {exc}",
+            "python_line": python_line}
+
+
+@functools.lru_cache(maxsize=256)
+def load(source, optimize):
+    return rid.load_program(source, "<rid>", optimize=optimize)
+
+
+class RunTimeout(Exception):
+    pass
+
+
+def raise_timeout(signum, frame):
+    raise RunTimeout()
+
+
+def handle(request):
+    """Worker process: answer one validated request"""
+    op, source = request["op"], request["source"]
+    response = {"id": request.get("id"), "ok": True, "diagnostics": []}
+    try:
+        python_code, code, line_map = load(source, bool(request.get("optimize", False)))
+    except Exception as exc:
+        # SyntaxError, NameError and TypeError from the parser; RecursionError for deeply nested source
+        response["ok"] = False
+        response["diagnostics"].append(diagnostic(exc))
+        return response
+
+    if op == "transpile":
+        response["code"] = python_code
+    elif op == "run":
+        timeout = float(request.get("timeout", DEFAULT_TIMEOUT))
+        if hasattr(signal, "setitimer"):
+            signal.signal(signal.SIGALRM, raise_timeout)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        output = io.StringIO()
+        try:
+            rid.run_code(code, stdin=request.get("stdin", ""), stdout=output)
+        except RunTimeout:
+            response["ok"] = False
+            response["diagnostics"].append(
+                {"line": None, "type": "Timeout", "message": f"program ran longer than {timeout:g} s"})
+        except (Exception, SystemExit) as exc:
+            response["ok"] = False
+            response["diagnostics"].append(runtime_diagnostic(exc, line_map))
+        finally:
+            if hasattr(signal, "setitimer"):
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        response["output"] = output.getvalue()
+    return response
+
+
+def request_error(request_id, message):
+    return {"id": request_id, "ok": False, "diagnostics": [{"line": None, "type": "Request Error", "message": message}]}
+
+
+def parse_request(line):
+    """Decode and validate one request line; returns (request, error_response)"""
+    try:
+        request = json.loads(line)
+    except ValueError as exc:
+        return None, request_error(None, f"invalid JSON: {exc}")
+    if not isinstance(request, dict):
+        return None, request_error(None, "request must be a JSON object")
+    if request.get("op") not in OPS:
+        return None, request_error(request.get("id"), f"'op' must be one of {', '.join(OPS)}")
+    if not isinstance(request.get("source"), str):
+        return None, request_error(request.get("id"), "'source' must be a string")
+    timeout = request.get("timeout", DEFAULT_TIMEOUT)
+    if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or not 0 < timeout < float("inf"):
+        return None, request_error(request.get("id"), "'timeout' must be a positive number of seconds")
+    return request, None
+
+
+class Server:
+    def __init__(self, workers=None):
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+
+    async def respond(self, line, send):
+        request, response = parse_request(line)
+        if response is None:
+            loop = asyncio.get_running_loop()
+            try:
+                response = await loop.run_in_executor(self.pool, handle, request)
+            except concurrent.futures.process.BrokenProcessPool:
+                response = request_error(request.get("id"), "worker process died")
+            except Exception as exc:
+                # Answer this request and keep serving the others
+                response = {"id": request.get("id"), "ok": False, "diagnostics": [diagnostic(exc)]}
+        await send(json.dumps(response).encode() + b"\n")
+
+    async def serve_lines(self, readline, send):
+        """Answer every request line, concurrently, until readline returns b''"""
+        pending = set()
+        while True:
+            line = await readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            task = asyncio.ensure_future(self.respond(line, send))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def serve_stdio(self):
+        # stdin/stdout may be files or terminals, which asyncio pipe transports reject
+        loop = asyncio.get_running_loop()
+        stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+
+        async def send(data):
+            stdout.write(data)
+            stdout.flush()
+
+        await self.serve_lines(lambda: loop.run_in_executor(None, stdin.readline), send)
+
+    async def serve_connection(self, reader, writer):
+        async def send(data):
+            writer.write(data)
+            await writer.drain()
+
+        try:
+            await self.serve_lines(reader.readline, send)
+        finally:
+            writer.close()
+
+    async def serve_socket(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self.serve_connection, path=path, limit=2 ** 26)
+        print(f"Serving on {path}", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+    def run(self, socket_path=None):
+        # Shut the worker pool down on SIGTERM as well as Ctrl+C, so no workers are orphaned
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            asyncio.run(self.serve_socket(socket_path) if socket_path else self.serve_stdio())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+            if socket_path and os.path.exists(socket_path):
+                os.unlink(socket_path)
@@ -0,0 +1,100 @@
+"""Line maps from generated Python back to RID source, and traceback rewriting.
+
+Codegen records the RID line of every line it emits. A LineMap keeps only the
+points where that changes: `starts[i]` is the first generated line of a run of
+lines that all come from RID line `rid_lines[i]`, with 0 for the prelude and
+other lines no RID statement produced. Lookups bisect `starts`, so mapping a
+frame is O(log n) in the number of runs, and the map is two flat arrays that are
+stored as bytes next to the cached program.
+"""
+
+import bisect
+import os
+import re
+from array import array
+
+FRAME = re.compile(r'  File "(?P<file>.+)", line (?P<line>\d+), in (?P<name>.+)')
+
+
+class LineMap:
+    __slots__ = ("starts", "rid_lines")
+
+    def __init__(self, starts, rid_lines):
+        self.starts = starts
+        self.rid_lines = rid_lines
+
+    @classmethod
+    def from_lines(cls, lines, rid_lines):
+        """
+        Build from the generated lines, in order, and the RID line (or 0) of each.
+        An entry of lines may hold several physical lines, as prelude helpers do.
+        """
+        starts, runs = array("I"), array("I")
+        previous = None
+        python_line = 1
+        for line, rid_line in zip(lines, rid_lines):
+            if rid_line != previous:
+                starts.append(python_line)
+                runs.append(rid_line)
+                previous = rid_line
+            python_line += line.count("\n") + 1
+        return cls(starts, runs)
+
+    def lookup(self, python_line):
+        """RID line that generated line python_line (1-based) came from, or None"""
+        index = bisect.bisect_right(self.starts, python_line) - 1
+        if index < 0:
+            return None
+        return self.rid_lines[index] or None
+
+    def to_bytes(self):
+        return self.starts.tobytes() + self.rid_lines.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        values = array("I")
+        values.frombytes(data)
+        half = len(values) // 2
+        return cls(values[:half], values[half:])
+
+
+def same_file(a, b):
+    return a == b or os.path.abspath(a) == os.path.abspath(b)
+
+
+def rewrite_traceback(text, filename, line_map, rid_filename, rid_source=None):
+    """
+    Rewrite a formatted traceback so frames in the generated program (compiled as
+    `filename`) name `rid_filename`, the RID line and, given rid_source, its text.
+    line_map is None for code whose line numbers are RID lines already (astgen).
+    The module-level frame that only calls _rid_main() is dropped; other frames
+    without a RID line (runtime helpers) and frames in other files are left alone.
+    """
+    rid_lines = rid_source.splitlines() if rid_source is not None else []
+    result = []
+    skipping = False
+    for line in text.splitlines(keepends=True):
+        # Source and caret lines under a rewritten frame refer to the Python line
+        if skipping and line.startswith("    "):
+            continue
+        skipping = False
+        match = FRAME.match(line)
+        rid_line = None
+        if match is not None and same_file(match.group("file"), filename):
+            python_line = int(match.group("line"))
+            rid_line = line_map.lookup(python_line) if line_map is not None else python_line or None
+            if rid_line is None and match.group("name") == "<module>":
+                skipping = True
+                continue
+        if rid_line is None:
+            result.append(line)
+            continue
+
+        name = match.group("name")
+        if name == "_rid_main":
+            name = "<top level>"
+        result.append(f'  File "{rid_filename}", line {rid_line}, in {name}\n')
+        if rid_line <= len(rid_lines) and rid_lines[rid_line - 1].strip():
+            result.append(f"    {rid_lines[rid_line - 1].strip()}\n")
+        skipping = True
+    return "".join(result)
@@ -0,0 +1,107 @@
+"""Scoped symbol table used by the Parser to check that names are declared.
+
+Scopes form a chain: the global scope, then one scope per enclosing `func` or
+`Run parallel` loop, whose body runs as a function of its own. Other blocks share
+their enclosing scope (see "Variable Scope" in language_spec.md), as they do in the
+generated Python. Each scope maps interned names to one packed int holding the
+symbol's kind, the type of its first value when that is a literal, and the line of
+its first definition, so a declaration costs a dict entry and at most one small
+int; expression nodes are not kept. Lookups are a dict probe per enclosing scope.
+"""
+
+import sys
+from collections import namedtuple
+
+import inference
+import nodes
+
+GLOBAL, FUNCTION, PARALLEL = "global", "function", "parallel"
+
+KINDS = ("variable", "parameter", "counter")
+VARIABLE, PARAMETER, COUNTER = range(len(KINDS))
+# None: not a literal, or not known until inference.annotate runs
+TYPES = (None, "int", "float", "str", "bool")
+TYPE_CODES = {name: code for code, name in enumerate(TYPES)}
+
+KIND_BITS = 2
+TYPE_BITS = 3
+LINE_SHIFT = KIND_BITS + TYPE_BITS
+
+Symbol = namedtuple("Symbol", "name kind type line scope")
+
+
+def pack(kind, type_name, line):
+    return kind | TYPE_CODES[type_name] << KIND_BITS | line << LINE_SHIFT
+
+
+def value_type(value):
+    """Type of a declared value that is a literal, else None"""
+    if isinstance(value, (nodes.Number, nodes.String, nodes.Bool)):
+        return inference.literal_type(value)
+    return None
+
+
+class Scope:
+    __slots__ = ("kind", "parent", "names")
+
+    def __init__(self, kind, parent=None):
+        self.kind = kind
+        self.parent = parent
+        self.names = {}
+
+
+class SymbolTable:
+    def __init__(self):
+        self.scope = Scope(GLOBAL)
+
+    def enter(self, kind=FUNCTION):
+        self.scope = Scope(kind, self.scope)
+
+    def leave(self):
+        self.scope = self.scope.parent
+
+    def declare(self, name, kind=VARIABLE, line=0, value=None):
+        """
+        Declare name in the innermost scope and return the interned name. A name
+        already declared there keeps the metadata of its first definition.
+        """
+        name = sys.intern(name)
+        names = self.scope.names
+        if name not in names:
+            names[name] = pack(kind, value_type(value), line)
+        return name
+
+    def __contains__(self, name):
+        scope = self.scope
+        while scope is not None:
+            if name in scope.names:
+                return True
+            scope = scope.parent
+        return False
+
+    def lookup(self, name):
+        """The Symbol for name in the innermost scope declaring it, or None"""
+        scope = self.scope
+        while scope is not None:
+            packed = scope.names.get(name)
+            if packed is not None:
+                return Symbol(name, KINDS[packed & (1 << KIND_BITS) - 1],
+                              TYPES[packed >> KIND_BITS & (1 << TYPE_BITS) - 1], packed >> LINE_SHIFT, scope.kind)
+            scope = scope.parent
+        return None
+
+    def in_function(self):
+        """Whether the innermost scope is, or is nested in, a `func` body"""
+        scope = self.scope
+        while scope is not None:
+            if scope.kind == FUNCTION:
+                return True
+            scope = scope.parent
+        return False
+
+    def global_names(self):
+        """Names declared in the global scope"""
+        scope = self.scope
+        while scope.parent is not None:
+            scope = scope.parent
+        return scope.names.keys()
@@ -0,0 +1,104 @@
+"""Regression tests for the transpiler: python -m unittest test_rid (or pytest)."""
+
+import io
+import unittest
+
+import rid
+
+# Every way a program can be compiled: (backend, optimize)
+MODES = (("text", False), ("ast", False), ("text", True))
+
+
+def run(source, backend="text", optimize=False, stdin=""):
+    """Compile and run RID source in this interpreter and return what it printed"""
+    stdout = io.StringIO()
+    rid.run_code(rid.compile_source(source, backend=backend, optimize=optimize), stdin=stdin, stdout=stdout)
+    return stdout.getvalue()
+
+
+class InferenceTests(unittest.TestCase):
+    def assert_prints(self, source, expected):
+        for backend, optimize in MODES:
+            with self.subTest(backend=backend, optimize=optimize):
+                self.assertEqual(run(source, backend, optimize), expected)
+
+    def test_call_binds_arguments_to_every_definition(self):
+        self.assert_prints(
+            'func f(a) {\n    give a\n}\n'
+            'func g() {\n    give f(1)\n}\n'
+            'func f(b) {\n    give b + "x"\n}\n'
+            'out(f("s"))\n'
+            'out(g())\n',
+            "sx1x")
+
+    def test_function_redefined_in_loop(self):
+        self.assert_prints(
+            'func f(a) {\n    give a\n}\n'
+            'Let r = ""\n'
+            'Run(2, i) {\n'
+            '    r = r + f(i + 1)\n'
+            '    func f(b) {\n        give b + "x"\n    }\n'
+            '    out(f("s"))\n'
+            '}\n'
+            'out(r)\n',
+            "sxsx12x")
+
+
+class ParserTests(unittest.TestCase):
+    def assert_rejected(self, source, message):
+        for backend, optimize in MODES:
+            with self.subTest(backend=backend, optimize=optimize):
+                with self.assertRaises(SyntaxError) as raised:
+                    run(source, backend, optimize)
+                self.assertIn(message, str(raised.exception))
+
+    def test_give_outside_function(self):
+        self.assert_rejected('out("a")\ngive 5\nout("b")\n', "Line 2 -> Syntax Error: 'give' can only be used")
+        self.assert_rejected('Run(2, i) {\n    agar(i > 0) {\n        give i\n    }\n}\n', "Line 3")
+        self.assert_rejected('Let t = 0\nRun parallel(4, i, t) {\n    give i\n}\n', "Line 3")
+
+    def test_give_inside_function(self):
+        source = ('func f(n) {\n'
+                  '    func f(m) {\n        give m\n    }\n'
+                  '    Run(2, i) {\n        agar(i == n) {\n            give "found"\n        }\n    }\n'
+                  '    give "no"\n'
+                  '}\n'
+                  'out(f(1))\n')
+        for backend, optimize in MODES:
+            with self.subTest(backend=backend, optimize=optimize):
+                self.assertEqual(run(source, backend, optimize), "found")
+
+
+class HelperTests(unittest.TestCase):
+    def test_builtins_without_lists_skip_list_helper(self):
+        source = 'out(len("abc"))\nLet s = "ab"\nagar(len(s) > 5) {\n    out(sum(s))\n}\n'
+        self.assertNotIn("_RidList", rid.transpile_source(source))
+        for backend, optimize in MODES:
+            with self.subTest(backend=backend, optimize=optimize):
+                self.assertEqual(run(source, backend, optimize), "3")
+                with self.assertRaisesRegex(TypeError, "sum\\(\\) needs a list, got str"):
+                    run('out(sum("ab"))\n', backend, optimize)
+
+    def test_list_builtins(self):
+        source = 'Let xs = [1, 2.5]\nout(min(xs) + len(xs))\nout(sum(fill(3, 2)) + max(range(4)))\n'
+        for backend, optimize in MODES:
+            with self.subTest(backend=backend, optimize=optimize):
+                self.assertEqual(run(source, backend, optimize), "3.09")
+
+
+class OptimizerTests(unittest.TestCase):
+    def test_huge_int_product_is_not_folded(self):
+        # The folded product would have 4500 digits, more than str() converts
+        digits = "9" * 1500
+        source = f"Let x = {digits} * {digits} * {digits}\nout(x % 7)\nout(word(x * 0))\n"
+        for backend, optimize in MODES:
+            with self.subTest(backend=backend, optimize=optimize):
+                self.assertEqual(run(source, backend, optimize), "00")
+
+    def test_large_int_product_is_folded(self):
+        program = rid.parse_with_passes("Let x = 99999999999 * 99999999999\n", optimize=True)
+        self.assertEqual(program.body[0].value.value, str(99999999999 * 99999999999))
+
+
+if __name__ == "__main__":
+    unittest.main()
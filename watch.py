@@ -0,0 +1,390 @@
+"""Resident watch mode: `python main.py --watch <file|dir>` re-transpiles .rid files when they change.
+
+Each file keeps an IncrementalTranspiler holding its top-level statements as chunks:
+runs of whole lines, each with its parsed nodes, the names it declares and its
+generated Python. On a change, only the lines between the unchanged prefix and
+suffix (widened to chunk boundaries) are lexed and parsed again; the other chunks
+are reused, shifted to their new line numbers. Type inference is global, so it is
+solved again every time, as is memoization (--memoize). Loop-invariant hoisting is
+repeated for the chunks whose types changed or that read a name whose definite
+assignment in earlier chunks changed. Generated code for unchanged chunks is reused
+when the solved types, memoized functions and hoisted expressions come out the same
+and earlier chunks generated as many numbered temporaries as before.
+The result is identical to rid.transpile_source.
+
+The stdlib has no file-change notification API, so files are polled by mtime and size.
+"""
+
+import os
+import time
+
+import batch
+import codegen
+import functions
+import inference
+import lexer
+import loops
+import nodes
+import optimizer
+import rid
+import sourcemap
+import symbols
+from lexer import (
+    IDENTIFIER, NUMBER, STRING, LET, OUT, RUN, IF, FUNC, RETURN, BOOL, NEWLINE,
+    LPAREN, RPAREN, LBRACE, RBRACE, LBRACKET, RBRACKET,
+)
+from parser import Parser
+
+# A chunk may start at a statement keyword or name that begins its own line, at
+# bracket depth 0, when the previous token could end a statement. Expressions only
+# continue after an operator, so parsing stops at such a token either way; `give`
+# is excluded because its value is optional.
+STATEMENT_STARTS = {IDENTIFIER, LET, OUT, RUN, IF, FUNC, RETURN, NEWLINE}
+STATEMENT_ENDS = {IDENTIFIER, NUMBER, STRING, BOOL, RPAREN, RBRACE, RBRACKET, NEWLINE}
+OPENERS = {LPAREN, LBRACE, LBRACKET}
+CLOSERS = {RPAREN, RBRACE, RBRACKET}
+
+
+class Chunk:
+    """Top-level statements parsed from lines [start, end) of the file"""
+    __slots__ = ("start", "end", "body", "symbols", "functions", "prints", "code", "rid_lines", "helpers",
+                 "hoisted", "memoized", "numbering", "function_defs", "loops", "mutates_lists", "shared",
+                 "reads", "assigns", "hoisting")
+
+    def __init__(self, start, end, body):
+        self.start = start
+        self.end = end
+        self.body = body
+        self.symbols = set()
+        self.functions = {}
+        # Set with code: whether the chunk uses out() or line
+        self.prints = False
+        self.code = None
+        self.rid_lines = None
+        self.helpers = None
+        self.hoisted = None
+        self.memoized = None
+        # CodeGenerator (temporaries, parallel_bodies) before and after this chunk's code
+        self.numbering = None
+        self.function_defs = []
+        self.loops = []
+        self.mutates_lists = False
+        # functions.shared_names of function_defs, set once tail calls are lowered
+        self.shared = None
+        for node in nodes.statements(body):
+            if isinstance(node, nodes.FuncDef):
+                self.function_defs.append(node)
+                self.functions[node.name] = node
+            elif isinstance(node, (nodes.Run, nodes.ParallelRun, nodes.While)):
+                self.loops.append(node)
+            elif isinstance(node, nodes.SetItem):
+                self.mutates_lists = True
+        # Hoisting in this chunk depends on earlier chunks only through which of the
+        # names it reads outside functions they define, and whether lists are mutated
+        self.reads = {node.name for node in functions.scope(nodes.Program(body)) if isinstance(node, nodes.Name)}
+        self.assigns = loops.definitely_assigned(body)
+        self.hoisting = None
+        # Variables declared inside functions and Run parallel loops are local to them
+        for node in functions.scope(nodes.Program(body), parallel=False):
+            if isinstance(node, nodes.Let):
+                self.symbols.add(node.name)
+            elif isinstance(node, nodes.Run) and node.counter is not None:
+                self.symbols.add(node.counter)
+
+    def shift(self, delta):
+        self.start += delta
+        self.end += delta
+        if self.rid_lines is not None:
+            self.rid_lines = [line + delta for line in self.rid_lines]
+        for statement in self.body:
+            for node in nodes.walk(statement):
+                node.line += delta
+
+
+def split_statements(text, first_line):
+    """
+    Split text, which begins at 0-based line first_line, at line starts where a
+    top-level statement begins. Returns ([(piece, line), ...], clean_end); clean_end
+    is False when the text ends inside a bracket, comment or string, or after a token
+    that expects more, so the next line cannot start a separate chunk.
+    """
+    pieces = []
+    piece_start, piece_line = 0, first_line
+    line = first_line
+    depth = 0
+    last_kind = None
+    boundary = None
+    clean_end = True
+
+    for match in lexer.TOKEN_PATTERN.finditer(text):
+        gap, value = match.group("gap", "token")
+        if gap:
+            newlines = gap.count("\n")
+            if newlines:
+                boundary = (match.start() + gap.rfind("\n") + 1, line + newlines)
+                line += newlines
+            # Characters that start no token may follow the last newline; then the end is not clean
+            clean_end = newlines > 0 and not gap[gap.rfind("\n") + 1:].strip()
+        if not value or value == "!":
+            continue
+
+        clean_end = False
+        first = value[0]
+        if first in '~"':
+            line += value.count("\n")
+            if first == "~":
+                boundary = None
+                continue
+            kind = STRING
+        elif value in lexer.SYMBOLS:
+            kind = lexer.SYMBOLS[value]
+        elif first.isdecimal():
+            kind = NUMBER
+        else:
+            kind = lexer.KEYWORDS.get(value, IDENTIFIER)
+
+        if (boundary is not None and depth == 0 and kind in STATEMENT_STARTS
+                and last_kind in STATEMENT_ENDS):
+            offset, boundary_line = boundary
+            pieces.append((text[piece_start:offset], piece_line))
+            piece_start, piece_line = offset, boundary_line
+
+        if kind in OPENERS:
+            depth += 1
+        elif kind in CLOSERS:
+            depth -= 1
+        last_kind = kind
+        boundary = None
+
+    pieces.append((text[piece_start:], piece_line))
+    clean_end = clean_end and depth == 0 and (last_kind is None or last_kind in STATEMENT_ENDS)
+    return pieces, clean_end
+
+
+def declared_names(chunks):
+    """Variable and function names the parser will know about after these chunks"""
+    variables, functions = set(), set()
+    for chunk in chunks:
+        variables |= chunk.symbols
+        functions.update(chunk.functions)
+    return variables, functions
+
+
+class IncrementalTranspiler:
+    """Transpiles successive versions of one file, reusing work for unchanged statements"""
+
+    def __init__(self, optimize=False, memoize=None):
+        self.optimize = optimize
+        self.memoize = memoize
+        self.lines = []
+        self.chunks = []
+        self.var_types = None
+        self.return_types = None
+        # sourcemap.LineMap for the last result of transpile()
+        self.line_map = None
+
+    def transpile(self, source):
+        """
+        Return the Python source for this version of the file, as rid.transpile_source
+        would; its line map is left in self.line_map.
+        """
+        lines = source.splitlines(keepends=True)
+        try:
+            chunks = self.update_chunks(lines)
+        except (SyntaxError, NameError, TypeError):
+            # Let a full parse report the error exactly as the batch transpiler would
+            self.chunks = []
+            rid.parse_source(source)
+            python_code, self.line_map = rid.transpile_mapped(source, optimize=self.optimize, memoize=self.memoize)
+            return python_code
+
+        self.lines = lines
+        self.chunks = chunks
+        python_code, self.line_map = self.generate()
+        return python_code
+
+    def update_chunks(self, lines):
+        old_count, new_count = len(self.lines), len(lines)
+        if not self.chunks or not old_count:
+            return self.parse_region(lines, 0, new_count, [])[0]
+
+        prefix = 0
+        limit = min(old_count, new_count)
+        while prefix < limit and self.lines[prefix] == lines[prefix]:
+            prefix += 1
+        if prefix == old_count == new_count:
+            return self.chunks
+        suffix = 0
+        while suffix < limit - prefix and self.lines[old_count - 1 - suffix] == lines[new_count - 1 - suffix]:
+            suffix += 1
+
+        # Old chunks touching the changed lines or the line just before them
+        low = min(max(prefix - 1, 0), old_count - 1)
+        high = max(old_count - suffix, low + 1)
+        first = 0
+        while self.chunks[first].end <= low:
+            first += 1
+        last = first
+        while last + 1 < len(self.chunks) and self.chunks[last + 1].start < high:
+            last += 1
+
+        before, changed, after = self.chunks[:first], self.chunks[first:last + 1], self.chunks[last + 1:]
+        start = changed[0].start
+        if not after:
+            return before + self.parse_region(lines, start, new_count, before)[0]
+
+        delta = new_count - old_count
+        region, clean_end = self.parse_region(lines, start, changed[-1].end + delta, before)
+        if not clean_end or declared_names(region) != declared_names(changed):
+            # Later statements may now parse differently; redo everything after the prefix
+            return before + self.parse_region(lines, start, new_count, before)[0]
+
+        if delta:
+            for chunk in after:
+                chunk.shift(delta)
+        return before + region + after
+
+    def parse_region(self, lines, start, end, before):
+        """Parse lines [start, end) into chunks, given the chunks that precede them"""
+        # Only whether a name is declared matters for parsing, so earlier chunks' names are
+        # declared without their kind, type and line
+        table, function_defs = symbols.SymbolTable(), {}
+        for chunk in before:
+            for name in chunk.symbols:
+                table.declare(name)
+            function_defs.update(chunk.functions)
+
+        pieces, clean_end = split_statements("".join(lines[start:end]), start)
+        chunks = []
+        for index, (text, line) in enumerate(pieces):
+            piece_end = pieces[index + 1][1] if index + 1 < len(pieces) else end
+            parser = Parser(lexer.iter_lex(text, line + 1))
+            parser.symbols, parser.functions = table, function_defs
+            body = parser.parse().body
+            if self.optimize:
+                body = optimizer.Optimizer().block(body)
+            chunk = Chunk(line, piece_end, body)
+            functions.lower_tail_calls(chunk.function_defs)
+            chunk.shared = functions.shared_names(chunk.function_defs)
+            chunks.append(chunk)
+        return chunks, clean_end
+
+    def generate(self):
+        program = nodes.Program([statement for chunk in self.chunks for statement in chunk.body])
+        types = inference.TypeInference()
+        types.collect(program.body)
+        types.solve()
+
+        reuse = types.var_types == self.var_types and types.return_types == self.return_types
+        self.var_types, self.return_types = types.var_types, types.return_types
+
+        for chunk in self.chunks:
+            if chunk.code is None or not reuse:
+                chunk.code = None
+                for statement in chunk.body:
+                    types.store(statement)
+        if self.memoize is not None:
+            # Which functions are pure can change with any chunk; marks from the last version are stale
+            for chunk in self.chunks:
+                for func in chunk.function_defs:
+                    func.memoize = None
+            functions.mark_pure_functions(program, self.memoize, types.var_types)
+
+        # What is invariant in a loop also depends on assignments in earlier chunks; the
+        # analysis is repeated only for chunks whose types or relevant names changed
+        mutates_lists = any(chunk.mutates_lists for chunk in self.chunks)
+        defined = set()
+        for chunk in self.chunks:
+            hoisting = mutates_lists, defined & chunk.reads
+            if chunk.code is None or hoisting != chunk.hoisting:
+                loops.Hoister(mutates_lists).block(chunk.body, defined)
+                hoisted = [id(expr) for loop in chunk.loops for expr in loop.hoisted]
+                if hoisted != chunk.hoisted:
+                    chunk.hoisted, chunk.code = hoisted, None
+                chunk.hoisting = hoisting
+            defined |= chunk.assigns
+
+        body, body_lines, helpers = [], [], set()
+        numbering = (0, 0)
+        for chunk in self.chunks:
+            memoized = [func.memoize for func in chunk.function_defs]
+            # Generated names are numbered across the whole file
+            if chunk.code is None or memoized != chunk.memoized or chunk.numbering[0] != numbering:
+                generator = codegen.CodeGenerator()
+                generator.indent = "    "
+                generator.temporaries, generator.parallel_bodies = numbering
+                generator.statement_list(chunk.body)
+                chunk.code, chunk.rid_lines = generator.output, generator.rid_lines
+                chunk.helpers, chunk.memoized = generator.helpers, memoized
+                chunk.prints = generator.prints
+                chunk.numbering = numbering, (generator.temporaries, generator.parallel_bodies)
+            numbering = chunk.numbering[1]
+            body.extend(chunk.code)
+            body_lines.extend(chunk.rid_lines)
+            helpers |= chunk.helpers
+        buffered = any(chunk.prints for chunk in self.chunks)
+        shared = set().union(*(chunk.shared for chunk in self.chunks))
+        lines, rid_lines = codegen.assemble(body, body_lines, helpers, buffered, shared)
+        return '\n'.join(lines), sourcemap.LineMap.from_lines(lines, rid_lines)
+
+
+class Watcher:
+    """Poll RID files and rewrite their Python output whenever they change"""
+
+    def __init__(self, target, output=None, optimize=False, memoize=None):
+        self.target = target
+        self.output = output
+        self.optimize = optimize
+        self.memoize = memoize
+        self.stamps = {}
+        self.transpilers = {}
+
+    def sources(self):
+        return batch.find_sources(self.target) if os.path.isdir(self.target) else [self.target]
+
+    def output_for(self, source):
+        """The given output for a single file; foo.py next to each foo.rid for a directory"""
+        if self.output is not None and not os.path.isdir(self.target):
+            return self.output
+        return batch.output_path(source)
+
+    def poll(self):
+        """Re-transpile files whose mtime or size changed; returns [(source, seconds, error)]"""
+        updates = []
+        for source in self.sources():
+            try:
+                stat = os.stat(source)
+            except OSError:
+                continue
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if self.stamps.get(source) == stamp:
+                continue
+            self.stamps[source] = stamp
+            updates.append(self.rebuild(source))
+        return updates
+
+    def rebuild(self, source):
+        start = time.perf_counter()
+        transpiler = self.transpilers.setdefault(source, IncrementalTranspiler(self.optimize, self.memoize))
+        try:
+            with open(source, 'r') as file:
+                python_code = transpiler.transpile(file.read())
+            with open(self.output_for(source), 'w') as file:
+                file.write(python_code)
+            error = None
+        except (SyntaxError, NameError, TypeError, OSError) as exc:
+            error = str(exc)
+        return source, time.perf_counter() - start, error
+
+    def run(self, interval=0.1):
+        print(f"Watching {self.target} (Ctrl+C to stop)")
+        try:
+            while True:
+                for source, seconds, error in self.poll():
+                    if error is None:
+                        print(f"Transpiled {source} to {self.output_for(source)} ({seconds * 1000:.1f} ms)")
+                    else:
+                        print(f"{source}: {error}")
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass